@@ -0,0 +1,105 @@
+"""
+Dialogflow の感情分析1回あたりのレイテンシを、「呼び出しごとにクライアントを作る (従来)」と
+「エンドポイントごとの共有クライアント」で比べるよん！
+
+ローカルにフェイクの Dialogflow gRPC サーバー (Sessions.DetectIntent だけ) を立てて、
+DIALOGFLOW_EMULATOR_HOST 経由で dialogflow_service.analyze_sentiment を呼ぶ。
+フェイクは平文の gRPC なので、本番で毎回かかっていた TLS ハンドシェイクのぶんは含まれない (実際の差はもっと大きいよ)。
+
+使い方:
+    python benchmarks/bench_dialogflow_client.py --calls 200 --server-delay-ms 0
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+import grpc
+import numpy as np
+from google.cloud import dialogflow_v2 as dialogflow
+
+# プロジェクトルートの 'src' を sys.path に追加する
+_SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if _SRC_DIR not in sys.path:
+    sys.path.insert(0, _SRC_DIR)
+
+SERVICE_NAME = "google.cloud.dialogflow.v2.Sessions"
+
+
+async def start_fake_server(delay: float) -> tuple[grpc.aio.Server, str]:
+    """DetectIntent に固定の感情スコアを返すだけのフェイクサーバー。"""
+
+    async def detect_intent(request, context):
+        if delay:
+            await asyncio.sleep(delay)
+        response = dialogflow.DetectIntentResponse()
+        sentiment = response.query_result.sentiment_analysis_result.query_text_sentiment
+        sentiment.score = 0.4
+        sentiment.magnitude = 0.8
+        return response
+
+    handler = grpc.method_handlers_generic_handler(SERVICE_NAME, {
+        "DetectIntent": grpc.unary_unary_rpc_method_handler(
+            detect_intent,
+            request_deserializer=dialogflow.DetectIntentRequest.deserialize,
+            response_serializer=dialogflow.DetectIntentResponse.serialize,
+        ),
+    })
+    server = grpc.aio.server()
+    server.add_generic_rpc_handlers((handler,))
+    port = server.add_insecure_port("127.0.0.1:0")
+    await server.start()
+    return server, f"127.0.0.1:{port}"
+
+
+async def run(args):
+    server, address = await start_fake_server(args.server_delay_ms / 1000)
+    # dialogflow_service は import 時に環境変数を読むので、先に設定しておく
+    os.environ["DIALOGFLOW_EMULATOR_HOST"] = address
+    os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "bench-project")
+    from backend.services import dialogflow_service
+
+    async def per_call_client():
+        # 従来の動き: 呼び出しのたびに新しいクライアント (= 新しい gRPC チャネル) を作る
+        result = await dialogflow_service.analyze_sentiment("bench-session", "今日はいい天気ですね。")
+        await dialogflow_service.close_clients()
+        return result
+
+    async def shared_client():
+        return await dialogflow_service.analyze_sentiment("bench-session", "今日はいい天気ですね。")
+
+    results = {}
+    try:
+        for label, call in (("呼び出しごとに作る", per_call_client), ("共有クライアント", shared_client)):
+            assert (await call())["score"] > 0  # ウォームアップ + 動作確認
+            latencies = []
+            for _ in range(args.calls):
+                start = time.perf_counter()
+                await call()
+                latencies.append(time.perf_counter() - start)
+            results[label] = np.array(latencies) * 1e3
+        await dialogflow_service.close_clients()
+    finally:
+        await server.stop(None)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200, help="計測する呼び出し回数")
+    parser.add_argument("--server-delay-ms", type=float, default=0.0, help="フェイクサーバーの処理時間 (ミリ秒)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    results = asyncio.run(run(args))
+    print(f"呼び出し: {args.calls}回, サーバーの処理時間: {args.server_delay_ms:g} ms")
+    for label, ms in results.items():
+        print(f"  {label}: p50 {np.percentile(ms, 50):7.3f} ms, p90 {np.percentile(ms, 90):7.3f} ms, 平均 {ms.mean():7.3f} ms")
+    before, after = (np.percentile(ms, 50) for ms in results.values())
+    print(f"  スピードアップ (p50): x{before / after:.1f}")
+
+
+if __name__ == "__main__":
+    main()
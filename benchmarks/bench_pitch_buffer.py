@@ -0,0 +1,111 @@
+"""
+ピッチ解析のフレーミング処理のマイクロベンチマークだよん！
+
+従来の `bytes +=` + スライス方式と、PitchRingBuffer 方式を比べる。
+ピッチ推定そのもの (FFT) は含めず、チャンク受信 → 解析ウィンドウ取り出しまでのコストだけを測るよ。
+
+使い方:
+    python benchmarks/bench_pitch_buffer.py --chunk-bytes 256 --seconds 60
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+# プロジェクトルートの 'src' を sys.path に追加する
+_SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if _SRC_DIR not in sys.path:
+    sys.path.insert(0, _SRC_DIR)
+
+from backend.workers.audio_ring_buffer import PitchRingBuffer
+
+RATE = 16000
+WINDOW = 640  # SpeechProcessor と同じ: max_lag(320) * 2
+HOP = WINDOW // 2
+
+
+def bytes_path(chunks):
+    """従来の方式: bytesを連結して、解析のたびにスライスし直す。"""
+    buffer = b""
+    required = WINDOW * 2
+    slide = HOP * 2
+    frames = 0
+    for chunk in chunks:
+        buffer += chunk
+        while len(buffer) >= required:
+            frame = np.frombuffer(buffer, dtype=np.int16, count=WINDOW)
+            frames += frame.shape[0] > 0
+            buffer = buffer[slide:]
+    return frames
+
+
+def ring_path(chunks):
+    """リングバッファ方式: 一度確保した配列に書き込み、ゼロコピーのビューを取り出す。"""
+    ring = PitchRingBuffer(capacity=max(RATE, WINDOW * 4))
+    frames = 0
+    for chunk in chunks:
+        for frame in ring.feed(chunk, WINDOW, HOP):
+            frames += frame.shape[0] > 0
+    return frames
+
+
+def copied_bytes(chunks):
+    """各方式がチャンクあたりにコピーするバイト数を数える (計測とは別に、解析的に)。"""
+    buffered = 0
+    legacy = 0
+    for chunk in chunks:
+        # `buffer += chunk` は連結後の全体を、`buffer[slide:]` は残り全体をコピーする
+        buffered += len(chunk)
+        legacy += buffered
+        while buffered >= WINDOW * 2:
+            buffered -= HOP * 2
+            legacy += buffered
+    # リングバッファは本体とミラーに1回ずつ書くだけ
+    ring = sum(2 * len(chunk) for chunk in chunks)
+    return legacy / len(chunks), ring / len(chunks)
+
+
+def measure(fn, chunks, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        frames = fn(chunks)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn(chunks)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return frames, best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    # フロントエンドの AudioWorklet は 128サンプル (256バイト) ごとに送ってくる
+    parser.add_argument("--chunk-bytes", type=int, default=256, help="1チャンクのバイト数 (奇数も可)")
+    parser.add_argument("--seconds", type=float, default=60.0, help="シミュレートする音声の長さ (秒)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    audio = rng.integers(-2000, 2000, size=int(RATE * args.seconds), dtype=np.int16).tobytes()
+    chunks = [audio[i:i + args.chunk_bytes] for i in range(0, len(audio), args.chunk_bytes)]
+
+    print(f"音声: {args.seconds:.0f}秒, チャンク: {args.chunk_bytes}バイト x {len(chunks)}")
+    results = {}
+    for name, fn in (("bytes", bytes_path), ("ring", ring_path)):
+        frames, elapsed, peak = measure(fn, chunks, args.repeat)
+        results[name] = elapsed
+        print(
+            f"  {name:>5}: {elapsed * 1e3:8.2f} ms ({elapsed / len(chunks) * 1e6:6.2f} µs/chunk), "
+            f"フレーム数 {frames}, ピークメモリ {peak / 1024:.1f} KiB"
+        )
+    print(f"  スピードアップ: x{results['bytes'] / results['ring']:.2f}")
+    legacy_copy, ring_copy = copied_bytes(chunks)
+    print(f"  コピー量: bytes {legacy_copy:.0f} B/chunk, ring {ring_copy:.0f} B/chunk")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+PitchWorker の自己相関プラン (AutocorrelationPlan) のベンチマークだよん！
+
+毎回 FFT長を計算して配列を確保し直す従来の実装と、
+初期化時に計画した作業用バッファを使い回す実装を、フレーム/秒で比べる。
+
+使い方:
+    python benchmarks/bench_pitch_plan.py --frames 2000
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+# プロジェクトルートの 'src' を sys.path に追加する
+_SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if _SRC_DIR not in sys.path:
+    sys.path.insert(0, _SRC_DIR)
+
+from backend.workers.pitch_worker import PitchWorker
+
+RATE = 16000
+
+
+def legacy_batch(worker: PitchWorker, frames: np.ndarray):
+    """プラン導入前の analyze_pitch_batch を再現したもの (比較用)。"""
+    n_frames, n = frames.shape
+    fft_len = 1
+    while fft_len < 2 * n - 1:
+        fft_len <<= 1
+    fft_frames = np.fft.rfft(frames, n=fft_len, axis=-1)
+    power_spectrum = fft_frames * np.conj(fft_frames)
+    autocorr = np.fft.irfft(power_spectrum, n=fft_len, axis=-1)[:, :n]
+    energy = autocorr[:, 0]
+    voiced = energy > 0
+    search_range = autocorr[:, worker.min_lag:min(worker.max_lag, n - 1) + 1]
+    relative_peak = np.argmax(search_range, axis=1)
+    confidences = np.zeros(n_frames)
+    np.divide(search_range[np.arange(n_frames), relative_peak], energy, out=confidences, where=voiced)
+    detected = voiced & (confidences >= worker.confidence_threshold)
+    frequencies = np.full(n_frames, np.nan)
+    frequencies[detected] = worker.sample_rate / (worker.min_lag + relative_peak[detected])
+    return frequencies, confidences
+
+
+def run(fn, blocks):
+    start = time.perf_counter()
+    for block in blocks:
+        fn(block)
+    return time.perf_counter() - start
+
+
+def allocated_per_call(fn, block, calls=200):
+    """tracemalloc で1呼び出しあたりの確保バイト数 (ピーク増分) をざっくり測る。"""
+    fn(block)  # ウォームアップ (プランのバッファ確保を除外する)
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    for _ in range(calls):
+        fn(block)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak - base
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=2000, help="解析するフレーム総数")
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 2, 8, 32], help="1回の呼び出しで渡すフレーム数")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    worker = PitchWorker(sample_rate=RATE, channels=1, sample_width=2)
+    n = worker.frame_length
+    rng = np.random.default_rng(0)
+    t = np.arange(n) / RATE
+    base = np.stack([np.sin(2 * np.pi * f * t) for f in rng.uniform(80, 400, size=64)])
+    pool = (base * 8000 + rng.normal(0, 300, size=base.shape)).astype(np.int16)
+
+    print(f"ウィンドウ: {n}サンプル, FFT長: {worker.plan.fft_len}, NumPy {np.__version__}")
+    for batch in args.batch:
+        blocks = [pool[np.arange(i, i + batch) % len(pool)] for i in range(0, args.frames, batch)]
+        total = sum(len(b) for b in blocks)
+        legacy = min(run(lambda b: legacy_batch(worker, b), blocks) for _ in range(3))
+        planned = min(run(worker.analyze_pitch_batch, blocks) for _ in range(3))
+        legacy_alloc = allocated_per_call(lambda b: legacy_batch(worker, b), blocks[0])
+        planned_alloc = allocated_per_call(worker.analyze_pitch_batch, blocks[0])
+        print(
+            f"  batch={batch:>3}: legacy {total / legacy:9.0f} frames/s, planned {total / planned:9.0f} frames/s "
+            f"(x{legacy / planned:.2f}), 確保ピーク {legacy_alloc / 1024:7.1f} KiB -> {planned_alloc / 1024:7.1f} KiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
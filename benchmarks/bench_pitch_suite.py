@@ -0,0 +1,283 @@
+"""
+PitchWorker のオフライン・ベンチマーク & 精度評価スイートだよん！
+
+F0 が分かっている合成音 (有声: 倍音 + フォルマント + ジッター + ノイズ / 無声: ノイズ・無音) を作って、
+サンプリングレート × ウィンドウ長 ごとに次を測る。
+
+- スループット (フレーム/秒, バッチ解析)
+- PitchContourTracker (オクターブ補正 + スムージング + 間引き) のスループット
+- 1フレームあたりのレイテンシ (p50 / p95 / p99)
+- ピークメモリ (tracemalloc)
+- 正解との誤差 (グロスエラー率, セント誤差, 有声/無声の判定ミス)
+
+結果は JSON で保存するので、コミット間で --compare して劣化をチェックできるよ。
+マイクも GCP も要らない！
+
+使い方:
+    python benchmarks/bench_pitch_suite.py --output pitch_suite.json
+    python benchmarks/bench_pitch_suite.py --output new.json --compare old.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+# プロジェクトルートの 'src' を sys.path に追加する
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_SRC_DIR = os.path.join(_ROOT_DIR, "src")
+if _SRC_DIR not in sys.path:
+    sys.path.insert(0, _SRC_DIR)
+
+from backend.workers.pitch_worker import PitchWorker
+from backend.workers.pitch_tracker import PitchContourTracker
+
+MIN_FREQ = 50.0
+MAX_FREQ = 600.0
+# 正解から これ以上ずれたらグロスエラー (オクターブ誤りなど) とみなす
+GROSS_ERROR_RATIO = 0.2
+
+
+# --- 合成音 ---
+
+def voiced_signal(rate: int, seconds: float, f0: float, rng: np.random.Generator,
+                  jitter: float = 0.01, snr_db: float = 20.0) -> tuple[np.ndarray, np.ndarray]:
+    """
+    倍音 + フォルマント包絡の母音っぽい合成音を作る。
+    F0 にはビブラート (5Hz, ±2%) とランダムなジッターを乗せて、最後に白色ノイズを足すよ。
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (int16 の信号, サンプルごとの真の F0)
+    """
+    n = int(rate * seconds)
+    t = np.arange(n) / rate
+    # ジッター: 5ms ごとのランダム値を線形補間した、ゆっくり揺れる成分
+    knots = rng.normal(0.0, jitter, size=int(seconds * 200) + 2)
+    jitter_track = np.interp(t, np.arange(len(knots)) / 200.0, knots)
+    f0_track = f0 * (1.0 + 0.02 * np.sin(2 * np.pi * 5.0 * t)) * (1.0 + jitter_track)
+    phase = 2 * np.pi * np.cumsum(f0_track) / rate
+
+    signal = np.zeros(n)
+    for h in range(1, int(min(rate / 2, 5000.0) // f0)):
+        freq = h * f0
+        envelope = (np.exp(-((freq - 700.0) / 300.0) ** 2) + 0.6 * np.exp(-((freq - 1200.0) / 400.0) ** 2)
+                    + 0.3 * np.exp(-((freq - 2500.0) / 500.0) ** 2) + 0.02)
+        signal += envelope * np.sin(h * phase + rng.uniform(0, 2 * np.pi))
+    signal /= np.sqrt(np.mean(signal ** 2))
+    signal += rng.normal(0.0, 10 ** (-snr_db / 20.0), size=n)
+    signal *= 0.2 * 32767 / np.abs(signal).max()
+    return signal.astype(np.int16), f0_track
+
+
+def unvoiced_signal(rate: int, seconds: float, rng: np.random.Generator, kind: str) -> np.ndarray:
+    """無声の合成音。kind は "noise" (摩擦音っぽい高域ノイズ) か "silence" (ほぼ無音の背景ノイズ)。"""
+    n = int(rate * seconds)
+    if kind == "silence":
+        return rng.normal(0.0, 20.0, size=n).astype(np.int16)
+    noise = rng.normal(0.0, 1.0, size=n)
+    noise = np.diff(noise, prepend=0.0)  # 1次差分で高域寄りにする
+    return (3000.0 * noise / np.abs(noise).max()).astype(np.int16)
+
+
+def frame(signal: np.ndarray, window: int, hop: int) -> np.ndarray:
+    return np.lib.stride_tricks.sliding_window_view(signal, window)[::hop]
+
+
+# --- 計測 ---
+
+def measure_case(rate: int, window_ms: float, seconds: float, batch: int, seed: int, repeat: int = 3) -> dict:
+    rng = np.random.default_rng(seed)
+    window = int(rate * window_ms / 1000)
+    hop = window // 2
+    worker = PitchWorker(
+        sample_rate=rate, channels=1, sample_width=2, min_freq=MIN_FREQ, max_freq=MAX_FREQ,
+        frame_length=window,
+    )
+
+    # 有声: 低い声〜高い声までいくつかの F0
+    voiced_frames, truth = [], []
+    for f0 in (85.0, 120.0, 165.0, 220.0, 300.0, 420.0):
+        signal, f0_track = voiced_signal(rate, seconds, f0, rng)
+        frames = frame(signal, window, hop)
+        voiced_frames.append(frames)
+        truth.append(f0_track[np.arange(len(frames)) * hop + window // 2])
+    voiced_frames = np.concatenate(voiced_frames)
+    truth = np.concatenate(truth)
+    unvoiced_frames = np.concatenate([
+        frame(unvoiced_signal(rate, seconds, rng, kind), window, hop) for kind in ("noise", "silence")
+    ])
+
+    # 精度
+    estimates, _ = worker.analyze_pitch_batch(voiced_frames)
+    estimates = np.array(estimates)
+    detected = ~np.isnan(estimates)
+    ratio = np.where(detected, estimates / truth, np.nan)
+    gross = detected & (np.abs(ratio - 1.0) > GROSS_ERROR_RATIO)
+    fine = detected & ~gross
+    cents = 1200.0 * np.abs(np.log2(ratio[fine])) if fine.any() else np.array([np.nan])
+    false_voiced, _ = worker.analyze_pitch_batch(unvoiced_frames)
+
+    # スループット (バッチ解析)
+    all_frames = np.ascontiguousarray(np.concatenate([voiced_frames, unvoiced_frames]))
+    blocks = [all_frames[i:i + batch] for i in range(0, len(all_frames), batch)]
+    worker.analyze_pitch_batch(blocks[0])  # ウォームアップ
+    elapsed = float("inf")
+    for _ in range(repeat):  # ゆらぎを減らすため、一番速かった回を採用
+        start = time.perf_counter()
+        for block in blocks:
+            worker.analyze_pitch_batch(block)
+        elapsed = min(elapsed, time.perf_counter() - start)
+
+    # トラッカーのスループット (推定したピッチを、解析と同じ batch フレームずつ渡す)
+    contour = np.concatenate([estimates, np.asarray(false_voiced, dtype=np.float64)])
+    contour_blocks = [contour[i:i + batch] for i in range(0, len(contour), batch)]
+    tracker = PitchContourTracker(frame_period=hop / rate)
+    tracker_elapsed = float("inf")
+    for _ in range(repeat):
+        tracker.reset()
+        start = time.perf_counter()
+        for i, block in enumerate(contour_blocks):
+            tracker.push(block, (i + 1) * batch * hop / rate)
+        tracker_elapsed = min(tracker_elapsed, time.perf_counter() - start)
+
+    # レイテンシ (1フレームずつ)
+    latencies = np.empty(min(len(all_frames), 2000))
+    for i in range(len(latencies)):
+        single = all_frames[i:i + 1]
+        t0 = time.perf_counter()
+        worker.analyze_pitch_batch(single)
+        latencies[i] = time.perf_counter() - t0
+
+    # ピークメモリ (新しく作ったワーカーの初期化 + バッチ解析ひと回し)
+    tracemalloc.start()
+    fresh = PitchWorker(
+        sample_rate=rate, channels=1, sample_width=2, min_freq=MIN_FREQ, max_freq=MAX_FREQ,
+        frame_length=window,
+    )
+    for block in blocks:
+        fresh.analyze_pitch_batch(block)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    p50, p95, p99 = np.percentile(latencies * 1e6, [50, 95, 99])
+    return {
+        "sample_rate": rate,
+        "window_ms": window_ms,
+        "window_samples": window,
+        "frames": int(len(all_frames)),
+        "frames_per_second": len(all_frames) / elapsed,
+        "tracker_frames_per_second": len(contour) / tracker_elapsed,
+        "latency_us": {"p50": p50, "p95": p95, "p99": p99},
+        "peak_memory_kib": peak / 1024,
+        "accuracy": {
+            "voiced_frames": int(len(truth)),
+            "detection_rate": float(detected.mean()),
+            "gross_error_rate": float(gross.sum() / max(detected.sum(), 1)),
+            "median_cents_error": float(np.median(cents)),
+            "p95_cents_error": float(np.percentile(cents, 95)),
+            "unvoiced_frames": int(len(unvoiced_frames)),
+            "false_voiced_rate": float((~np.isnan(false_voiced)).mean()),
+        },
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=_ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _case_key(case: dict) -> tuple:
+    return case["sample_rate"], case["window_ms"]
+
+
+def compare(current: dict, baseline: dict):
+    """前回の JSON と比べて、スループットとグロスエラー率の変化を表示する。"""
+    previous = {_case_key(case): case for case in baseline.get("cases", [])}
+    print(f"\n比較: {baseline.get('meta', {}).get('git_commit')} → {current['meta'].get('git_commit')}")
+    for case in current["cases"]:
+        old = previous.get(_case_key(case))
+        if old is None:
+            continue
+        speed = case["frames_per_second"] / old["frames_per_second"]
+        # トラッカーの計測がない古い JSON とは、解析だけ比べる
+        tracker_speed = (
+            case["tracker_frames_per_second"] / old["tracker_frames_per_second"]
+            if "tracker_frames_per_second" in old else None
+        )
+        gross_delta = case["accuracy"]["gross_error_rate"] - old["accuracy"]["gross_error_rate"]
+        slow = speed < 0.9 or (tracker_speed is not None and tracker_speed < 0.9)
+        flag = " ⚠️" if slow or gross_delta > 0.01 else ""
+        tracker_text = f", トラッカー x{tracker_speed:.2f}" if tracker_speed is not None else ""
+        print(
+            f"  {case['sample_rate']:>5}Hz {case['window_ms']:>5.0f}ms: "
+            f"速度 x{speed:.2f}{tracker_text}, グロスエラー {gross_delta * 100:+.2f}pt{flag}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rates", type=int, nargs="+", default=[16000, 48000], help="サンプリングレート (Hz)")
+    parser.add_argument("--windows-ms", type=float, nargs="+", default=[30.0, 40.0, 80.0], help="ウィンドウ長 (ミリ秒)")
+    parser.add_argument("--seconds", type=float, default=2.0, help="F0ごとの合成音の長さ (秒)")
+    parser.add_argument("--batch", type=int, default=8, help="スループット計測で1回に渡すフレーム数")
+    parser.add_argument("--repeat", type=int, default=3, help="スループット計測の繰り返し回数 (最速値を採用)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="pitch_suite.json", help="結果を書き出す JSON のパス")
+    parser.add_argument("--compare", help="比較対象の (前回の) JSON のパス")
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.INFO)  # PitchWorker の初期化ログを黙らせる
+
+    cases = []
+    for rate in args.rates:
+        for window_ms in args.windows_ms:
+            if rate * window_ms / 1000 <= rate / MIN_FREQ:
+                print(f"  スキップ: {rate}Hz {window_ms}ms (ウィンドウが最低周波数の1周期より短い)")
+                continue
+            case = measure_case(rate, window_ms, args.seconds, args.batch, args.seed, args.repeat)
+            cases.append(case)
+            acc = case["accuracy"]
+            print(
+                f"  {rate:>5}Hz {window_ms:>5.0f}ms: "
+                f"{case['frames_per_second']:9.0f} フレーム/秒, "
+                f"トラッカー {case['tracker_frames_per_second']:9.0f} フレーム/秒, "
+                f"p95 {case['latency_us']['p95']:7.1f}µs, "
+                f"メモリ {case['peak_memory_kib']:7.1f}KiB, "
+                f"グロスエラー {acc['gross_error_rate'] * 100:5.2f}%, "
+                f"中央値誤差 {acc['median_cents_error']:5.1f}セント, "
+                f"無声の誤検出 {acc['false_voiced_rate'] * 100:5.1f}%"
+            )
+
+    result = {
+        "meta": {
+            "git_commit": _git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "args": vars(args),
+        },
+        "cases": cases,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"結果を {args.output} に保存しました。")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+WebSocket 接続ごとのクライアント準備コストを、「接続ごとに作る (従来)」と「共有レジストリから借りる」で比べるよん！
+
+SpeechProcessor が接続のたびに作っていたクライアント (GeminiService / 文字起こし / Pub/Sub) について、
+1接続あたりの準備時間と、1セッションあたりに増えるメモリ (tracemalloc) を測る。
+認証情報がなくて作れないクライアントは、スキップしたと表示するよ。
+
+使い方:
+    GOOGLE_CLOUD_PROJECT=my-project python benchmarks/bench_session_setup.py --sessions 5
+"""
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+# プロジェクトルートの 'src' を sys.path に追加する
+_SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if _SRC_DIR not in sys.path:
+    sys.path.insert(0, _SRC_DIR)
+
+from backend.services.client_registry import ClientRegistry, warm_up_client_registry
+from backend.services.transcription_backend import create_transcription_backend
+
+
+def _factories(stt_backend: str) -> dict:
+    """SpeechProcessor が共有レジストリに登録するのと同じクライアント。"""
+    def gemini():
+        from backend.services.gemini_service import GeminiService
+        return GeminiService()
+
+    def pubsub():
+        from google.cloud import pubsub_v1
+        return pubsub_v1.PublisherClient()
+
+    return {
+        "gemini": gemini,
+        "transcription": lambda: create_transcription_backend(stt_backend),
+        "pubsub": pubsub,
+    }
+
+
+def _available(factories: dict) -> dict:
+    """1回作ってみて、作れたものだけ残す (import や初回ロードのコストもここで払っておく)。"""
+    available = {}
+    for name, factory in factories.items():
+        try:
+            factory()
+            available[name] = factory
+        except Exception as e:
+            print(f"  スキップ: {name} ({type(e).__name__})")
+    return available
+
+
+def measure(connect, sessions: int):
+    """connect() を sessions 回呼んで、1接続あたりの時間と、セッションを保持したときのメモリを返す。"""
+    gc.collect()
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    held = []
+    times = []
+    for _ in range(sessions):
+        start = time.perf_counter()
+        held.append(connect())
+        times.append(time.perf_counter() - start)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return sorted(times)[len(times) // 2], (current - baseline) / sessions
+
+
+async def run(args):
+    # 接続はイベントループのスレッドで作られるので、ここでも同じようにイベントループの中で測る
+    # (grpc.aio の SpeechAsyncClient は、イベントループがないと作れない)
+    print("クライアントの準備 (初回の import / ロード):")
+    factories = _available(_factories(args.stt_backend))
+    if not factories:
+        print("作れるクライアントがありませんでした。")
+        return
+
+    def per_connection():
+        return {name: factory() for name, factory in factories.items()}
+
+    registry = ClientRegistry()
+    for name, factory in factories.items():
+        registry.register(name, factory, needs_loop=(name == "transcription"))
+    await warm_up_client_registry(registry)
+
+    def shared():
+        return {name: registry.get(name) for name in factories}
+
+    print(f"クライアント: {', '.join(factories)} / 接続数: {args.sessions}")
+    results = {}
+    for label, connect in (("接続ごとに作る", per_connection), ("共有レジストリ", shared)):
+        setup, memory = measure(connect, args.sessions)
+        results[label] = setup
+        print(f"  {label}: 準備 {setup * 1e3:9.3f} ms/接続 (中央値), メモリ {memory / 1024:9.1f} KiB/セッション")
+    print(f"  スピードアップ: x{results['接続ごとに作る'] / max(results['共有レジストリ'], 1e-9):.0f}")
+    await registry.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=5, help="シミュレートする接続数")
+    parser.add_argument("--stt-backend", default="google", help='"google" または "fake"')
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+文字起こしパイプライン (AudioFeeder → RotatingSpeechStream → バックエンド) 自体の遅延とスループットを測るよん！
+
+Google の代わりに FakeTranscriptionBackend を使うので、GCP の認証情報はいらない。
+フェイクが足した遅延 (--latency-ms) を差し引いた残りが、こっちのパイプラインのオーバーヘッドだよ。
+
+使い方:
+    python benchmarks/bench_stt_pipeline.py --seconds 30 --speed 10 --latency-ms 300
+    python benchmarks/bench_stt_pipeline.py --seconds 600 --speed 0   # できるだけ速く流してスループットを見る
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+# プロジェクトルートの 'src' を sys.path に追加する
+_SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if _SRC_DIR not in sys.path:
+    sys.path.insert(0, _SRC_DIR)
+
+from backend.services.audio_feeder import AudioFeeder
+from backend.services.stt_rotation import RotatingSpeechStream
+from backend.services.transcription_backend import FakeTranscriptionBackend
+
+RATE = 16000
+BYTES_PER_SECOND = RATE * 2
+CHUNK_BYTES = 256  # フロントエンドの AudioWorklet と同じ 128サンプル
+
+
+async def run(args):
+    loop = asyncio.get_running_loop()
+    latency = args.latency_ms / 1000
+    backend = FakeTranscriptionBackend(word_seconds=args.word_seconds, latency=latency, jitter=0.0)
+    feeder = AudioFeeder(request_bytes=BYTES_PER_SECOND // 10, max_requests=50)
+    rotator = RotatingSpeechStream(
+        backend.recognize, BYTES_PER_SECOND, rotate_after=args.rotate_after, overlap_seconds=args.overlap,
+    )
+    total_bytes = int(args.seconds * BYTES_PER_SECOND)
+    # put_times[i] = 先頭から i 個目のチャンクを put() し終えた時刻
+    put_times = np.zeros(total_bytes // CHUNK_BYTES + 1)
+
+    async def produce():
+        chunk = b"\x00" * CHUNK_BYTES
+        interval = CHUNK_BYTES / BYTES_PER_SECOND / args.speed if args.speed > 0 else 0.0
+        started = loop.time()
+        for i in range(1, len(put_times)):
+            await feeder.put(chunk)
+            put_times[i] = loop.time()
+            delay = started + i * interval - loop.time()
+            await asyncio.sleep(delay if delay > 0 else 0)
+        feeder.close()
+
+    overheads = []
+    started = time.perf_counter()
+    producer = asyncio.create_task(produce())
+    async for result in rotator.results(feeder.requests()):
+        if not result.is_final or result.end_offset is None or result.stream_index > 0:
+            continue
+        # この結果を確定させたチャンクを put() してから届くまで
+        index = min(int(np.ceil(result.end_offset * BYTES_PER_SECOND / CHUNK_BYTES)), len(put_times) - 1)
+        overheads.append(loop.time() - put_times[index] - latency)
+    await producer
+    elapsed = time.perf_counter() - started
+    return backend, rotator, np.array(overheads), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=30.0, help="流す音声の長さ (秒)")
+    parser.add_argument("--speed", type=float, default=10.0, help="実時間の何倍で流すか (0 ならできるだけ速く)")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="フェイクが足す遅延 (ミリ秒)")
+    parser.add_argument("--word-seconds", type=float, default=0.4)
+    parser.add_argument("--rotate-after", type=float, default=270.0, help="ストリームを張り替えるまでの秒数 (壁時計)")
+    parser.add_argument("--overlap", type=float, default=2.0)
+    args = parser.parse_args()
+
+    backend, rotator, overheads, elapsed = asyncio.run(run(args))
+    print(f"音声: {args.seconds:.0f}秒, 速度: x{args.speed:g}, フェイクの遅延: {args.latency_ms:.0f} ms")
+    print(f"  スループット: {args.seconds / elapsed:8.1f} 音声秒/秒 ({elapsed:.2f} 秒)")
+    print(f"  結果: {backend.results_emitted}件, ストリーム: {backend.streams_opened}本 (張り替え {rotator.rotations}回)")
+    if overheads.size:
+        ms = overheads * 1e3
+        print(
+            f"  パイプラインのオーバーヘッド (最初のストリームの確定結果 {overheads.size}件): "
+            f"p50 {np.percentile(ms, 50):.2f} ms, p90 {np.percentile(ms, 90):.2f} ms, max {ms.max():.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
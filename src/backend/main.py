@@ -43,7 +43,10 @@ import uvicorn
 _BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
 _PROJECT_ROOT = os.path.join(_SRC_DIR, '..')
 
-from backend.services.speech_processor import SpeechProcessor
+from backend.services.speech_processor import SpeechProcessor, register_shared_clients, start_shared_dsp_engine
+from backend.services.client_registry import shutdown_client_registry, warm_up_client_registry
+from backend.services import dialogflow_service
+from backend.workers.dsp_engine import shutdown_dsp_engine
 
 # --- ロギング設定 ---
 logging.basicConfig(
@@ -76,6 +79,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def warm_up_clients():
+    """Gemini / Speech / Pub/Sub のクライアントを起動時に1回だけ作っておく (接続ごとには作らない)"""
+    register_shared_clients()
+    await warm_up_client_registry()
+
+@app.on_event("startup")
+async def start_dsp_workers():
+    """PITCH_BACKEND="engine" のときは、DSPエンジンのワーカープロセスを起動時に立ち上げておく (spawn は重いのでスレッドで)"""
+    try:
+        await asyncio.to_thread(start_shared_dsp_engine)
+    except Exception as e:
+        logger.error(f"DSPエンジンを起動できませんでした。ピッチ解析はイベントループ内で行います: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    """サーバー停止時に、DSPエンジンのワーカープロセスと共有メモリ、共有クライアントを片付ける"""
+    shutdown_dsp_engine()
+    await shutdown_client_registry()
+    await dialogflow_service.close_clients()
+
 @app.get("/")
 async def root():
     return {"message": "EP-X Backend is running! Access /docs for API documentation."}
@@ -121,6 +145,13 @@ async def websocket_handler(websocket: WebSocket):
                 msg_type = data.get("type")
 
                 if action == "start":
+                    try:
+                        speech_processor.set_audio_format(data.get("audio_format"))
+                        speech_processor.set_transcript_protocol(data.get("transcript_protocol"))
+                    except ValueError as e:
+                        logger.error(f"😱 クライアントが宣言した音声フォーマットかプロトコルが不正です: {e}")
+                        await send_to_client({"type": "error", "payload": {"message": f"開始パラメータが不正です: {e}"}})
+                        continue
                     question = data.get("question", "自己紹介をお願いします。")
                     speech_processor.set_interview_question(question)
                     asyncio.create_task(speech_processor.start_transcription_and_evaluation())
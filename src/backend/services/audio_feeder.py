@@ -0,0 +1,195 @@
+import asyncio
+import logging
+from collections import deque
+from typing import AsyncIterator
+
+logger = logging.getLogger(__name__)
+
+# --- キューがいっぱいになったときのポリシー ---
+# "block": 空きができるまで put() を待たせる (= WebSocketの読み取りが止まる)
+# "drop_oldest": 一番古いリクエストを捨てる
+# "drop_silence": 無音のリクエストから先に捨てる (なければ一番古いもの)
+POLICY_BLOCK = "block"
+POLICY_DROP_OLDEST = "drop_oldest"
+POLICY_DROP_SILENCE = "drop_silence"
+POLICIES = (POLICY_BLOCK, POLICY_DROP_OLDEST, POLICY_DROP_SILENCE)
+
+
+class AudioFeeder:
+    """
+    Speech-to-Text に送る音声を、だいたい決まった長さ (デフォルト100ms) のリクエストにまとめるフィーダーだよ。
+
+    - WebSocket の小さなフレームは、事前に確保した bytearray に詰めていく
+    - 1リクエスト分たまったときだけ待っている側を起こすので、タイムアウト付きのポーリングは不要！
+    - 送信待ちのリクエストは max_requests 個まで。あふれたら policy に従ってブロック or 破棄する
+    - 捨てたバイト数とブロックしていた時間はセッションごとに数えておく
+    - close() されたら、残りを最後のリクエストとして出して終わる
+    """
+
+    def __init__(self, request_bytes: int, max_requests: int | None = None, policy: str = POLICY_BLOCK):
+        """
+        Args:
+            request_bytes (int): 1リクエストあたりのバイト数 (例: 16kHz / 16-bit / 100ms なら 3200)。
+            max_requests (int | None): 送信待ちにしておけるリクエスト数の上限。None なら無制限。
+            policy (str): 上限に達したときのポリシー。"block" / "drop_oldest" / "drop_silence"。
+        """
+        if request_bytes <= 0:
+            raise ValueError(f"request_bytes は正の整数である必要があります: {request_bytes}")
+        if policy not in POLICIES:
+            raise ValueError(f"サポートされていないポリシー: {policy}。{POLICIES} のどれかを指定してね。")
+        self.request_bytes = request_bytes
+        self.max_requests = max_requests
+        self.policy = policy
+        self._buffer = bytearray(request_bytes)
+        self._view = memoryview(self._buffer)
+        self._filled = 0
+        self._filled_speech = False  # 詰めている途中のリクエストに有声のチャンクが入っているか
+        self._ready = deque()  # (音声, 有声かどうか)
+        self._waiter = None
+        self._space_waiter = None
+        self._closed = False
+        self.reset()
+
+    def reset(self):
+        """新しいセッション用に空っぽに戻す。"""
+        self._filled = 0
+        self._filled_speech = False
+        self._ready.clear()
+        self._closed = False
+        self.requests_made = 0
+        self.wakeups = 0
+        self.dropped_bytes = 0
+        self.dropped_requests = 0
+        self.blocked_seconds = 0.0
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def degraded(self) -> bool:
+        """音声を捨てたか、WebSocketの読み取りを止めたことがあれば True。"""
+        return self.dropped_bytes > 0 or self.blocked_seconds > 0
+
+    def stats(self) -> dict:
+        """セッション終了時のログや degraded イベント用の統計。"""
+        return {
+            "policy": self.policy,
+            "requests": self.requests_made,
+            "dropped_bytes": self.dropped_bytes,
+            "dropped_requests": self.dropped_requests,
+            "blocked_seconds": round(self.blocked_seconds, 3),
+        }
+
+    async def put(self, chunk: bytes, speech: bool = True):
+        """
+        音声を追加する。1リクエスト分たまったら、待っているコンシューマを起こすよ。
+        policy が "block" でキューがいっぱいなら、空きができるまでここで待つ。
+
+        Args:
+            chunk (bytes): 音声データ。
+            speech (bool): VADで有声と判定されたチャンクか ("drop_silence" ポリシーで使う)。
+        """
+        if self._closed or not chunk:
+            return
+        src = memoryview(chunk)
+        size = self.request_bytes
+        while len(src):
+            # _enqueue() でフラグは戻るので、リクエストをまたいで分割されたチャンクも1つずつ印を付ける
+            self._filled_speech |= speech
+            n = min(size - self._filled, len(src))
+            self._view[self._filled:self._filled + n] = src[:n]
+            self._filled += n
+            src = src[n:]
+            if self._filled == size:
+                if self._is_full() and self.policy == POLICY_BLOCK:
+                    await self._wait_for_space()
+                    if self._closed:
+                        return
+                self._enqueue(bytes(self._buffer))
+
+    def flush(self):
+        """途中まで詰まっている分を、短いリクエストとして出す (発話の切れ目などで呼ぶ)。"""
+        if self._filled:
+            # flush でブロックはしない。あふれたら捨てる側のポリシーで処理する
+            self._enqueue(bytes(self._view[:self._filled]), block_allowed=False)
+
+    def close(self):
+        """これ以上音声は来ない。残りを出してから requests() を終わらせる。"""
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._wake()
+        self._wake_space()
+
+    def _is_full(self) -> bool:
+        return self.max_requests is not None and len(self._ready) >= self.max_requests
+
+    def _enqueue(self, request: bytes, block_allowed: bool = True):
+        speech = self._filled_speech
+        self._filled = 0
+        self._filled_speech = False
+        if self._is_full() and (self.policy != POLICY_BLOCK or not block_allowed):
+            index = 0  # 基本は一番古いものを捨てる
+            if self.policy == POLICY_DROP_SILENCE:
+                # 一番古い無音のリクエストを探す。キューが全部有声なら、入ってきた無音の方を捨てる
+                index = next((i for i, (_, queued) in enumerate(self._ready) if not queued), None)
+                if index is None:
+                    if not speech:
+                        self._count_drop(request)
+                        return
+                    index = 0
+            dropped, _ = self._ready[index]
+            del self._ready[index]
+            self._count_drop(dropped)
+        self._ready.append((request, speech))
+        self._wake()
+
+    def _count_drop(self, request: bytes):
+        if self.dropped_requests == 0:
+            logger.warning(
+                f"⚠️ STTへの送信が詰まっているため、音声を捨て始めます (ポリシー: {self.policy}, "
+                f"上限: {self.max_requests}リクエスト)"
+            )
+        self.dropped_bytes += len(request)
+        self.dropped_requests += 1
+
+    async def _wait_for_space(self):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            while self._is_full() and not self._closed:
+                self._space_waiter = loop.create_future()
+                try:
+                    await self._space_waiter
+                finally:
+                    self._space_waiter = None
+        finally:
+            self.blocked_seconds += loop.time() - started
+
+    def _wake(self):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def _wake_space(self):
+        if self._space_waiter is not None and not self._space_waiter.done():
+            self._space_waiter.set_result(None)
+
+    async def requests(self) -> AsyncIterator[bytes]:
+        """まとめ終わったリクエストを順番に返す非同期ジェネレータ。close() されて空になったら終わる。"""
+        loop = asyncio.get_running_loop()
+        while True:
+            while self._ready:
+                request, _ = self._ready.popleft()
+                self._wake_space()
+                self.requests_made += 1
+                yield request
+            if self._closed:
+                return
+            self._waiter = loop.create_future()
+            try:
+                await self._waiter
+                self.wakeups += 1
+            finally:
+                self._waiter = None
@@ -0,0 +1,138 @@
+import asyncio
+import inspect
+import logging
+import threading
+import time
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class ClientRegistry:
+    """
+    プロセス全体で共有するクライアント (Gemini / Speech / Pub/Sub など) の置き場だよ。
+
+    - クライアントは名前ごとに1回だけ作って、WebSocket 接続 (セッション) はそれを借りるだけ
+    - warm_up() をアプリ起動時に呼んでおけば、最初の接続でもイベントループを止めない
+    - grpc.aio のクライアントのように、作るときにイベントループが要るもの (needs_loop=True) は
+      スレッドでは作らず、イベントループのスレッドで作る
+    - 作るのに失敗したクライアントは、retry_seconds の間だけ None を返す (接続のたびに失敗を繰り返さないけど、
+      一時的な失敗で機能がずっと無効になることもない)
+    - close() でまとめて片付ける (同期 / 非同期どちらの close でもOK)
+    """
+
+    def __init__(self, retry_seconds: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self._factories: dict[str, tuple[Callable[[], Any], Callable[[Any], Any] | None]] = {}
+        self._needs_loop: set[str] = set()
+        self._clients: dict[str, Any] = {}
+        self._failed_at: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.retry_seconds = retry_seconds
+        self.clock = clock
+        self.build_seconds: dict[str, float] = {}
+
+    def register(self, name: str, factory: Callable[[], Any], close: Callable[[Any], Any] | None = None,
+                 needs_loop: bool = False):
+        """
+        クライアントの作り方を登録する (まだ作らない)。
+
+        Args:
+            name (str): クライアントの名前。
+            factory (Callable[[], Any]): クライアントを作る関数。
+            close (Callable[[Any], Any] | None): 片付ける関数 (コルーチン関数でもOK)。
+            needs_loop (bool): 作るときに実行中のイベントループが要るか (grpc.aio のクライアントなど)。
+        """
+        self._factories[name] = (factory, close)
+        if needs_loop:
+            self._needs_loop.add(name)
+        else:
+            self._needs_loop.discard(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._factories
+
+    def get(self, name: str):
+        """クライアントを返す。まだなければ作る (失敗したら None。retry_seconds たったら作り直す)。"""
+        if name in self._clients:
+            return self._clients[name]
+        if name not in self._factories:
+            raise KeyError(f"登録されていないクライアントです: {name}")
+        with self._lock:
+            if name in self._clients:  # 別スレッドが先に作っていたらそれを使う
+                return self._clients[name]
+            failed_at = self._failed_at.get(name)
+            if failed_at is not None and self.clock() - failed_at < self.retry_seconds:
+                return None
+            factory, _ = self._factories[name]
+            started = time.perf_counter()
+            try:
+                client = factory()
+            except Exception:
+                logger.exception(
+                    f"😱 共有クライアント '{name}' の作成に失敗しました。{self.retry_seconds:.0f}秒たったら作り直します。"
+                )
+                self._failed_at[name] = self.clock()
+                return None
+            logger.info(f"🔌 共有クライアント '{name}' を作成しました。")
+            self.build_seconds[name] = time.perf_counter() - started
+            self._failed_at.pop(name, None)
+            self._clients[name] = client
+            return client
+
+    def warm_up(self, loop_bound: bool = False):
+        """
+        登録済みのクライアントを作っておく。
+        loop_bound=False ならイベントループの要らないクライアントだけ (スレッドで呼ぶ用)、
+        True ならイベントループの要るクライアントだけ (イベントループのスレッドで呼ぶ用)。
+        """
+        for name in self._factories:
+            if (name in self._needs_loop) == loop_bound:
+                self.get(name)
+
+    async def close(self):
+        """作ったクライアントを片付ける。"""
+        for name, client in list(self._clients.items()):
+            _, closer = self._factories.get(name, (None, None))
+            if client is None or closer is None:
+                continue
+            try:
+                result = closer(client)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.warning(f"⚠️ 共有クライアント '{name}' の片付けでエラー: {e}")
+        self._clients.clear()
+        self._failed_at.clear()
+        self.build_seconds.clear()
+
+
+# --- プロセス全体で1つのレジストリ ---
+_registry: ClientRegistry | None = None
+
+
+def get_client_registry() -> ClientRegistry:
+    """プロセス全体で共有するレジストリを返す (なければ空のものを作る)。"""
+    global _registry
+    if _registry is None:
+        _registry = ClientRegistry()
+    return _registry
+
+
+async def shutdown_client_registry():
+    """サーバー停止時に、共有クライアントを片付ける。"""
+    global _registry
+    if _registry is not None:
+        await _registry.close()
+        _registry = None
+
+
+async def warm_up_client_registry(registry: ClientRegistry | None = None):
+    """
+    共有クライアントを作っておく。同期のクライアント (Gemini / Pub/Sub) はイベントループを止めないようにスレッドで、
+    grpc.aio のクライアントはイベントループが要るので、このイベントループのスレッドで作るよ。
+    """
+    registry = registry or get_client_registry()
+    await asyncio.to_thread(registry.warm_up)
+    registry.warm_up(loop_bound=True)
+    summary = ", ".join(f"{name}: {seconds * 1e3:.0f}ms" for name, seconds in registry.build_seconds.items())
+    logger.info(f"✨ 共有クライアントの準備完了！ ({summary})")
@@ -3,7 +3,10 @@
 import os
 import uuid
 import google.auth
+import grpc
+from google.auth.credentials import AnonymousCredentials
 from google.cloud import dialogflow_v2 as dialogflow
+from google.cloud.dialogflow_v2.services.sessions.transports import SessionsGrpcAsyncIOTransport
 from google.api_core.client_options import ClientOptions
 from dotenv import load_dotenv
 import logging
@@ -28,9 +31,66 @@ if not PROJECT_ID:
         logger.error("GCPのデフォルト認証情報が見つかりませんでした。プロジェクトIDが不明です。")
         PROJECT_ID = None  # フォールバック
 
+# --- 共有クライアントのキャッシュ ---
+# SessionsAsyncClient は作るたびに gRPC チャネル (+ TLS ハンドシェイク) を張り直すので、
+# エンドポイントごとに1つだけ作って、全セッションで使い回すよ！
+_GLOBAL_ENDPOINT = "global"
+# ローカルのフェイク Dialogflow サーバー (負荷試験・ベンチマーク用) を使うときは "host:port" を指定する
+DIALOGFLOW_EMULATOR_HOST = os.getenv("DIALOGFLOW_EMULATOR_HOST")
+_clients: dict[str, dialogflow.SessionsAsyncClient] = {}
+
+
+def _api_endpoint() -> str | None:
+    """リージョンに対応したエンドポイント (リージョン未設定ならグローバルで None)。"""
+    if DIALOGFLOW_LOCATION:
+        # ★★★★★ リージョンを指定するための設定がマジで超重要！ ★★★★★
+        return f"{DIALOGFLOW_LOCATION}-dialogflow.googleapis.com"
+    return None
+
+
+def _create_sessions_client(api_endpoint: str | None) -> dialogflow.SessionsAsyncClient:
+    if DIALOGFLOW_EMULATOR_HOST:
+        channel = grpc.aio.insecure_channel(DIALOGFLOW_EMULATOR_HOST)
+        transport = SessionsGrpcAsyncIOTransport(channel=channel, credentials=AnonymousCredentials())
+        logger.info(f"🧪 ローカルのDialogflowエミュレータを使用します: {DIALOGFLOW_EMULATOR_HOST}")
+        return dialogflow.SessionsAsyncClient(transport=transport)
+    if api_endpoint:
+        logger.info(f"Dialogflowのリージョンエンドポイントを明示的に設定します: {api_endpoint}")
+        return dialogflow.SessionsAsyncClient(client_options=ClientOptions(api_endpoint=api_endpoint))
+    logger.info("Dialogflowのグローバルエンドポイントを使用します。")
+    return dialogflow.SessionsAsyncClient()
+
+
+def get_sessions_client(api_endpoint: str | None = None) -> dialogflow.SessionsAsyncClient:
+    """エンドポイントごとに共有している SessionsAsyncClient を返す (なければ作る)。"""
+    key = DIALOGFLOW_EMULATOR_HOST or api_endpoint or _GLOBAL_ENDPOINT
+    client = _clients.get(key)
+    if client is None:
+        client = _clients[key] = _create_sessions_client(api_endpoint)
+    return client
+
+
+async def close_clients():
+    """アプリ停止時に、共有クライアントの gRPC チャネルを閉じる。"""
+    for key, client in list(_clients.items()):
+        try:
+            await client.transport.close()
+        except Exception as e:
+            logger.warning(f"⚠️ Dialogflowクライアント ({key}) のクローズ中にエラー: {e}")
+    _clients.clear()
+
+
+def _session_path(session_id: str) -> str:
+    if DIALOGFLOW_LOCATION:
+        # v2ライブラリのヘルパーはlocation非対応なので、セッションパスは【手動で】構築する
+        return f"projects/{PROJECT_ID}/locations/{DIALOGFLOW_LOCATION}/agent/sessions/{session_id}"
+    return dialogflow.SessionsAsyncClient.session_path(project=PROJECT_ID, session=session_id)
+
+
 async def analyze_sentiment(session_id: str, text: str, language_code: str = 'ja'):
     """
     Dialogflow ESを使用して、指定されたテキストの感情分析を非同期で実行します。
+    クライアントはエンドポイントごとに共有しているので、呼び出しごとの接続コストはかかりません。
 
     Args:
         session_id (str): 会話を識別するためのユニークなセッションID。
@@ -48,28 +108,8 @@ async def analyze_sentiment(session_id: str, text: str, language_code: str = 'ja
         return None
 
     try:
-        # --- リージョンに基づいてクライアントオプションとセッションパスを設定 ---
-        client_options_instance = None
-        session_path = ""
-        if DIALOGFLOW_LOCATION:
-            # ★★★★★ ここからがマジで超重要！ ★★★★★
-            # 1. リージョンを指定するための設定を作成
-            api_endpoint = f"{DIALOGFLOW_LOCATION}-dialogflow.googleapis.com"
-            client_options_instance = ClientOptions(api_endpoint=api_endpoint)
-            logger.info(f"Dialogflowのリージョンエンドポイントを明示的に設定します: {api_endpoint}")
-            
-            # 2. リージョン設定を使ってクライアントを初期化
-            session_client = dialogflow.SessionsAsyncClient(client_options=client_options_instance)
-
-            # 3. セッションパスを【手動で】構築する (v2ライブラリのヘルパーはlocation非対応のため)
-            session_path = f"projects/{PROJECT_ID}/locations/{DIALOGFLOW_LOCATION}/agent/sessions/{session_id}"
-            # ★★★★★ ここまでがマジで超重要！ ★★★★★
-        else:
-            # グローバルエンドポイント用のフォールバック
-            session_client = dialogflow.SessionsAsyncClient()
-            session_path = session_client.session_path(project=PROJECT_ID, session=session_id)
-            logger.info("Dialogflowのグローバルエンドポイントを使用します。")
-        
+        session_client = get_sessions_client(_api_endpoint())
+        session_path = _session_path(session_id)
         logger.debug(f"Dialogflowセッションパス: {session_path}")
 
         text_input = dialogflow.TextInput(text=text, language_code=language_code)
@@ -83,7 +123,7 @@ async def analyze_sentiment(session_id: str, text: str, language_code: str = 'ja
         )
 
         # --- detect_intent APIを非同期で呼び出し ---
-        logger.info(f"'{text}' の感情分析をリクエスト中...")
+        logger.debug(f"'{text}' の感情分析をリクエスト中...")
         response = await session_client.detect_intent(
             request={
                 "session": session_path,
@@ -91,13 +131,12 @@ async def analyze_sentiment(session_id: str, text: str, language_code: str = 'ja
                 "query_params": query_params,
             }
         )
-        logger.info("感情分析レスポンスを受信しました。")
 
         sentiment_result = response.query_result.sentiment_analysis_result.query_text_sentiment
         score = sentiment_result.score
         magnitude = sentiment_result.magnitude
 
-        logger.info(f"感情分析結果: スコア={score:.2f}, 強度={magnitude:.2f}")
+        logger.debug(f"感情分析結果: スコア={score:.2f}, 強度={magnitude:.2f}")
 
         return {"score": score, "magnitude": magnitude}
 
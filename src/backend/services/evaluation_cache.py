@@ -0,0 +1,156 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+def evaluation_key(model_name: str, generation_config: dict | None, prompt: str) -> str:
+    """モデル名・生成設定・プロンプトから、キャッシュのキー (SHA-256) を作る。"""
+    material = json.dumps(
+        {"model": model_name, "generation_config": generation_config or {}, "prompt": prompt},
+        ensure_ascii=False, sort_keys=True, default=str,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class EvaluationCache:
+    """
+    Geminiの評価結果を、プロンプトの中身 (ハッシュ) をキーにしてキャッシュするよ。
+
+    - メモリ: 件数に上限のある LRU
+    - ディスク (任意): SQLite ファイル。プロセスを再起動しても、同じ評価をやり直さなくていい。
+      読み書き (commit の fsync を含む) は asyncio.to_thread で回すので、イベントループは止めない
+    - ttl_seconds を過ぎた結果は使わない (None なら無期限)
+    - 値は JSON 文字列で持って、取り出すたびに新しい dict を返す (呼び出し側が書き換えても大丈夫)
+    - エラーの結果はキャッシュしない
+    """
+
+    def __init__(self, max_entries: int = 256, sqlite_path: str | None = None,
+                 ttl_seconds: float | None = None, clock: Callable[[], float] = time.time):
+        """
+        Args:
+            max_entries (int): メモリに置いておく件数。0 ならメモリには置かない (ディスクだけ)。
+            sqlite_path (str | None): ディスクのキャッシュファイル。None ならメモリだけ。
+            ttl_seconds (float | None): 結果の有効期限 (秒)。
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        # SQLite の接続はワーカースレッドから使うので、メモリ側とは別のロックで守る
+        # (ディスクの読み書き中に、イベントループ側がメモリのロックで待たされないように)
+        self._db_lock = threading.Lock()
+        self._db = None
+        if sqlite_path:
+            os.makedirs(os.path.dirname(os.path.abspath(sqlite_path)), exist_ok=True)
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS evaluations (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.commit()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": self.hit_ratio,
+        }
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl_seconds is not None and self.clock() - created > self.ttl_seconds
+
+    async def get(self, key: str) -> dict | None:
+        """キャッシュされた結果を返す (なければ None)。メモリになければディスクを別スレッドで見る。"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[0]):
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None and self._db is not None:
+            row = await asyncio.to_thread(self._load, key)
+            if row is not None and not self._expired(row[0]):
+                entry = (row[0], row[1])
+                with self._lock:
+                    self._remember(key, entry)
+                self.disk_hits += 1
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(entry[1])
+
+    async def put(self, key: str, result: dict):
+        """結果を保存する (エラーの結果は保存しない)。ディスクへの書き込みは別スレッドで行う。"""
+        if not result or "error" in result:
+            return
+        entry = (self.clock(), json.dumps(result, ensure_ascii=False))
+        with self._lock:
+            self._remember(key, entry)
+        if self._db is not None:
+            await asyncio.to_thread(self._store, key, entry)
+
+    def _load(self, key: str) -> tuple[float, str] | None:
+        with self._db_lock:
+            if self._db is None:
+                return None
+            return self._db.execute("SELECT created, value FROM evaluations WHERE key = ?", (key,)).fetchone()
+
+    def _store(self, key: str, entry: tuple[float, str]):
+        with self._db_lock:
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO evaluations (key, value, created) VALUES (?, ?, ?)",
+                    (key, entry[1], entry[0]),
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"評価キャッシュをディスクに書き込めませんでした (メモリには残っています): {e}")
+
+    def _remember(self, key: str, entry: tuple[float, str]):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def purge_expired(self) -> int:
+        """期限切れの結果をディスクから消して、消した件数を返す。"""
+        if self._db is None or self.ttl_seconds is None:
+            return 0
+        with self._db_lock:
+            cursor = self._db.execute("DELETE FROM evaluations WHERE created < ?", (self.clock() - self.ttl_seconds,))
+            self._db.commit()
+            return cursor.rowcount
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
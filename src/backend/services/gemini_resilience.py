@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import random
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+
+import numpy as np
+from google.api_core import exceptions as google_exceptions
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# やり直せば通る可能性があるエラー (429 / 503 / 期限切れ)
+RETRYABLE_ERRORS = (
+    google_exceptions.TooManyRequests,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+)
+
+
+class EvaluationDeadlineExceeded(TimeoutError):
+    """評価全体の期限内に結果が得られなかったときのエラー。"""
+
+
+class ResilientCaller:
+    """
+    Geminiの呼び出しを、評価全体の期限 (deadline) の中でやり直したり、ヘッジしたりするよ。
+
+    - RETRYABLE_ERRORS のときだけ、ジッター付きの指数バックオフでやり直す
+      (待ち時間が残りの期限を超えるなら、待たずにあきらめる)
+    - hedge が有効なら、1回目が p95 のレイテンシまでに返ってこないとき、2本目のリクエストを投げて
+      先に成功したほうを使う (もう片方はキャンセル)。p95 は、ヘッジ対象 (hedge=True) の呼び出しが
+      成功したときのレイテンシだけから学習する (ストリームを開くだけのような速い呼び出しを混ぜると、p95 が下がりすぎる)
+    """
+
+    def __init__(self, deadline_seconds: float = 45.0, max_attempts: int = 3,
+                 base_delay: float = 0.5, max_delay: float = 8.0,
+                 hedge: bool = True, hedge_quantile: float = 95.0, hedge_min_samples: int = 10,
+                 hedge_after_seconds: float | None = None, retryable: tuple = RETRYABLE_ERRORS,
+                 rng: random.Random | None = None):
+        """
+        Args:
+            deadline_seconds (float): 1回の評価 (やり直しを含む) にかけていい時間。
+            max_attempts (int): 最大の試行回数。
+            base_delay (float): バックオフの最初の待ち時間 (秒)。
+            max_delay (float): バックオフの待ち時間の上限 (秒)。
+            hedge (bool): ヘッジするか。
+            hedge_quantile (float): ヘッジを投げるまで待つレイテンシのパーセンタイル。
+            hedge_min_samples (int): これだけレイテンシがたまるまでは hedge_after_seconds を使う。
+            hedge_after_seconds (float | None): 学習前にヘッジを投げるまでの秒数 (None なら学習するまでヘッジしない)。
+        """
+        self.deadline_seconds = deadline_seconds
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_after_seconds = hedge_after_seconds
+        self.retryable = retryable
+        self.rng = rng or random.Random()
+        self._latencies = deque(maxlen=200)
+        self.calls = 0
+        self.attempts = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.deadline_exceeded = 0
+
+    @property
+    def hedge_delay(self) -> float | None:
+        """ヘッジを投げるまで待つ秒数 (ヘッジしないなら None)。"""
+        if not self.hedge:
+            return None
+        if len(self._latencies) >= self.hedge_min_samples:
+            return float(np.percentile(self._latencies, self.hedge_quantile))
+        return self.hedge_after_seconds
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "deadline_exceeded": self.deadline_exceeded,
+            "hedge_delay": self.hedge_delay,
+        }
+
+    async def call(self, request: Callable[[], Awaitable[T]], deadline_seconds: float | None = None,
+                   hedge: bool = True) -> T:
+        """
+        request() を期限内で (必要ならやり直して) 実行して、結果を返す。
+
+        Raises:
+            EvaluationDeadlineExceeded: 期限内に成功しなかったとき。
+            Exception: やり直しても通らないエラーは、そのまま投げる。
+        """
+        loop = asyncio.get_running_loop()
+        if deadline_seconds is None:
+            deadline_seconds = self.deadline_seconds
+        deadline = loop.time() + deadline_seconds
+        self.calls += 1
+        attempt = 0
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                self.deadline_exceeded += 1
+                raise EvaluationDeadlineExceeded(f"評価の期限 ({deadline_seconds:.1f}秒) を過ぎました")
+            attempt += 1
+            try:
+                return await asyncio.wait_for(self._attempt(request, hedge), remaining)
+            except asyncio.TimeoutError:
+                self.deadline_exceeded += 1
+                raise EvaluationDeadlineExceeded(f"評価の期限 ({deadline_seconds:.1f}秒) を過ぎました") from None
+            except self.retryable as e:
+                # フルジッターの指数バックオフ。残りの期限を超えて待つなら、あきらめる
+                delay = self.rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+                if attempt >= self.max_attempts or loop.time() + delay >= deadline:
+                    logger.error(f"😱 Gemini呼び出しをあきらめます ({attempt}回目): {e}")
+                    raise
+                self.retries += 1
+                logger.warning(f"⚠️ Gemini呼び出しが失敗したので、{delay:.2f}秒後にやり直します ({attempt}回目): {e}")
+                await asyncio.sleep(delay)
+
+    async def _attempt(self, request: Callable[[], Awaitable[T]], hedge: bool) -> T:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        tasks = {asyncio.ensure_future(request())}
+        self.attempts += 1
+        hedge_delay = self.hedge_delay if hedge else None
+        primary = next(iter(tasks))
+        try:
+            if hedge_delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+                if not done:
+                    # p95 を過ぎても返ってこないので、2本目を投げる
+                    tasks.add(asyncio.ensure_future(request()))
+                    self.hedges += 1
+                    logger.info(f"🪝 Gemini呼び出しが{hedge_delay:.2f}秒を過ぎたので、ヘッジのリクエストを投げます。")
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        if hedge:
+                            self._latencies.append(loop.time() - started)
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
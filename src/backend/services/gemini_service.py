@@ -2,18 +2,34 @@ import os
 import json
 import logging
 import re
+import sqlite3
 import vertexai
 from vertexai.generative_models import GenerativeModel, HarmCategory, HarmBlockThreshold, Part
 from deepeval.metrics import GEval
 from deepeval.test_case import LLMTestCase, LLMTestCaseParams
 from deepeval.models.base_model import DeepEvalBaseLLM
 import asyncio
-from tenacity import retry, stop_after_attempt, wait_random_exponential
+import copy
 from google.api_core import exceptions as google_exceptions
+from backend.services.json_stream import JsonStreamParser
+from backend.services.evaluation_cache import EvaluationCache, evaluation_key
+from backend.services.gemini_resilience import ResilientCaller
+from backend.services.meta_evaluation import MetaEvaluationQueue
 
 # ロガー設定
 logger = logging.getLogger(__name__)
 
+# STAR評価の項目 (ストリーミング評価では、この順に evaluation_partial で届く)
+STAR_SECTIONS = ("situation", "task", "action", "result")
+
+
+class _EvaluationContext(dict):
+    """PROMPT_TEMPLATE に埋め込むコンテキスト。渡されなかった項目は "N/A" にするよ。"""
+
+    def __missing__(self, key):
+        return "N/A"
+
+
 # --- deepeval用のVertexAIラッパークラス ---
 class VertexAI(DeepEvalBaseLLM):
     """
@@ -117,8 +133,11 @@ PROMPT_TEMPLATE = """
 ### （参考）音声分析データ:
 - 平均ピッチ: {average_pitch} Hz
 - ピッチ変動: {pitch_variation} Hz
+- ピッチ範囲: {pitch_min} 〜 {pitch_max} Hz
+- ピッチ分布 (10/50/90パーセンタイル): {pitch_p10} / {pitch_p50} / {pitch_p90} Hz
 - 主な感情: {dominant_emotion}
-- 感情スコア: {emotion_score}
+- 感情スコア: {emotion_score} (強度: {emotion_magnitude})
+- 感情の内訳 (話した時間の割合): {emotion_breakdown}
 
 ## 評価基準（STARメソッド）
 
@@ -198,6 +217,11 @@ class GeminiService:
         self.deepeval_model_instance = None
         self.gemini_config = {}
         self.star_metrics = {}
+        self.model_name = None
+        self.generation_config = {}
+        self.evaluation_cache = None
+        self.resilience = ResilientCaller()
+        self.meta_evaluation = None
         try:
             if os.path.exists(GEMINI_CONFIG_PATH):
                 with open(GEMINI_CONFIG_PATH, 'r', encoding='utf-8') as f:
@@ -211,6 +235,10 @@ class GeminiService:
 
             if not project_id:
                 raise ValueError("GCPプロジェクトIDが設定されていません。")
+            self.model_name = model_name
+            self.generation_config = self.gemini_config.get("generation_config", {})
+            self.evaluation_cache = self._create_evaluation_cache()
+            self.resilience = self._create_resilient_caller()
 
             # Vertex AIを正しく初期化
             vertexai.init(project=project_id, location=location)
@@ -222,12 +250,86 @@ class GeminiService:
             # DeepEval関連の初期化
             self.deepeval_model_instance = VertexAI(project=project_id, location=location, model_name=model_name)
             self._initialize_deepeval_metrics()
+            self.meta_evaluation = self._create_meta_evaluation_queue()
 
         except Exception as e:
             logger.error(f"❌ Vertex AI Gemini の初期化中に致命的なエラー: {e}", exc_info=True)
             # アプリケーションが起動しないように例外を再送出
             raise
 
+    def _create_evaluation_cache(self) -> EvaluationCache | None:
+        """
+        同じプロンプトの評価をやり直さないためのキャッシュを作る。
+        sqlite_path (環境変数 EVALUATION_CACHE_PATH で上書き可) を指定すると、ディスクにも残すよ。
+        """
+        cache_config = self.gemini_config.get("evaluation_cache", {}) or {}
+        if not cache_config.get("enabled", True):
+            logger.info("評価キャッシュは無効になっています。")
+            return None
+        sqlite_path = os.getenv("EVALUATION_CACHE_PATH") or cache_config.get("sqlite_path")
+        if sqlite_path and not os.path.isabs(sqlite_path):
+            sqlite_path = os.path.join(PROJECT_ROOT, sqlite_path)
+        try:
+            cache = EvaluationCache(
+                max_entries=int(cache_config.get("max_entries", 256)),
+                sqlite_path=sqlite_path,
+                ttl_seconds=cache_config.get("ttl_seconds"),
+            )
+        except sqlite3.Error as e:
+            logger.error(f"評価キャッシュのファイルを開けなかったので、メモリだけで使います: {e}")
+            cache = EvaluationCache(max_entries=int(cache_config.get("max_entries", 256)),
+                                    ttl_seconds=cache_config.get("ttl_seconds"))
+        logger.info(f"🗃️ 評価キャッシュを用意しました (ディスク: {sqlite_path or 'なし'})")
+        return cache
+
+    def _create_resilient_caller(self) -> ResilientCaller:
+        """評価全体の期限・やり直し・ヘッジの設定を読み込む。"""
+        resilience_config = self.gemini_config.get("resilience", {}) or {}
+        return ResilientCaller(
+            deadline_seconds=float(resilience_config.get("deadline_seconds", 45.0)),
+            max_attempts=int(resilience_config.get("max_attempts", 3)),
+            base_delay=float(resilience_config.get("base_delay_seconds", 0.5)),
+            max_delay=float(resilience_config.get("max_delay_seconds", 8.0)),
+            hedge=bool(resilience_config.get("hedge", True)),
+            hedge_quantile=float(resilience_config.get("hedge_quantile", 95.0)),
+            hedge_after_seconds=resilience_config.get("hedge_after_seconds"),
+        )
+
+    def _create_meta_evaluation_queue(self) -> MetaEvaluationQueue | None:
+        """
+        DeepEvalのメタ評価を裏で回すキューを作る (デフォルトは無効)。
+        メトリクス1つがGeminiへの呼び出し1回なので、サンプリングと同時実行数でコストを抑えるよ。
+        """
+        meta_config = self.gemini_config.get("meta_evaluation", {}) or {}
+        if not meta_config.get("enabled", False) or not self.star_metrics:
+            return None
+        return MetaEvaluationQueue(
+            measure=self._measure_metric,
+            metric_names=list(self.star_metrics),
+            concurrency=int(meta_config.get("concurrency", 2)),
+            max_queue=int(meta_config.get("max_queue", 32)),
+            metric_timeout=float(meta_config.get("metric_timeout_seconds", 30.0)),
+            sample_rate=float(meta_config.get("sample_rate", 0.1)),
+        )
+
+    def submit_meta_evaluation(self, session_id: str, transcript: str, llm_output: dict, on_result) -> bool:
+        """
+        最終評価をメタ評価に回す (待たない)。結果は全メトリクスがそろったら on_result(結果) で届くよ。
+        """
+        if self.meta_evaluation is None:
+            return False
+        return self.meta_evaluation.submit(session_id, transcript, llm_output, on_result)
+
+    async def close(self):
+        """サーバー停止時の片付け (残りのメタ評価を少し待って、キャッシュのファイルを閉じる)。"""
+        if self.meta_evaluation is not None:
+            await self.meta_evaluation.close()
+        if self.evaluation_cache is not None:
+            self.evaluation_cache.close()
+
+    def _cache_key(self, prompt: str) -> str:
+        return evaluation_key(self.model_name, self.generation_config, prompt)
+
     def _initialize_deepeval_metrics(self):
         """
         DeepEvalの評価メトリクスを初期化する。
@@ -270,31 +372,120 @@ class GeminiService:
         }
         logger.info("✅ DeepEvalのSTAR評価メトリクスが初期化されました。")
 
-    @retry(wait=wait_random_exponential(min=1, max=60), stop=stop_after_attempt(3))
-    async def generate_structured_feedback(self, evaluation_context: dict) -> dict:
+    async def generate_structured_feedback(self, evaluation_context: dict, bypass_cache: bool = False,
+                                           deadline_seconds: float | None = None) -> dict:
         """
         【再修正】Vertex AI Gemini API を使ってフィードバックを生成する。
+        同じプロンプトの評価はキャッシュから返すよ (bypass_cache=True なら必ず生成し直す)。
+        429/503/期限切れは評価全体の期限内でやり直し、遅いときはヘッジのリクエストも投げる (ResilientCaller)。
         """
         if not self.gemini_model_instance:
             logger.error("Vertex AIモデルが初期化されていません。フィードバックを生成できません。")
             return {"error": "Vertex AI model not initialized"}
 
-        prompt = PROMPT_TEMPLATE.format(**evaluation_context)
+        prompt = PROMPT_TEMPLATE.format_map(_EvaluationContext(evaluation_context))
+        cache_key = self._cache_key(prompt) if self.evaluation_cache is not None else None
+        if cache_key and not bypass_cache:
+            cached = await self.evaluation_cache.get(cache_key)
+            if cached is not None:
+                logger.info("🗃️ 同じプロンプトの評価がキャッシュにあったので、それを返します。")
+                return cached
         logger.info("Vertex AI Gemini APIにフィードバック生成をリクエストします。")
         
         try:
-            # 正しいVertex AI SDKの非同期呼び出し
-            response = await self.gemini_model_instance.generate_content_async(prompt)
+            # 正しいVertex AI SDKの非同期呼び出し (期限・やり直し・ヘッジ付き)
+            response = await self.resilience.call(
+                lambda: self.gemini_model_instance.generate_content_async(
+                    prompt, generation_config=self.generation_config or None
+                ),
+                deadline_seconds=deadline_seconds,
+            )
             
             logger.info("Vertex AI Gemini APIからのレスポンスを受信しました。")
             
             parsed_data = self._parse_gemini_response_data(response.text)
+            if cache_key:
+                await self.evaluation_cache.put(cache_key, parsed_data)
             return parsed_data
 
         except Exception as e:
             logger.error(f"Vertex AI Gemini APIでのフィードバック生成中にエラー: {e}", exc_info=True)
             return {"error": f"An unexpected error occurred with Vertex AI Gemini API: {e}"}
 
+    async def stream_structured_feedback(self, evaluation_context: dict, on_partial, bypass_cache: bool = False) -> dict:
+        """
+        ストリーミングでフィードバックを生成するよ。
+        STARの各項目 (situation/task/action/result) が閉じた時点で on_partial(項目名, 値) を呼ぶので、
+        全部の生成を待たずに候補者へ見せられる。最後に全文をパースして、整合性をチェックした結果を返す。
+        最初の項目が届く前に失敗したら、通常の generate_structured_feedback にフォールバックする。
+        """
+        if not self.gemini_model_instance:
+            logger.error("Vertex AIモデルが初期化されていません。フィードバックを生成できません。")
+            return {"error": "Vertex AI model not initialized"}
+
+        prompt = PROMPT_TEMPLATE.format_map(_EvaluationContext(evaluation_context))
+        cache_key = self._cache_key(prompt) if self.evaluation_cache is not None else None
+        if cache_key and not bypass_cache:
+            cached = await self.evaluation_cache.get(cache_key)
+            if cached is not None:
+                logger.info("🗃️ 同じプロンプトの評価がキャッシュにあったので、それを返します。")
+                for name in STAR_SECTIONS:
+                    if name in (cached.get("star_evaluation") or {}):
+                        await on_partial(name, cached["star_evaluation"][name])
+                return cached
+        logger.info("Vertex AI Gemini APIにフィードバック生成をストリーミングでリクエストします。")
+
+        parser = JsonStreamParser(max_depth=2)
+        partials = {}
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.resilience.deadline_seconds
+
+        async def consume():
+            # ストリームの開始は期限内でやり直せる (途中まで送った後はやり直せないので、ヘッジはしない)
+            responses = await self.resilience.call(
+                lambda: self.gemini_model_instance.generate_content_async(
+                    prompt, generation_config=self.generation_config or None, stream=True
+                ),
+                hedge=False,
+            )
+            async for response in responses:
+                for path, value in parser.feed(response.text):
+                    if len(path) == 2 and path[0] == "star_evaluation" and path[1] in STAR_SECTIONS:
+                        partials[path[1]] = value
+                        await on_partial(path[1], value)
+
+        try:
+            await asyncio.wait_for(consume(), self.resilience.deadline_seconds)
+        except Exception as e:
+            if partials:
+                logger.error(f"Vertex AI Gemini APIのストリーミング中にエラー: {e!r}", exc_info=True)
+                return {"error": f"An unexpected error occurred with Vertex AI Gemini API: {e!r}"}
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                logger.error("ストリーミングでの生成が評価の期限内に終わりませんでした。")
+                return {"error": "Gemini evaluation exceeded its deadline."}
+            logger.warning(f"ストリーミングでの生成に失敗したので、残りの{remaining:.1f}秒で通常の生成にフォールバックします: {e!r}")
+            return await self.generate_structured_feedback(evaluation_context, bypass_cache=True,
+                                                           deadline_seconds=remaining)
+
+        logger.info(f"Vertex AI Gemini APIからのストリーミングが完了しました (先に送った項目: {len(partials)}件)。")
+        data = self._parse_gemini_response_data(parser.text)
+        if "error" not in data:
+            self._check_partials(data, partials)
+            if cache_key:
+                await self.evaluation_cache.put(cache_key, data)
+        return data
+
+    def _check_partials(self, data: dict, partials: dict):
+        """先に送った項目と最終結果が食い違っていないか、抜けている項目がないかをチェックする。"""
+        star = data.get("star_evaluation") or {}
+        missing = [name for name in STAR_SECTIONS if name not in star]
+        if missing:
+            logger.warning(f"最終評価にSTARの項目が足りません: {missing}")
+        changed = [name for name, value in partials.items() if star.get(name) != value]
+        if changed:
+            logger.warning(f"先に送った項目と最終評価が食い違っています (最終評価を優先します): {changed}")
+
     async def _evaluate_with_deepeval(self, context: dict, llm_output: dict) -> dict:
         """
         DeepEvalを使って、生成されたフィードバックの品質をメタ評価する内部メソッド。
@@ -303,31 +494,29 @@ class GeminiService:
             logger.warning("DeepEvalメトリクスが利用できません。メタ評価をスキップします。")
             return {}
             
+        evaluation_results = {}
+        for name in self.star_metrics:
+            try:
+                evaluation_results[name] = await self._measure_metric(name, context['transcript'], llm_output)
+            except Exception as e:
+                logger.error(f"DeepEval評価 ({name}) でエラーが発生: {e}")
+                evaluation_results[name] = {"score": None, "reason": str(e)}
+        return evaluation_results
+
+    async def _measure_metric(self, name: str, transcript: str, llm_output: dict) -> dict:
+        """
+        DeepEvalのメトリクスを1つ評価する。
+        GEval は結果 (score / reason) をインスタンスに書き込むので、セッションが重なっても混ざらないようにコピーして使うよ。
+        """
         # 評価用のテストケースを作成
         test_case = LLMTestCase(
-            input=context['transcript'],
+            input=transcript,
             actual_output=json.dumps(llm_output, ensure_ascii=False)
         )
-        
-        evaluation_results = {}
-        tasks = []
-        for name, metric in self.star_metrics.items():
-            async def measure_metric(metric_name, metric_instance):
-                try:
-                    await metric_instance.a_measure_async(test_case)
-                    evaluation_results[metric_name] = {
-                        "score": metric_instance.score,
-                        "reason": metric_instance.reason
-                    }
-                    logger.info(f"DeepEval評価 ({metric_name}): Score={metric_instance.score}")
-                except Exception as e:
-                    logger.error(f"DeepEval評価 ({metric_name}) でエラーが発生: {e}")
-                    evaluation_results[metric_name] = {"score": None, "reason": str(e)}
-            
-            tasks.append(measure_metric(name, metric))
-        
-        await asyncio.gather(*tasks)
-        return evaluation_results
+        metric_instance = copy.copy(self.star_metrics[name])
+        await metric_instance.a_measure(test_case, _show_indicator=False)
+        logger.info(f"DeepEval評価 ({name}): Score={metric_instance.score}")
+        return {"score": metric_instance.score, "reason": metric_instance.reason}
 
     def _parse_gemini_response_data(self, response_text: str) -> dict:
         """
@@ -0,0 +1,106 @@
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class JsonStreamParser:
+    """
+    ストリーミングで少しずつ届くJSONテキストを、届いたぶんだけ読み進めるパーサーだよ。
+
+    - feed() に断片を渡すと、その断片で閉じたオブジェクト/配列を (パス, 値) のリストで返す
+      パスはルートからのキー (配列なら添字) のタプル。例: ("star_evaluation", "situation")
+    - 文字は1回しか走査しない (閉じたコンテナだけ json.loads する)
+    - 最初の "{" より前 (```json のようなマークダウン) と、ルートが閉じた後ろは読み飛ばす
+    - max_depth を指定すると、それより深いコンテナは値を作らない (パースの手間を省ける)
+    """
+
+    def __init__(self, max_depth: int | None = None):
+        self.max_depth = max_depth
+        self._text = ""
+        self._pos = 0
+        self._stack: list[dict] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self.started = False
+        self.done = False
+
+    @property
+    def text(self) -> str:
+        """これまでに受け取ったテキスト全体。"""
+        return self._text
+
+    def feed(self, chunk: str) -> list[tuple[tuple, object]]:
+        """断片を追加して、新しく閉じたコンテナを (パス, 値) で返す。"""
+        self._text += chunk
+        completed = []
+        text = self._text
+        while self._pos < len(text) and not self.done:
+            char = text[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._on_string_end()
+            elif not self.started:
+                if char == "{":
+                    self.started = True
+                    self._open("{")
+            elif char == '"':
+                self._in_string = True
+                self._string_start = self._pos
+            elif char in "{[":
+                self._open(char)
+            elif char in "}]":
+                item = self._close()
+                if item is not None:
+                    completed.append(item)
+            elif char == "," and self._stack:
+                frame = self._stack[-1]
+                if frame["type"] == "{":
+                    frame["key"] = None
+                else:
+                    frame["index"] += 1
+            self._pos += 1
+        return completed
+
+    def _child_path(self) -> tuple:
+        if not self._stack:
+            return ()
+        frame = self._stack[-1]
+        child = frame["key"] if frame["type"] == "{" else frame["index"]
+        return frame["path"] + (child,)
+
+    def _open(self, kind: str):
+        self._stack.append({
+            "type": kind,
+            "start": self._pos,
+            "path": self._child_path(),
+            "key": None,  # オブジェクトの今のキー
+            "index": 0,   # 配列の今の添字
+        })
+
+    def _close(self) -> tuple[tuple, object] | None:
+        frame = self._stack.pop()
+        if not self._stack:
+            self.done = True
+        if self.max_depth is not None and len(frame["path"]) > self.max_depth:
+            return None
+        try:
+            value = json.loads(self._text[frame["start"]:self._pos + 1])
+        except json.JSONDecodeError as e:
+            logger.debug(f"ストリーム中のJSONの一部を読めませんでした ({frame['path']}): {e}")
+            return None
+        return frame["path"], value
+
+    def _on_string_end(self):
+        """オブジェクトの中でキーの位置に来た文字列なら、キーとして覚えておく。"""
+        if not self._stack:
+            return
+        frame = self._stack[-1]
+        if frame["type"] == "{" and frame["key"] is None:
+            frame["key"] = json.loads(self._text[self._string_start:self._pos + 1])
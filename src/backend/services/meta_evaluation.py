@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import random
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class MetaEvaluationQueue:
+    """
+    最終評価の品質チェック (DeepEval のメタ評価) を、最終評価の送信とは関係なく裏で実行するキューだよ。
+
+    - プロセス全体で1つのワーカープールを共有して、同時に走るメトリクスの数を concurrency で抑える
+      (1セッションで4メトリクス = Geminiへの呼び出し4回なので、セッションが重なっても増えすぎないように)
+    - メトリクスごとに metric_timeout 秒でタイムアウト
+    - sample_rate の割合のセッションだけを評価する (0.1 なら10%)
+    - 全メトリクスがそろったら on_result(結果) を呼ぶ。final_evaluation を待たせることは絶対にない
+    - キューがいっぱいなら、一番古いセッションのメトリクスを捨てる
+    """
+
+    def __init__(self, measure: Callable[[str, str, dict], Awaitable[dict]], metric_names: list[str],
+                 concurrency: int = 2, max_queue: int = 32, metric_timeout: float = 30.0,
+                 sample_rate: float = 0.1, rng: random.Random | None = None):
+        """
+        Args:
+            measure (Callable[[str, str, dict], Awaitable[dict]]): 1メトリクスを評価する関数 (メトリクス名, 文字起こし, 評価結果)。
+            metric_names (list[str]): 評価するメトリクスの名前。
+            concurrency (int): プロセス全体で同時に実行するメトリクスの数。
+            max_queue (int): 実行待ちにしておけるメトリクスの数。
+            metric_timeout (float): 1メトリクスのタイムアウト (秒)。
+            sample_rate (float): メタ評価するセッションの割合 (0〜1)。
+        """
+        if concurrency < 1:
+            raise ValueError(f"concurrency は1以上である必要があります: {concurrency}")
+        self.measure = measure
+        self.metric_names = list(metric_names)
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.metric_timeout = metric_timeout
+        self.sample_rate = sample_rate
+        self.rng = rng or random.Random()
+        self._queue: asyncio.Queue | None = None
+        self._workers = []
+        self._deliveries: set[asyncio.Task] = set()
+        self.submitted = 0
+        self.sampled_out = 0
+        self.completed = 0
+        self.timeouts = 0
+        self.failed = 0
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    def stats(self) -> dict:
+        return {
+            "submitted": self.submitted,
+            "sampled_out": self.sampled_out,
+            "completed": self.completed,
+            "timeouts": self.timeouts,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "pending": self._queue.qsize() if self._queue else 0,
+        }
+
+    def _start(self):
+        """最初の submit のときに、今のイベントループでワーカーを起動する。"""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    def submit(self, session_id: str, transcript: str, llm_output: dict,
+               on_result: Callable[[dict], Awaitable[None]]) -> bool:
+        """
+        セッションの評価結果をメタ評価に回す (待たない)。
+
+        Returns:
+            bool: 積めたら True。サンプリングで外れた、またはメトリクスがないなら False。
+        """
+        if not self.metric_names:
+            return False
+        if self.rng.random() >= self.sample_rate:
+            self.sampled_out += 1
+            return False
+        self._start()
+        job = {
+            "session_id": session_id,
+            "transcript": transcript,
+            "llm_output": llm_output,
+            "on_result": on_result,
+            "results": {},
+            "remaining": len(self.metric_names),
+        }
+        for name in self.metric_names:
+            if self._queue.full():
+                dropped_job, dropped_name = self._queue.get_nowait()
+                self._queue.task_done()
+                self.dropped += 1
+                logger.warning(f"⚠️ メタ評価が追いつかないので、古いセッションのメトリクスをスキップしました: {dropped_name}")
+                self._finish_metric(dropped_job, dropped_name, {"score": None, "reason": "skipped"})
+            self._queue.put_nowait((job, name))
+        self.submitted += 1
+        logger.info(f"🧪 セッション {session_id} の評価をメタ評価に回しました ({len(self.metric_names)}メトリクス)")
+        return True
+
+    async def _worker(self):
+        while True:
+            job, name = await self._queue.get()
+            try:
+                try:
+                    result = await asyncio.wait_for(
+                        self.measure(name, job["transcript"], job["llm_output"]), self.metric_timeout
+                    )
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+                    logger.warning(f"⏱️ メタ評価 ({name}) がタイムアウトしました ({self.metric_timeout:.0f}秒)")
+                    result = {"score": None, "reason": "timeout"}
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.failed += 1
+                    logger.error(f"メタ評価 ({name}) でエラーが発生: {e}")
+                    result = {"score": None, "reason": str(e)}
+                self._finish_metric(job, name, result)
+            finally:
+                self._queue.task_done()
+
+    def _finish_metric(self, job: dict, name: str, result: dict):
+        job["results"][name] = result
+        job["remaining"] -= 1
+        if job["remaining"] == 0:
+            self.completed += 1
+            task = asyncio.create_task(self._deliver(job))
+            self._deliveries.add(task)
+            task.add_done_callback(self._deliveries.discard)
+
+    async def _deliver(self, job: dict):
+        try:
+            await job["on_result"]({"session_id": job["session_id"], "metrics": job["results"]})
+        except Exception as e:
+            logger.warning(f"メタ評価の結果を届けられませんでした (セッション {job['session_id']}): {e}")
+
+    async def close(self, timeout: float | None = 10.0):
+        """残りのメタ評価を (timeout 秒まで) 待ってから、ワーカーを止める。"""
+        if not self._workers:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⏱️ メタ評価の完了待ちがタイムアウトしました (残り: {self._queue.qsize()}件)")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        # 結果を届けている途中のものも待つ
+        if self._deliveries:
+            await asyncio.gather(*self._deliveries, return_exceptions=True)
+        logger.info(f"🧪 メタ評価: {self.stats()}")
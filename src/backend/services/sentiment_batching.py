@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import re
+import unicodedata
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+# 文の区切りとみなす文字
+SENTENCE_BOUNDARIES = "。！？!?"
+
+
+class SentenceBatcher:
+    """
+    STTの確定結果 (短い断片のことが多い) を、文の区切りまでためてから1文ずつ出すよ。
+
+    - 「。！？」が来たら、そこまでを1文として emit(segment_id, 文) する
+    - 区切りが来ないまま timeout 秒たったら、たまっている分を1文として出す (話しっぱなしでも遅れすぎない)
+    - segment_id はその文の最後の断片の番号
+    """
+
+    def __init__(self, emit: Callable[[int, str], object], timeout: float = 1.5,
+                 boundaries: str = SENTENCE_BOUNDARIES, max_chars: int = 200):
+        """
+        Args:
+            emit (Callable[[int, str], object]): 1文そろったときに呼ばれる関数 (segment_id, 文)。
+            timeout (float): 区切りが来なくても出してしまうまでの秒数。
+            boundaries (str): 文の区切りとみなす文字。
+            max_chars (int): これより長くたまったら、区切りがなくても出す。
+        """
+        self.emit = emit
+        self.timeout = timeout
+        self.max_chars = max_chars
+        self._pattern = re.compile(f"[^{re.escape(boundaries)}]*[{re.escape(boundaries)}]+")
+        self._buffer = ""
+        self._last_segment_id = None
+        self._timer = None
+        self.fragments = 0
+        self.sentences = 0
+
+    def add(self, segment_id: int, text: str):
+        """確定した断片を1つ追加する。"""
+        text = text.strip()
+        if not text:
+            return
+        self.fragments += 1
+        self._buffer += text
+        self._last_segment_id = segment_id
+        end = 0
+        for match in self._pattern.finditer(self._buffer):
+            self._emit(match.group().strip())
+            end = match.end()
+        self._buffer = self._buffer[end:].lstrip()
+        if len(self._buffer) >= self.max_chars:
+            self.flush()
+        elif self._buffer:
+            self._restart_timer()
+        else:
+            self._cancel_timer()
+
+    def flush(self):
+        """たまっている分を (区切りがなくても) 1文として出す。"""
+        self._cancel_timer()
+        if self._buffer:
+            self._emit(self._buffer)
+            self._buffer = ""
+
+    def _emit(self, sentence: str):
+        if sentence:
+            self.sentences += 1
+            self.emit(self._last_segment_id, sentence)
+
+    def _restart_timer(self):
+        self._cancel_timer()
+        self._timer = asyncio.get_running_loop().call_later(self.timeout, self.flush)
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+
+def normalize_text(text: str) -> str:
+    """キャッシュのキー用に正規化する (全角/半角をそろえて、空白を除いて、小文字に)。"""
+    return re.sub(r"\s+", "", unicodedata.normalize("NFKC", text)).lower()
+
+
+class SentimentCache:
+    """
+    正規化したテキスト → 感情分析の結果 の LRU キャッシュだよ。
+
+    「よろしくお願いします。」みたいな定型文は候補者をまたいで何度も出てくるので、
+    プロセス全体で共有して Dialogflow の呼び出しを減らす。同じ文を同時に分析しようとしたら、1回の呼び出しを待ち合わせる。
+    失敗 (None) はキャッシュしないよ。
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, text: str) -> dict | None:
+        key = normalize_text(text)
+        result = self._entries.get(key)
+        if result is not None:
+            self._entries.move_to_end(key)
+        return result
+
+    def put(self, text: str, result: dict):
+        if self.maxsize <= 0:
+            return
+        key = normalize_text(text)
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def wrap(self, analyze: Callable[[str], Awaitable[dict | None]]) -> Callable[[str], Awaitable[dict | None]]:
+        """analyze(text) の前にキャッシュを挟んだ関数を返す。"""
+
+        async def cached(text: str) -> dict | None:
+            key = normalize_text(text)
+            result = self.get(text)
+            if result is not None:
+                self.hits += 1
+                return result
+            if key in self._in_flight:
+                self.hits += 1
+                return await asyncio.shield(self._in_flight[key])
+            self.misses += 1
+            future = asyncio.get_running_loop().create_future()
+            self._in_flight[key] = future
+            try:
+                result = await analyze(text)
+                if result is not None:
+                    self.put(text, result)
+                future.set_result(result)
+                return result
+            except BaseException:
+                future.set_result(None)  # 待ち合わせている側は失敗扱い (None) にする
+                raise
+            finally:
+                del self._in_flight[key]
+
+        return cached
+
+
+# --- プロセス全体で共有するキャッシュ ---
+_cache: SentimentCache | None = None
+
+
+def get_sentiment_cache(maxsize: int = 1024) -> SentimentCache:
+    """プロセス全体で共有する感情分析キャッシュを返す (初回に maxsize で作る)。"""
+    global _cache
+    if _cache is None:
+        _cache = SentimentCache(maxsize=maxsize)
+    return _cache
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class SentimentPipeline:
+    """
+    確定した文字起こしの断片を、STTのループとは別のタスクで感情分析するステージだよ。
+
+    - submit() はキューに積むだけなので、STTのループは感情分析を一切待たない
+    - concurrency 個のワーカーが並行して analyze() を呼ぶ (Dialogflowの遅延が重なっても詰まらない)
+    - 結果は segment_id 付きで on_result() に渡すので、完了の順番が入れ替わっても大丈夫
+    - キューがいっぱいなら一番古い断片を捨てて、新しい断片を優先する
+    """
+
+    def __init__(self, analyze: Callable[[str], Awaitable[dict | None]],
+                 on_result: Callable[[int, str, dict], Awaitable[None]],
+                 concurrency: int = 4, max_queue: int = 64):
+        """
+        Args:
+            analyze (Callable[[str], Awaitable[dict | None]]): テキストを感情分析する関数。
+            on_result (Callable[[int, str, dict], Awaitable[None]]): 結果を受け取る関数 (segment_id, テキスト, 結果)。
+            concurrency (int): 同時に実行する感情分析の数。
+            max_queue (int): 分析待ちにしておける断片の数。
+        """
+        if concurrency < 1:
+            raise ValueError(f"concurrency は1以上である必要があります: {concurrency}")
+        self.analyze = analyze
+        self.on_result = on_result
+        self.concurrency = concurrency
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._workers = []
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    @property
+    def pending(self) -> int:
+        """まだ分析が終わっていない断片の数 (実行中を含む)。"""
+        return self.submitted - self.completed - self.failed - self.dropped
+
+    def start(self):
+        """ワーカーを起動する。"""
+        if self._workers:
+            return
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.concurrency)]
+
+    def submit(self, segment_id: int, text: str) -> bool:
+        """
+        断片を分析待ちに積む (待たない)。
+
+        Returns:
+            bool: 積めたら True。分析する必要のないテキストなら False。
+        """
+        if len(text.strip()) <= 1:  # 1文字以下は分析しない
+            return False
+        if self._queue.full():
+            self._queue.get_nowait()
+            self._queue.task_done()
+            self.dropped += 1
+            logger.warning(f"⚠️ 感情分析が追いつかないので、古い断片を1つスキップしました (累計: {self.dropped})")
+        self._queue.put_nowait((segment_id, text))
+        self.submitted += 1
+        return True
+
+    async def _worker(self, index: int):
+        while True:
+            segment_id, text = await self._queue.get()
+            try:
+                logger.info(f"🤖 感情分析をリクエスト (断片 #{segment_id}): '{text}'")
+                result = await self.analyze(text)
+                if result:
+                    await self.on_result(segment_id, text, result)
+                self.completed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"感情分析の呼び出しでエラーが発生しましたが、処理を続行します (断片 #{segment_id}): {e}")
+            finally:
+                self._queue.task_done()
+
+    async def close(self, timeout: float | None = 5.0):
+        """
+        残りの断片の分析を (timeout 秒まで) 待ってから、ワーカーを止める。
+        """
+        if not self._workers:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⏱️ 感情分析の完了待ちがタイムアウトしました (残り: {self.pending}件)")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info(
+            f"🎭 感情分析: {self.submitted}件 (完了 {self.completed}, 失敗 {self.failed}, スキップ {self.dropped})"
+        )
@@ -0,0 +1,165 @@
+# このモジュールは NumPy ライブラリに依存しています。
+
+import logging
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 感情スコア (-1〜1) のバケツ。境界は Dialogflow のドキュメントの目安に合わせているよ
+EMOTION_BUCKETS = ("ネガティブ", "ニュートラル", "ポジティブ")
+_NEUTRAL_RANGE = (-0.25, 0.25)
+
+
+class _Column:
+    """倍々で伸びる型付きの配列 (append は償却 O(1))。"""
+
+    def __init__(self, dtype, initial_capacity: int = 256):
+        self._data = np.empty(initial_capacity, dtype=dtype)
+        self.size = 0
+
+    def append(self, value):
+        if self.size == self._data.size:
+            grown = np.empty(2 * self._data.size, dtype=self._data.dtype)
+            grown[:self.size] = self._data[:self.size]
+            self._data = grown
+        self._data[self.size] = value
+        self.size += 1
+
+    def clear(self):
+        self.size = 0
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._data[:self.size]
+
+
+class SessionTimeline:
+    """
+    1セッションぶんの時系列データを、型付きの列 (NumPy配列) で持つタイムラインだよ。
+
+    - ピッチ: 時刻 / Hz (PitchContourTracker のなめらかな点)
+    - 文字起こしの断片: 確定した時刻 / 全文の中での文字オフセット
+    - 感情: 時刻 / スコア / 強度 / 断片の番号
+    追加はどれも O(1)。感情の時間加重平均とバケツごとの時間も追加のたびに更新するので、
+    evaluation_summary() はセッションの長さに関係なく一瞬で返せる！
+    時刻はセッション開始からの秒数で持つよ。
+    """
+
+    def __init__(self, separator_length: int = 1):
+        """
+        Args:
+            separator_length (int): 文字起こしの断片をつなぐ区切り文字の長さ (TranscriptSegments と揃える)。
+        """
+        self.separator_length = separator_length
+        self.pitch_time = _Column(np.float64)
+        self.pitch_hz = _Column(np.float32)
+        self.segment_time = _Column(np.float64)
+        self.segment_char_offset = _Column(np.int32)
+        self.sentiment_time = _Column(np.float64)
+        self.sentiment_score = _Column(np.float32)
+        self.sentiment_magnitude = _Column(np.float32)
+        self.sentiment_segment = _Column(np.int32)
+        self.reset()
+
+    def reset(self, start_time: float | None = None):
+        """新しいセッション用に空っぽにする (確保済みの配列は再利用するよ)。"""
+        self.start_time = time.time() if start_time is None else start_time
+        for column in (self.pitch_time, self.pitch_hz, self.segment_time, self.segment_char_offset,
+                       self.sentiment_time, self.sentiment_score, self.sentiment_magnitude, self.sentiment_segment):
+            column.clear()
+        self._text_length = 0
+        # 感情分析に回した文の区間: 最後の断片の番号 → (開始, 終了) 秒
+        self._sentence_spans: dict[int, tuple[float, float]] = {}
+        self._last_sentence_end = 0.0
+        # 感情の逐次集計
+        self._weighted_score = 0.0
+        self._weighted_magnitude = 0.0
+        self._total_weight = 0.0
+        self._bucket_seconds = np.zeros(len(EMOTION_BUCKETS))
+
+    def _offset(self, timestamp: float | None) -> float:
+        return (time.time() if timestamp is None else timestamp) - self.start_time
+
+    # --- 追加 ---
+
+    def add_pitch_points(self, points: list[dict]):
+        """ピッチ輪郭の点 [{"pitch": Hz, "timestamp": UNIX秒}, ...] を追加する。"""
+        for point in points:
+            self.pitch_time.append(point["timestamp"] - self.start_time)
+            self.pitch_hz.append(point["pitch"])
+
+    def add_segment(self, segment_id: int, text: str, timestamp: float | None = None):
+        """確定した文字起こしの断片を追加する (segment_id は 0 から順番に来る想定)。"""
+        if segment_id != self.segment_time.size:
+            logger.warning(f"⚠️ 断片の番号が飛んでいます: {segment_id} (期待: {self.segment_time.size})")
+        self.segment_time.append(self._offset(timestamp))
+        offset = self._text_length + (self.separator_length if self._text_length else 0)
+        self.segment_char_offset.append(offset)
+        self._text_length = offset + len(text)
+
+    def mark_sentence(self, segment_id: int):
+        """
+        segment_id の断片で終わる文を感情分析に回したことを記録する (文は順番どおりに来る)。
+        結果は順不同で届くので、ここで文の区間 (= 重み) を決めておくよ。
+        """
+        if segment_id in self._sentence_spans or not 0 <= segment_id < self.segment_time.size:
+            return
+        end = float(self.segment_time.values[segment_id])
+        self._sentence_spans[segment_id] = (self._last_sentence_end, end)
+        self._last_sentence_end = end
+
+    def add_sentiment(self, segment_id: int, score: float, magnitude: float):
+        """感情分析の結果を追加する (届く順番はバラバラでOK)。"""
+        start, end = self._sentence_spans.get(segment_id, (None, None))
+        if end is None:
+            end = float(self.segment_time.values[segment_id]) if 0 <= segment_id < self.segment_time.size else self._offset(None)
+            start = end
+        self.sentiment_time.append(end)
+        self.sentiment_score.append(score)
+        self.sentiment_magnitude.append(magnitude)
+        self.sentiment_segment.append(segment_id)
+
+        # 文の長さ (秒) で重み付け。長さがわからない文も、最低限の重みで数える
+        weight = max(end - start, 0.1)
+        self._weighted_score += score * weight
+        self._weighted_magnitude += magnitude * weight
+        self._total_weight += weight
+        low, high = _NEUTRAL_RANGE
+        bucket = 0 if score < low else (2 if score > high else 1)
+        self._bucket_seconds[bucket] += weight
+
+    # --- 集計 ---
+
+    @property
+    def sentiment_count(self) -> int:
+        return self.sentiment_score.size
+
+    @property
+    def mean_sentiment(self) -> float | None:
+        """感情スコアの時間加重平均。"""
+        return self._weighted_score / self._total_weight if self._total_weight else None
+
+    @property
+    def dominant_emotion(self) -> str | None:
+        """一番長い時間を占めた感情のバケツ。"""
+        if not self._total_weight:
+            return None
+        return EMOTION_BUCKETS[int(np.argmax(self._bucket_seconds))]
+
+    def evaluation_summary(self) -> dict:
+        """
+        評価コンテキスト用のまとめ。値がないものは入れない (PROMPT_TEMPLATE 側で "N/A" になるよ)。
+        """
+        summary = {"segment_count": self.segment_time.size}
+        if self._total_weight:
+            shares = self._bucket_seconds / self._total_weight
+            summary.update({
+                "dominant_emotion": self.dominant_emotion,
+                "emotion_score": f"{self.mean_sentiment:.2f}",
+                "emotion_magnitude": f"{self._weighted_magnitude / self._total_weight:.2f}",
+                "emotion_breakdown": " / ".join(f"{name} {share:.0%}" for name, share in zip(EMOTION_BUCKETS, shares)),
+                "sentiment_sample_count": self.sentiment_count,
+            })
+        return summary
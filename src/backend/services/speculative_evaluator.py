@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class SpeculativeEvaluator:
+    """
+    セッション中に、それまでの文字起こしで最終評価を先回りして作っておくよ。
+
+    - 候補者が pause_seconds 黙って、前回の先回りから min_new_chars 文字以上増えていたら、裏で評価を始める
+    - 新しい先回りを始めるときは、古い実行をキャンセルして置き換える
+    - 1セッションあたり max_runs 回まで、min_interval_seconds 秒に1回まで (コストが増えすぎないように)
+    - 停止したとき、最後の先回りと評価コンテキストが丸ごと同じなら、その結果をそのまま使える (result_for)
+      (文字起こしだけ同じでも、ピッチや感情の集計が変わっていたら使わない)
+    """
+
+    def __init__(self, build_context: Callable[[], dict], evaluate: Callable[[dict], Awaitable[dict]],
+                 pause_seconds: float = 2.0, min_new_chars: int = 40,
+                 min_interval_seconds: float = 30.0, max_runs: int = 3,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            build_context (Callable[[], dict]): その時点の評価コンテキストを作る関数 (transcript を含む)。
+            evaluate (Callable[[dict], Awaitable[dict]]): コンテキストを評価する関数。
+            pause_seconds (float): 何秒黙ったら先回りを始めるか。
+            min_new_chars (int): 前回の先回りから、最低これだけ文字起こしが増えていたら始める。
+            min_interval_seconds (float): 先回りを始める最短の間隔。
+            max_runs (int): 1セッションで先回りする最大回数。
+        """
+        self.build_context = build_context
+        self.evaluate = evaluate
+        self.pause_seconds = pause_seconds
+        self.min_new_chars = min_new_chars
+        self.min_interval_seconds = min_interval_seconds
+        self.max_runs = max_runs
+        self.clock = clock
+        self._text = ""
+        self._timer = None
+        self._task: asyncio.Task | None = None
+        self._task_text = None
+        self._task_context = None
+        self._last_started = None
+        self.runs = 0
+        self.cancelled = 0
+        self.hits = 0
+        self.misses = 0
+
+    def on_transcript(self, text: str):
+        """文字起こしが更新されたら (途中結果でも) 呼ぶ。話している間は黙るまで待ち直すよ。"""
+        self._text = text
+        if self.runs >= self.max_runs:
+            return
+        self._schedule(self.pause_seconds)
+
+    def _schedule(self, delay: float):
+        self._cancel_timer()
+        self._timer = asyncio.get_running_loop().call_later(delay, self._on_pause)
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _on_pause(self):
+        self._timer = None
+        text = self._text
+        if self.runs >= self.max_runs or text == self._task_text:
+            return
+        if len(text) - len(self._task_text or "") < self.min_new_chars:
+            return
+        if self._last_started is not None:
+            wait = self._last_started + self.min_interval_seconds - self.clock()
+            if wait > 0:
+                # 間隔が短すぎるので、間隔が空いたときにもう一度チェックする
+                self._schedule(wait)
+                return
+        self._start(text)
+
+    def _start(self, text: str):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            self.cancelled += 1
+        context = self.build_context()
+        self.runs += 1
+        self._last_started = self.clock()
+        self._task_context = context
+        self._task_text = context.get("transcript", text)
+        self._task = asyncio.create_task(self.evaluate(context))
+        logger.info(f"🔮 最終評価を先回りして実行します ({self.runs}/{self.max_runs}回目, {len(self._task_text)}文字)")
+
+    async def result_for(self, context: dict) -> dict | None:
+        """
+        停止したときに呼ぶ。最後の先回りの評価コンテキストが context と同じなら、その結果を返す (実行中なら待つ)。
+        文字起こしだけでなく、ピッチ・感情の集計も含めて比べるよ (プロンプトが同じになるときだけ使う)。
+        使えなければ None を返すので、ふつうに評価してね。
+        """
+        self._cancel_timer()
+        task, self._task = self._task, None
+        if task is None or self._task_context != context:
+            if task and not task.done():
+                task.cancel()
+                self.cancelled += 1
+                await asyncio.gather(task, return_exceptions=True)
+            self.misses += 1
+            return None
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise  # 呼び出し側がキャンセルされた
+            result = None
+        except Exception as e:
+            logger.warning(f"先回りの評価が失敗していました: {e}")
+            result = None
+        if not result or "error" in result:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    async def close(self):
+        """タイマーと実行中の先回りを止める。"""
+        self._cancel_timer()
+        task, self._task = self._task, None
+        if task and not task.done():
+            task.cancel()
+            self.cancelled += 1
+            await asyncio.gather(task, return_exceptions=True)
@@ -1,5 +1,4 @@
 # ここに Google Cloud Speech-to-Text のライブラリをインポートする感じで！
-from google.cloud import speech_v1p1beta1 as speech # 非同期クライアントを使うよ！
 from google.api_core import exceptions
 import asyncio
 import pyaudio
@@ -10,6 +9,7 @@ import threading
 from google.cloud import pubsub_v1 # ◀️ Pub/Subライブラリをインポート！
 import json
 import uuid # ◀️ セッションID生成のために追加！
+import numpy as np
 from fastapi import WebSocket
 from starlette.websockets import WebSocketDisconnect
 from datetime import datetime
@@ -27,10 +27,36 @@ if _SRC_DIR not in sys.path:
 # --- サービス、ワーカー、設定ファイルのインポート ---
 from backend.services import gemini_service # gemini_serviceモジュールとしてインポート！
 from backend.workers.pitch_worker import PitchWorker
+from backend.workers.audio_ring_buffer import PitchRingBuffer
+from backend.workers.vad import VoiceActivityDetector, SilenceGate
+from backend.workers.dsp_engine import get_dsp_engine, start_dsp_engine
+from backend.workers.pitch_statistics import PitchStatistics
+from backend.workers.pitch_tracker import PitchContourTracker
+from backend.workers.audio_converter import AudioConverter, AudioFormat
 from backend.services import dialogflow_service # ◀️ sentiment_worker の代わりに dialogflow_service をインポート！
 from backend.services.gemini_service import GeminiService
+from backend.services.audio_feeder import AudioFeeder
+from backend.services.stt_rotation import RotatingSpeechStream
+from backend.services.transcription_backend import create_transcription_backend
+from backend.services.client_registry import ClientRegistry, get_client_registry
+from backend.services.sentiment_pipeline import SentimentPipeline
+from backend.services.sentiment_batching import SentenceBatcher, get_sentiment_cache
+from backend.services.transcript_segments import TranscriptSegments, PROTOCOLS, PROTOCOL_DELTA, PROTOCOL_FULL
+from backend.services.session_timeline import SessionTimeline
+from backend.services.speculative_evaluator import SpeculativeEvaluator
 # 新しく作った共通設定ファイルをインポート！
-from backend.shared_config import RATE, CHUNK, CHANNELS, FORMAT, SAMPLE_WIDTH
+from backend.shared_config import (
+    RATE, CHUNK, CHANNELS, FORMAT, SAMPLE_WIDTH,
+    PITCH_BACKEND, DSP_ENGINE_WORKERS, DSP_ENGINE_MAX_SESSIONS,
+    PITCH_OUTPUT_RATE_HZ, PITCH_POINTS_PER_MESSAGE, STT_REQUEST_MS,
+    STT_QUEUE_MAX_SECONDS, STT_QUEUE_POLICY, STT_STREAM_ROTATE_SECONDS, STT_STREAM_OVERLAP_SECONDS,
+    STT_BACKEND, STT_FAKE_LATENCY_MS, STT_FAKE_JITTER_MS,
+    SENTIMENT_CONCURRENCY, SENTIMENT_QUEUE_SIZE, SENTIMENT_DRAIN_SECONDS,
+    SENTIMENT_SENTENCE_TIMEOUT_SECONDS, SENTIMENT_CACHE_SIZE, GEMINI_STREAMING_EVALUATION,
+    SPECULATIVE_EVALUATION_ENABLED, SPECULATIVE_PAUSE_SECONDS, SPECULATIVE_MIN_NEW_CHARS,
+    SPECULATIVE_MIN_INTERVAL_SECONDS, SPECULATIVE_MAX_RUNS,
+    VAD_ENABLED, VAD_ENERGY_THRESHOLD_DB, VAD_HANGOVER_MS, VAD_KEEP_SILENCE_MS, VAD_KEEPALIVE_MS,
+)
 
 # logging の基本設定 (モジュールレベルで１回だけ実行)
 # SpeechProcessor クラスの外で設定するのが一般的だよん！
@@ -50,19 +76,77 @@ TRANSCRIPTION_TOPIC = "ep-x-transcriptions"
 
 # --- SpeechProcessorクラスでGemini関連のコードを管理するので、ここの重複は削除！ ---
 
+
+def _create_transcription_backend():
+    """STT_BACKEND の設定から文字起こしバックエンドを作る。"""
+    if STT_BACKEND == "fake":
+        return create_transcription_backend(
+            "fake",
+            sample_rate=RATE,
+            sample_width=SAMPLE_WIDTH,
+            latency=STT_FAKE_LATENCY_MS / 1000,
+            jitter=STT_FAKE_JITTER_MS / 1000,
+        )
+    return create_transcription_backend(STT_BACKEND, sample_rate=RATE)
+
+
+def register_shared_clients(registry: ClientRegistry | None = None) -> ClientRegistry:
+    """
+    SpeechProcessor が使う重いクライアントを、プロセス共有のレジストリに登録するよ。
+    GeminiService (設定の読み込み + vertexai.init + モデル + GEval) や Pub/Sub の Publisher (バックグラウンドスレッド付き) は、
+    接続ごとに作るとイベントループが止まるので、起動時に1回だけ作ってみんなで使い回す！
+    """
+    registry = registry or get_client_registry()
+    if "gemini" not in registry:
+        registry.register("gemini", gemini_service.get_gemini_service, close=lambda service: service.close())
+    if "transcription" not in registry:
+        # grpc.aio の SpeechAsyncClient は、作るときに実行中のイベントループが要る
+        registry.register("transcription", _create_transcription_backend, close=lambda backend: backend.close(),
+                          needs_loop=True)
+    if "pubsub" not in registry:
+        registry.register("pubsub", pubsub_v1.PublisherClient, close=lambda publisher: publisher.stop())
+    return registry
+
+
+def _pitch_ring_capacity(frame_length: int) -> int:
+    """ピッチ解析リングの容量。1秒分 (ウィンドウ + 大きめのチャンクでも溢れないサイズ)。"""
+    return max(RATE, frame_length * 4)
+
+
+def start_shared_dsp_engine():
+    """
+    PITCH_BACKEND が "engine" なら、プロセス共有のDSPエンジンを起動するよ。
+    ワーカープロセスの spawn は数百ミリ秒かかるので、アプリの起動時に (イベントループの外で) 1回だけ呼んでね。
+    """
+    if PITCH_BACKEND != "engine":
+        return None
+    pitch_kwargs = dict(sample_rate=RATE, channels=CHANNELS, sample_width=SAMPLE_WIDTH)
+    frame_length = PitchWorker(**pitch_kwargs).frame_length
+    return start_dsp_engine(
+        pitch_kwargs=pitch_kwargs,
+        n_workers=DSP_ENGINE_WORKERS,
+        max_sessions=DSP_ENGINE_MAX_SESSIONS,
+        capacity=_pitch_ring_capacity(frame_length),
+    )
+
+
 class SpeechProcessor:
     """
     リアルタイム音声処理のクラスだよん！
     文字起こし、音程解析、感情分析、Gemini評価をまとめてやるぞ！
     """
 
-    def __init__(self, websocket: WebSocket, send_to_client: callable):
+    def __init__(self, websocket: WebSocket, send_to_client: callable, clients: ClientRegistry | None = None):
         self.websocket = websocket
         self.send_to_client = send_to_client
         self.session_id = str(uuid.uuid4())
-        self.gemini_service = GeminiService() # GeminiServiceを初期化
-        self.speech_client = speech.SpeechAsyncClient()
-        self._audio_queue = asyncio.Queue()
+        # 重いクライアントはプロセス共有のレジストリから借りるだけ (起動時に作成済み)
+        self.clients = register_shared_clients(clients)
+        self.gemini_service = self.clients.get("gemini")
+        # 文字起こしのバックエンド ("google" がデフォルト。"fake" ならGCPなしで負荷試験できる)
+        self.transcription_backend = self.clients.get("transcription")
+        # STTに送る音声を ~100ms のリクエストにまとめるフィーダー (セッションごとに作り直す)
+        self._audio_feeder = self._create_audio_feeder()
         self._is_running = False
         self._processing_task = None # メインの処理タスクを保持する
         self._microphone_task = None # 手動テスト用のマイクスレッドを保持する
@@ -71,16 +155,9 @@ class SpeechProcessor:
         self.pyaudio_instance = None
         self.microphone_stream = None
 
-        # --- Pub/Sub Publisherの初期化 ---
-        try:
-            self.publisher = pubsub_v1.PublisherClient()
-            self.topic_path = self.publisher.topic_path(GCP_PROJECT_ID, TRANSCRIPTION_TOPIC)
-            logger.info(f"✅ Pub/Sub Publisherの初期化完了！トピック: {self.topic_path}")
-        except Exception as e:
-            logger.exception("😱 Pub/Sub Publisher の初期化中にエラーが発生しました。")
-            self.publisher = None
-            self.topic_path = None
-        # --- ここまでPub/Sub初期化 ---
+        # --- Pub/Sub Publisher (共有) ---
+        self.publisher = self.clients.get("pubsub")
+        self.topic_path = self.publisher.topic_path(GCP_PROJECT_ID, TRANSCRIPTION_TOPIC) if self.publisher else None
 
         # PitchWorker のインスタンスを作成
         try:
@@ -98,8 +175,10 @@ class SpeechProcessor:
         logger.info(f"PyAudio設定: FORMAT={FORMAT}, CHANNELS={CHANNELS}, RATE={RATE}, CHUNK={CHUNK}, SAMPLE_WIDTH={SAMPLE_WIDTH}")
 
         # --- Gemini評価システム関連の初期化 ---
-        # __init__で生成したGeminiServiceインスタンスのプロパティをチェックする
-        self.gemini_enabled = self.gemini_service.gemini_model_instance is not None
+        # 共有のGeminiServiceが作れていて、モデルがロードできているかチェックする
+        self.gemini_enabled = (
+            self.gemini_service is not None and self.gemini_service.gemini_model_instance is not None
+        )
         if self.gemini_enabled:
             logger.info("👑 Gemini評価システムが有効になりました。")
         else:
@@ -107,20 +186,66 @@ class SpeechProcessor:
         
         # --- セッション中のデータを保持する変数を初期化 ---
         self.current_interview_question = "自己PRをしてください。" # デフォルトの質問
-        self.full_transcript = "" # 文字起こし全文を保持
-        self.pitch_values = []    # ピッチの測定値を保持
-        self.last_pitch_analysis_summary = {} # ピッチ解析の集計結果
-        self.last_emotion_analysis_summary = {} # 感情分析の集計結果
+        # 文字起こしは確定した断片のリストで持つ (全文は評価のときに1回だけ join する)
+        self.transcript = TranscriptSegments()
+        self.transcript_protocol = PROTOCOL_FULL
+        # 確定した断片の感情分析は、STTのループとは別のステージで並行して行う (セッションごとに作る)
+        self._sentiment_pipeline = None
+        self._sentence_batcher = None
+        # 話の切れ目で最終評価を先回りしておく (セッションごとに作る)
+        self._speculative = None
+        # ピッチの測定値を保持 (float32配列 + オンライン統計なので、長いセッションでも軽いよ)
+        self.pitch_stats = PitchStatistics(
+            min_freq=self.pitch_worker.min_freq if self.pitch_worker else 50.0,
+            max_freq=self.pitch_worker.max_freq if self.pitch_worker else 600.0,
+        )
+        # ピッチ・断片・感情の時系列 (型付きの列 + 逐次集計なので、最終評価のときに集計し直さなくていい)
+        self.timeline = SessionTimeline(separator_length=len(self.transcript.separator))
         
-        # --- ピッチ解析用のバッファと設定を追加 ---
-        self._pitch_buffer = b""
-        self._required_pitch_bytes = 0
+        # --- ピッチ解析用のリングバッファと設定を追加 ---
+        self._pitch_ring = None
+        self._pitch_window_samples = 0
+        self._pitch_hop_samples = 0
         if self.pitch_worker:
-            # pitch_workerが必要とする最小サンプル数(max_lag)の2倍をバイト数で計算
+            # pitch_workerが必要とする最小サンプル数(max_lag)の2倍を解析ウィンドウにする
             # 2倍にすることで、より安定した解析が期待できる
-            # 例: 16000Hz / 50Hz(min_freq) = 320サンプル -> 320 * 2(bytes) * 2 = 1280バイト
-            self._required_pitch_bytes = self.pitch_worker.max_lag * self.pitch_worker.sample_width * 2
-            logger.info(f"ピッチ解析に必要な最小バイト数: {self._required_pitch_bytes}")
+            # 例: 16000Hz / 50Hz(min_freq) = 320サンプル -> 640サンプル (1280バイト)
+            # PitchWorkerはこの長さの自己相関プランを初期化時に作ってあるよ
+            self._pitch_window_samples = self.pitch_worker.frame_length
+            # ウィンドウの半分ずつスライドさせて、次の解析とオーバーラップさせる
+            self._pitch_hop_samples = self._pitch_window_samples // 2
+            # 容量は1秒分 (ウィンドウ + 大きめのチャンクでも溢れないサイズ) をセッションごとに一度だけ確保
+            self._pitch_ring = PitchRingBuffer(capacity=_pitch_ring_capacity(self._pitch_window_samples))
+            logger.info(f"ピッチ解析ウィンドウ: {self._pitch_window_samples}サンプル (ホップ: {self._pitch_hop_samples}サンプル)")
+
+        # --- ピッチ輪郭のトラッカー (スムージング + 出力レートの間引き) ---
+        self._pitch_tracker = None
+        self._pending_pitch_points = []
+        if self.pitch_worker:
+            self._pitch_tracker = PitchContourTracker(
+                frame_period=self._pitch_hop_samples / RATE,
+                output_rate_hz=PITCH_OUTPUT_RATE_HZ,
+            )
+
+        # クライアントが RATE / int16 / モノラル以外で送ってくるときの変換器 (start で宣言してもらう)
+        self._input_converter = None
+
+        # PITCH_BACKEND="engine" のときは、セッション開始時にDSPエンジンのスロットを借りる
+        self._dsp_session = None
+
+        # --- 無音検出 (VAD) ---
+        # ピッチ用と文字起こし用でハングオーバーの状態が別なので、VADは2つ作るよ
+        self._pitch_vad = None
+        self._stt_gate = None
+        if VAD_ENABLED:
+            vad_options = dict(energy_threshold_db=VAD_ENERGY_THRESHOLD_DB, hangover_ms=VAD_HANGOVER_MS)
+            self._pitch_vad = VoiceActivityDetector(RATE, **vad_options)
+            self._stt_gate = SilenceGate(
+                VoiceActivityDetector(RATE, **vad_options),
+                keep_silence_ms=VAD_KEEP_SILENCE_MS,
+                keepalive_ms=VAD_KEEPALIVE_MS,
+            )
+            logger.info(f"🤫 VAD有効: 閾値 {VAD_ENERGY_THRESHOLD_DB}dBFS, ハングオーバー {VAD_HANGOVER_MS}ms, 無音の保持 {VAD_KEEP_SILENCE_MS}ms")
         # --- ここまでセッションデータ変数 ---
 
     def _reset_session_data(self):
@@ -129,15 +254,137 @@ class SpeechProcessor:
         start_transcription_and_evaluation が呼ばれたときに実行する。
         """
         self.session_id = str(uuid.uuid4())
-        self._audio_queue = asyncio.Queue()
+        self._audio_feeder = self._create_audio_feeder()
         self._stop_event.clear()
-        self.full_transcript = ""
-        self.pitch_values = []
-        self._pitch_buffer = b""
-        self.last_pitch_analysis_summary = {}
-        self.last_emotion_analysis_summary = {}
+        self.transcript.reset()
+        self.pitch_stats.clear()
+        if self._pitch_ring:
+            self._pitch_ring.clear()
+        self._reset_vad()
+        self._reset_pitch_tracker()
+        if self._input_converter:
+            self._input_converter.reset()
+        self.timeline.reset()
         logger.info(f"新しいセッションIDでデータをリセットしました: {self.session_id}")
 
+    def _create_audio_feeder(self) -> AudioFeeder:
+        """
+        STT_REQUEST_MS ぶんの音声を1リクエストにまとめるフィーダーを作る。
+        送信待ちは STT_QUEUE_MAX_SECONDS ぶんまでで、あふれたら STT_QUEUE_POLICY に従うよ。
+        """
+        request_bytes = int(RATE * SAMPLE_WIDTH * STT_REQUEST_MS / 1000)
+        return AudioFeeder(
+            request_bytes=request_bytes - request_bytes % SAMPLE_WIDTH,
+            max_requests=max(1, int(STT_QUEUE_MAX_SECONDS * 1000 / STT_REQUEST_MS)),
+            policy=STT_QUEUE_POLICY,
+        )
+
+    async def _report_audio_feeder_stats(self):
+        """
+        STT送信キューの統計をログに出す。音声を捨てたりWebSocketを待たせたりしていたら、
+        degraded イベントでクライアントにも知らせるよ (混んでいるインスタンスを見つけるため)。
+        """
+        feeder = self._audio_feeder
+        stats = feeder.stats()
+        stats["dropped_seconds"] = round(feeder.dropped_bytes / (RATE * SAMPLE_WIDTH), 3)
+        logger.info(
+            f"📦 STTリクエスト: {feeder.requests_made}件 (イベントループの起床: {feeder.wakeups}回), "
+            f"破棄: {stats['dropped_seconds']}秒, ブロック: {stats['blocked_seconds']}秒 [session: {self.session_id}]"
+        )
+        if feeder.degraded:
+            logger.warning(f"🐢 このセッションは音声処理が詰まっていました: {stats}")
+            await self._send_to_client("degraded", stats)
+
+    def _reset_pitch_tracker(self):
+        """ピッチ輪郭のトラッカーと、未送信の点をリセットする。"""
+        if self._pitch_tracker:
+            self._pitch_tracker.reset()
+        self._pending_pitch_points = []
+
+    def _reset_vad(self):
+        """VADのハングオーバー状態と、無音カットの統計をリセットする。"""
+        if self._pitch_vad:
+            self._pitch_vad.reset()
+        if self._stt_gate:
+            self._stt_gate.reset()
+
+    def _open_dsp_session(self):
+        """
+        PITCH_BACKEND が "engine" なら、プロセス共有のDSPエンジンからスロットを1つ借りる。
+        エンジンは起動時に start_shared_dsp_engine() で立ち上げておくもので、ここでは起動しない (イベントループを止めないため)。
+        エンジンが使えないときは、いつものイベントループ内の解析にフォールバックするよ。
+        """
+        if PITCH_BACKEND != "engine" or not self.pitch_worker or self._dsp_session:
+            return
+        engine = get_dsp_engine()
+        if engine is None:
+            logger.warning("DSPエンジンが起動していないため、イベントループ内でピッチ解析します。")
+            return
+        try:
+            if engine.layout.capacity < self._pitch_ring.capacity:
+                raise RuntimeError(f"スロットの容量が足りません ({engine.layout.capacity} < {self._pitch_ring.capacity})")
+            self._dsp_session = engine.open_session()
+            logger.info(f"🏭 ピッチ解析をDSPエンジンに任せます (スロット: {self._dsp_session.slot})")
+        except Exception as e:
+            logger.warning(f"DSPエンジンが使えないため、イベントループ内でピッチ解析します: {e}")
+            self._dsp_session = None
+
+    def _close_dsp_session(self):
+        """借りていたDSPエンジンのスロットを返す。"""
+        if self._dsp_session:
+            self._dsp_session.close()
+            self._dsp_session = None
+
+    async def _analyze_pitch_frames(self, frames: np.ndarray) -> np.ndarray | None:
+        """
+        解析ウィンドウのブロックからピッチを求める。VADで無音と判定したフレームはFFTに回さず NaN にするよ。
+
+        Returns:
+            np.ndarray | None: フレームごとの周波数 (無声は NaN)。DSPエンジンでの解析に失敗したらNone。
+        """
+        voiced = None
+        if self._pitch_vad:
+            # 無音フレームはFFTに回さない (エネルギーとZCRだけなら自己相関よりずっと安い)
+            voiced = self._pitch_vad.is_speech(frames, step=self._pitch_hop_samples)
+            if not voiced.any():
+                return np.full(len(voiced), np.nan)
+            if voiced.all():
+                voiced = None
+
+        if self._dsp_session:
+            # ワーカーにはリング上の位置だけを送るので、フレームは間引かずに渡して結果の方をマスクする
+            try:
+                frequencies, _ = await self._dsp_session.analyze_pitch_batch(frames)
+            except Exception as e:
+                logger.error(f"DSPエンジンでのピッチ解析に失敗しました: {e}")
+                return None
+            if voiced is not None:
+                frequencies = np.where(voiced, frequencies, np.nan)
+            return frequencies
+
+        if voiced is None:
+            frequencies, _ = self.pitch_worker.analyze_pitch_batch(frames)
+            return frequencies
+        frequencies = np.full(len(voiced), np.nan)
+        frequencies[voiced], _ = self.pitch_worker.analyze_pitch_batch(frames[voiced])
+        return frequencies
+
+    async def _flush_pitch_points(self, final: bool = False):
+        """
+        たまったピッチ輪郭の点を、1つの pitch_analysis メッセージでまとめて送る。
+        pitch / timestamp には最新の点も入れておくので、1点ずつ読む古いクライアントでも動くよ。
+        """
+        if final and self._pitch_tracker:
+            self._pending_pitch_points.extend(self._pitch_tracker.flush())
+        if not self._pending_pitch_points:
+            return
+        points, self._pending_pitch_points = self._pending_pitch_points, []
+        latest = points[-1]
+        await self._send_to_client(
+            "pitch_analysis",
+            {"pitch": latest["pitch"], "timestamp": latest["timestamp"], "points": points}
+        )
+
     async def process_audio_chunk(self, chunk: bytes):
         """
         WebSocketから受け取った音声チャンクを処理するよ。
@@ -146,46 +393,111 @@ class SpeechProcessor:
         if not self._is_running:
             return
 
+        # 0. 宣言されたフォーマットから、RATE / int16 / モノラルに変換 (ピッチ解析とSTTの両方がこれを使う)
+        if self._input_converter:
+            chunk = self._input_converter.convert(chunk)
+            if not chunk:
+                return
+
         # 1. ピッチを解析
-        if self.pitch_worker and self._required_pitch_bytes > 0:
-            self._pitch_buffer += chunk
-
-            # バッファが十分な大きさになったら解析
-            if len(self._pitch_buffer) >= self._required_pitch_bytes:
-                pitch = self.pitch_worker.analyze_pitch(self._pitch_buffer)
-                
-                if pitch is not None:
-                    # 最終評価用に蓄積
-                    self.pitch_values.append(pitch)
-                    # リアルタイムでクライアントに送信！
-                    timestamp = time.time()
-                    await self._send_to_client(
-                        "pitch_analysis",
-                        {"pitch": pitch, "timestamp": timestamp}
-                    )
-                
-                # バッファをスライドさせる (古いデータを削除)
-                # 今回は解析ウィンドウの半分を削除して、次の解析とオーバーラップさせる
-                slide_bytes = self._required_pitch_bytes // 2
-                self._pitch_buffer = self._pitch_buffer[slide_bytes:]
+        if self.pitch_worker and self._pitch_ring:
+            # チャンクを書き込みつつ、揃った解析ウィンドウを (フレーム数 × サンプル数) のビューでまとめて解析
+            # FFTはチャンク内の全ホップ分を1回で実行する
+            # DSPエンジン利用時は、共有メモリ上のリングに書き込む
+            ring = self._dsp_session or self._pitch_ring
+            for frames in ring.feed_frames(chunk, self._pitch_window_samples, self._pitch_hop_samples):
+                frequencies = await self._analyze_pitch_frames(frames)
+                if frequencies is None:
+                    continue
+                # オクターブ補正 + ランニングメディアンでなめらかにして、出力レートまで間引く
+                corrected, points = self._pitch_tracker.push(frequencies, time.time())
+                # 最終評価用に蓄積 (統計もここで逐次更新される)
+                self.pitch_stats.extend(corrected)
+                self.timeline.add_pitch_points(points)
+                self._pending_pitch_points.extend(points)
+
+            # 輪郭の点がある程度たまったら、1メッセージにまとめてクライアントに送信！
+            if len(self._pending_pitch_points) >= PITCH_POINTS_PER_MESSAGE:
+                await self._flush_pitch_points()
 
         # 2. Symbl.aiへの音声データ送信は不要になったので削除！
 
         # 3. 文字起こし用のキューに音声データを追加
+        # 長い無音はここで間引いて、STTの課金秒数を節約するよ
+        if self._stt_gate:
+            chunk = self._stt_gate.filter(chunk)
+            if chunk is None:
+                # 発話の切れ目なので、途中まで詰めたリクエストも送り出しておく
+                self._audio_feeder.flush()
+                return
         if not self._stop_event.is_set():
-            await self._audio_queue.put(chunk)
+            # キューがいっぱいのとき、"block" ポリシーならここで待つ (= WebSocketの読み取りも止まる)
+            speech = self._stt_gate.last_speech if self._stt_gate else True
+            await self._audio_feeder.put(chunk, speech=speech)
 
     async def _start_workers(self):
-        """ワーカーの起動処理（現在は空）"""
+        """ワーカーの起動処理 (感情分析のステージ)"""
         # PitchWorkerは都度呼び出すので、ここでは起動しない
-        # SentimentWorkerもいなくなったので、ここは空っぽ！
-        pass
+        await self._stop_workers()
+        session_id = self.session_id
+        # 定型文は候補者をまたいで繰り返すので、結果はプロセス共有のLRUキャッシュに入れておく
+        analyze = get_sentiment_cache(SENTIMENT_CACHE_SIZE).wrap(
+            lambda text: dialogflow_service.analyze_sentiment(session_id=session_id, text=text)
+        )
+        self._sentiment_pipeline = SentimentPipeline(
+            analyze=analyze,
+            on_result=self._send_sentiment_update,
+            concurrency=SENTIMENT_CONCURRENCY,
+            max_queue=SENTIMENT_QUEUE_SIZE,
+        )
+        self._sentiment_pipeline.start()
+        # 短い断片は「。！？」かタイムアウトまでためて、1文につき1リクエストにする
+        self._sentence_batcher = SentenceBatcher(
+            emit=self._submit_sentence,
+            timeout=SENTIMENT_SENTENCE_TIMEOUT_SECONDS,
+        )
+        # 黙ったタイミングで最終評価を先回りしておけば、停止したときにすぐ結果を返せる
+        if self._speculative:
+            await self._speculative.close()
+            self._speculative = None
+        if self.gemini_enabled and SPECULATIVE_EVALUATION_ENABLED:
+            self._speculative = SpeculativeEvaluator(
+                build_context=self._build_evaluation_context,
+                evaluate=lambda context: self.gemini_service.generate_structured_feedback(evaluation_context=context),
+                pause_seconds=SPECULATIVE_PAUSE_SECONDS,
+                min_new_chars=SPECULATIVE_MIN_NEW_CHARS,
+                min_interval_seconds=SPECULATIVE_MIN_INTERVAL_SECONDS,
+                max_runs=SPECULATIVE_MAX_RUNS,
+            )
 
     async def _stop_workers(self):
-        """ワーカーの停止処理（現在は空）"""
+        """ワーカーの停止処理。分析待ちの断片は SENTIMENT_DRAIN_SECONDS まで待ってから止める"""
         # PitchWorkerは都度呼び出すので、ここでは停止しない
-        # SentimentWorkerもいなくなったので、ここは空っぽ！
-        pass
+        if self._sentence_batcher:
+            batcher, self._sentence_batcher = self._sentence_batcher, None
+            batcher.flush()  # 区切りを待っている途中の文も分析に回す
+            cache = get_sentiment_cache(SENTIMENT_CACHE_SIZE)
+            logger.info(
+                f"🧺 感情分析のまとめ: 断片 {batcher.fragments}件 → {batcher.sentences}文 "
+                f"(キャッシュのヒット率: {cache.hit_ratio:.0%})"
+            )
+        if self._sentiment_pipeline:
+            pipeline, self._sentiment_pipeline = self._sentiment_pipeline, None
+            await pipeline.close(timeout=SENTIMENT_DRAIN_SECONDS)
+
+    def _submit_sentence(self, segment_id: int, sentence: str):
+        """1文を感情分析に回す。文は順番どおりに来るので、ここでタイムライン上の区間を決めておく"""
+        if self._sentiment_pipeline and self._sentiment_pipeline.submit(segment_id, sentence):
+            self.timeline.mark_sentence(segment_id)
+
+    async def _send_sentiment_update(self, segment_id: int, text: str, sentiment: dict):
+        """感情分析の結果を、どの断片の結果かわかるように segment_id 付きで送る"""
+        self.timeline.add_sentiment(segment_id, sentiment["score"], sentiment["magnitude"])
+        await self._send_to_client("sentiment_update", {
+            "segment_id": segment_id,
+            "sentiment": sentiment,
+            "timestamp": datetime.now().isoformat()
+        })
 
     def _get_pyaudio_instance(self):
         """PyAudioのインスタンスを取得または生成するよ。マイクテストの時だけね！"""
@@ -210,6 +522,45 @@ class SpeechProcessor:
         # ... existing code ...
         pass
 
+    def set_audio_format(self, audio_format: dict | None):
+        """
+        クライアントが start アクションで宣言した音声フォーマットを設定するよん！
+        例: {"encoding": "float32", "sample_rate": 48000, "channels": 1}
+        省略時は従来どおり RATE / int16 / モノラルとして扱う。不正な値なら ValueError。
+        """
+        source = AudioFormat.from_message(audio_format)
+        converter = AudioConverter(source, target_rate=RATE)
+        self._input_converter = None if converter.is_passthrough else converter
+        logger.info(f"🎚️ 入力音声フォーマット: {source}")
+
+    def set_transcript_protocol(self, protocol: str | None):
+        """
+        文字起こしの送り方を設定するよん！ (start アクションの transcript_protocol)
+        "full": 毎回全文を transcript_update で送る (デフォルト) / "delta": 変わった断片だけ transcript_delta で送る
+        """
+        protocol = protocol or PROTOCOL_FULL
+        if protocol not in PROTOCOLS:
+            raise ValueError(f"サポートされていない transcript_protocol: {protocol}。{PROTOCOLS} のどれかを指定してね。")
+        self.transcript_protocol = protocol
+
+    @property
+    def full_transcript(self) -> str:
+        """確定した文字起こしの全文 (読み取り専用)。"""
+        return self.transcript.text()
+
+    async def _send_transcript(self, delta: dict | None, is_final: bool):
+        """文字起こしの更新を、クライアントが選んだプロトコルで送る。"""
+        if self.transcript_protocol == PROTOCOL_DELTA:
+            # 変わった断片だけを送る (同じ途中結果の繰り返しは送らない)
+            if delta is not None:
+                await self._send_to_client("transcript_delta", delta)
+            return
+        # 従来どおり、interimもfinalも、常に更新された全文をフロントに送る
+        await self._send_to_client("transcript_update", {
+            "transcript": self.transcript.text() if is_final else self.transcript.display_text(),
+            "is_final": is_final,
+        })
+
     def set_interview_question(self, question: str):
         """現在の面接の質問を設定するよん！"""
         self.current_interview_question = question
@@ -242,73 +593,46 @@ class SpeechProcessor:
         """
         音声ストリームを処理して、文字起こしと各種分析を実行するメインループだよん。
         """
+        if self.transcription_backend is None:
+            logger.error("😱 文字起こしバックエンドが使えないため、文字起こしを開始できません。")
+            self._stop_event.set()
+            return
+
         # --- 1. 音声ストリームの生成 ---
         audio_stream_generator = self._audio_stream_generator()
 
-        # --- 2. Google Cloud Speech-to-Text APIへのリクエスト設定 ---
-        # ...（中略）...
-        recognition_config = speech.RecognitionConfig(
-            encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
-            sample_rate_hertz=RATE,
-            language_code="ja-JP",
-            enable_automatic_punctuation=True,
-            profanity_filter=True, # 不適切な単語をフィルタリング
+        # --- 2. 文字起こしバックエンドへのストリーミング ---
+        # ~5分の上限の前にストリームを張り替えて、長い回答でも文字起こしが止まらないようにする
+        self._speech_stream = RotatingSpeechStream(
+            self.transcription_backend.recognize,
+            bytes_per_second=RATE * SAMPLE_WIDTH,
+            rotate_after=STT_STREAM_ROTATE_SECONDS,
+            overlap_seconds=STT_STREAM_OVERLAP_SECONDS,
+            rotate_on=(exceptions.OutOfRange,),
         )
-        streaming_config = speech.StreamingRecognitionConfig(
-            config=recognition_config,
-            interim_results=True, # 暫定的な結果も受け取る
-        )
-
-        requests = self._create_streaming_requests(audio_stream_generator)
 
         try:
-            logger.info("🚀 Google Speech-to-Text APIへのストリーミングを開始します...")
-            # recognizeメソッドは非同期イテレータを返す！
-            # 修正点: streaming_recognizeはコルーチンなのでawaitする
-            stream = await self.speech_client.streaming_recognize(
-                requests=requests
-            )
-
-            # ストリーミングのレスポンスを非同期で処理
-            async for response in stream:
+            logger.info(f"🚀 文字起こし ({self.transcription_backend.name}) へのストリーミングを開始します...")
+            # ストリーミングの結果を非同期で処理 (張り替えをまたいでも順番どおりに届くよ)
+            async for result in self._speech_stream.results(audio_stream_generator):
                 if not self._is_running:
                     break
-                
-                if response.results:
-                    result = response.results[0]
-                    if result.alternatives:
-                        transcript_chunk = result.alternatives[0].transcript
-
-                        # 確定した文字起こしは全文に結合
-                        if result.is_final:
-                            self.full_transcript += transcript_chunk + " "
-                            logger.info(f"✅ 最終的な文字起こし結果の断片: '{transcript_chunk}' (結合後の全文: '{self.full_transcript[:50]}...')")
-
-                            # 感情分析は確定した断片ごとに行う
-                            if len(transcript_chunk.strip()) > 1: # 1文字以上なら
-                                try:
-                                    logger.info(f"🤖 Dialogflowに感情分析をリクエスト: '{transcript_chunk}'")
-                                    sentiment_result = await dialogflow_service.analyze_sentiment(
-                                        session_id=self.session_id, text=transcript_chunk
-                                    )
-                                    # WebSocketクライアントに感情分析結果を送信
-                                    if sentiment_result:
-                                        await self._send_to_client("sentiment_update", {
-                                            "sentiment": sentiment_result,
-                                            "timestamp": datetime.now().isoformat()
-                                        })
-                                except Exception as e:
-                                    logger.error(f"感情分析の呼び出しでエラーが発生しましたが、処理を続行します: {e}")
-
-                        # interimもfinalも、常に更新された全文をフロントに送る！
-                        # これでフロントは表示を更新するだけでよくなる
-                        current_display_transcript = self.full_transcript + transcript_chunk if not result.is_final else self.full_transcript
-
-                        realtime_data = {
-                            "transcript": current_display_transcript,
-                            "is_final": result.is_final
-                        }
-                        await self._send_to_client("transcript_update", realtime_data)
+
+                transcript_chunk = result.transcript
+
+                # 確定した文字起こしは断片として追加 (文字列の連結はしない)
+                delta = self.transcript.update(transcript_chunk, result.is_final)
+                if result.is_final:
+                    logger.info(f"✅ 最終的な文字起こし結果の断片 #{delta['segment_id']}: '{transcript_chunk}'")
+                    self.timeline.add_segment(delta["segment_id"], transcript_chunk)
+
+                    # 感情分析は文の区切りまでためてから、別ステージに積むだけ (ここでは待たない！)
+                    if self._sentence_batcher:
+                        self._sentence_batcher.add(delta["segment_id"], transcript_chunk)
+
+                await self._send_transcript(delta, result.is_final)
+                if self._speculative:
+                    self._speculative.on_transcript(self.transcript.text())
 
         except WebSocketDisconnect:
             logger.warning("🎤 音声ストリームの途中でクライアントが切断したっぽ！処理を終了するね〜👋")
@@ -321,48 +645,26 @@ class SpeechProcessor:
         except Exception as e:
             logger.exception(f"😱 _process_speech_streamで予期せぬエラーが発生しました。")
         finally:
-            logger.info("👋 _process_speech_stream ループが終了しました。")
+            logger.info(
+                f"👋 _process_speech_stream ループが終了しました。"
+                f"(ストリームの張り替え: {self._speech_stream.rotations}回, "
+                f"重複の除去: {self._speech_stream.duplicates_dropped}件)"
+            )
             self._stop_event.set()
 
-    async def _create_streaming_requests(self, audio_generator):
+    async def _audio_stream_generator(self):
         """
-        Google Speech-to-Text APIに送信するリクエストのジェネレータだよん。
-        最初に設定情報を送って、そのあとはひたすら音声データを送る！
+        フィーダーから ~100ms ごとにまとめた音声を読み出して、ジェネレータとして返す非同期関数。
+        リクエストがそろったときだけ起こされるので、タイムアウト付きのポーリングはしないよ。
         """
-        # 最初にストリーミング設定を送信
-        recognition_config = speech.RecognitionConfig(
-            encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
-            sample_rate_hertz=RATE,
-            language_code="ja-JP",
-            enable_automatic_punctuation=True,
-            profanity_filter=True,
-        )
-        streaming_config = speech.StreamingRecognitionConfig(
-            config=recognition_config,
-            interim_results=True,
-        )
-        yield speech.StreamingRecognizeRequest(streaming_config=streaming_config)
-
-        # その後は音声データを非同期でストリーミング
-        async for chunk in audio_generator:
-            if not chunk:
-                break
-            yield speech.StreamingRecognizeRequest(audio_content=chunk)
+        try:
+            async for request in self._audio_feeder.requests():
+                if not self._is_running or self._stop_event.is_set():
+                    break
+                yield request
+        except asyncio.CancelledError:
+            logger.info("🎤 _audio_stream_generatorがキャンセルされました。")
 
-    async def _audio_stream_generator(self):
-        """キューから音声データを読み出して、ジェネレータとして返す非同期関数"""
-        while self._is_running and not self._stop_event.is_set():
-            try:
-                # タイムアウト付きでキューからデータを取得
-                chunk = await asyncio.wait_for(self._audio_queue.get(), timeout=0.1)
-                yield chunk
-            except asyncio.TimeoutError:
-                # タイムアウトはエラーじゃない。データが来てないだけだからループを続ける
-                continue
-            except asyncio.CancelledError:
-                logger.info("🎤 _audio_stream_generatorがキャンセルされました。")
-                break
-        
         logger.info("🎤 音声ストリームジェネレータが終了します。")
 
     def _microphone_worker(self):
@@ -428,6 +730,7 @@ class SpeechProcessor:
         logger.info("🚀 WebSocketからのリアルタイムセッションを開始します...")
         self._is_running = True
         self._reset_session_data() # ◀️ セッション開始時にデータをリセット！
+        self._open_dsp_session()
         
         # _process_speech_stream を非同期タスクとして実行
         self._processing_task = self.main_loop.create_task(self._process_speech_stream())
@@ -448,11 +751,13 @@ class SpeechProcessor:
         self._stop_event.clear()
         
         # --- セッションデータをリセット ---
-        self.full_transcript = ""
-        self.pitch_values = []
-        self._pitch_buffer = b"" # ピッチ解析バッファもリセット
-        self.last_pitch_analysis_summary = {}
-        self.last_emotion_analysis_summary = {}
+        self.transcript.reset()
+        self.pitch_stats.clear()
+        if self._pitch_ring:
+            self._pitch_ring.clear() # ピッチ解析バッファもリセット
+        self._reset_vad()
+        self._reset_pitch_tracker()
+        self.timeline.reset()
         # --- ここまで ---
 
         # メインループを取得
@@ -464,6 +769,7 @@ class SpeechProcessor:
         
         # Speech-to-Textの処理タスクを開始
         self._processing_task = asyncio.create_task(self._process_speech_stream())
+        await self._start_workers()
         logger.info("🔥 マイク音声のメイン処理ループを開始しました。")
 
 
@@ -481,10 +787,9 @@ class SpeechProcessor:
         self._is_running = False
         self._stop_event.set()
 
-        # 2. 音声キューをクリアし、ジェネレータに終了を通知するためのダミーデータを送信
-        while not self._audio_queue.empty():
-            self._audio_queue.get_nowait()
-        await self._audio_queue.put(b"") #ジェネレータを確実に終了させる
+        # 2. 音声フィーダーを閉じて、ジェネレータに終了を通知する
+        self._audio_feeder.close()
+        await self._report_audio_feeder_stats()
 
         # 3. メインの処理タスクをキャンセル
         if self._processing_task and not self._processing_task.done():
@@ -497,6 +802,9 @@ class SpeechProcessor:
 
         # 4. ワーカーを停止（これは_process_speech_streamのfinallyでも呼ばれるけど念のため）
         await self._stop_workers()
+        self._close_dsp_session()
+        # 送りきれていないピッチ輪郭の点があれば送っておく
+        await self._flush_pitch_points(final=True)
 
         # 5. 手動テスト用のマイクスレッドが動いていたら停止
         if self._microphone_task and self._microphone_task.is_alive():
@@ -504,6 +812,13 @@ class SpeechProcessor:
             self._microphone_task.join()
             self._microphone_task = None
 
+        if self._stt_gate:
+            dropped_seconds = self._stt_gate.dropped_bytes / (RATE * SAMPLE_WIDTH)
+            logger.info(
+                f"🤫 無音カット: {dropped_seconds:.1f}秒分の音声を文字起こしに送らずに済みました "
+                f"({self._stt_gate.dropped_ratio:.0%})"
+            )
+
         logger.info("⏳ 全てのリアルタイム処理を停止しました。最終評価を開始します...")
         await self._send_to_client("evaluation_started", {})
 
@@ -515,6 +830,10 @@ class SpeechProcessor:
             if final_evaluation_result and "error" not in final_evaluation_result:
                 logger.info("👑 最終評価が完了しました！クライアントに送信します。")
                 await self._send_to_client("final_evaluation", final_evaluation_result)
+                # メタ評価は送った後に裏で回す (サンプリングで選ばれたセッションだけ)
+                self.gemini_service.submit_meta_evaluation(
+                    self.session_id, self.transcript.text(), final_evaluation_result, self._deliver_meta_evaluation
+                )
             else:
                 logger.error("最終評価に失敗したか、エラーが含まれています。")
                 error_message = final_evaluation_result.get("error", "最終評価の生成中に不明なエラーが発生しました。") if isinstance(final_evaluation_result, dict) else "最終評価の生成中に不明なエラーが発生しました。"
@@ -537,33 +856,32 @@ class SpeechProcessor:
             logger.warning("Gemini評価が無効になっているため、評価をスキップします。")
             return {"error": "Gemini evaluation is disabled."}
 
-        # 1. ピッチデータの集計
-        pitch_summary = self._summarize_pitch_data()
-        
-        # TODO: 感情分析データの集計ロジックを実装する
-        logger.warning("セッション中の感情分析データは現在集計されていません。最終評価ではダミー値を使用します。")
-        emotion_summary = {
-            "dominant_emotion": "分析中",
-            "emotion_score": "N/A"
-        }
-
-        # 2. Geminiに渡すための評価コンテキストを作成
-        evaluation_context = {
-            "interview_question": self.current_interview_question,
-            "transcript": self.full_transcript,
-            "average_pitch": pitch_summary.get("average_pitch", "N/A"),
-            "pitch_variation": pitch_summary.get("pitch_variation", "N/A"),
-            "dominant_emotion": emotion_summary.get("dominant_emotion", "N/A"),
-            "emotion_score": emotion_summary.get("emotion_score", "N/A"),
-        }
-        
+        evaluation_context = self._build_evaluation_context()
         logger.info("Geminiに渡す評価コンテキストを作成しました。")
-        
-        # 3. Geminiサービスを呼び出し
-        try:
-            gemini_eval = await self.gemini_service.generate_structured_feedback(
-                evaluation_context=evaluation_context
+
+        # 先回りした評価のコンテキストが今と丸ごと同じなら、それを返す (Geminiの往復を待たなくていい！)
+        if self._speculative:
+            speculative, self._speculative = self._speculative, None
+            speculative_eval = await speculative.result_for(evaluation_context)
+            await speculative.close()
+            logger.info(
+                f"🔮 先回り評価: {speculative.runs}回実行 (キャンセル {speculative.cancelled}回), "
+                f"{'使えました' if speculative_eval else '使えませんでした'}"
             )
+            if speculative_eval:
+                return speculative_eval
+
+        # 3. Geminiサービスを呼び出し (ストリーミングなら、STARの項目ができたそばから evaluation_partial で送る)
+        try:
+            if GEMINI_STREAMING_EVALUATION:
+                gemini_eval = await self.gemini_service.stream_structured_feedback(
+                    evaluation_context=evaluation_context,
+                    on_partial=self._send_evaluation_partial,
+                )
+            else:
+                gemini_eval = await self.gemini_service.generate_structured_feedback(
+                    evaluation_context=evaluation_context
+                )
         except Exception as e:
             logger.error(f"Geminiサービス呼び出し中に予期せぬエラーが発生: {e}", exc_info=True)
             return {"error": "An unexpected error occurred while calling the Gemini service."}
@@ -577,34 +895,74 @@ class SpeechProcessor:
             logger.error(f"⛑️ Geminiからの評価取得に失敗しました: {error_msg}")
             return {"error": f"Failed to get evaluation from Gemini: {error_msg}"}
 
+    def _build_evaluation_context(self) -> dict:
+        """
+        その時点のデータから、Geminiに渡す評価コンテキストを作る (最終評価と先回り評価で共通)。
+        """
+        # 1. ピッチデータの集計
+        pitch_summary = self._summarize_pitch_data()
+        
+        # 感情分析の集計は、結果が届くたびにタイムラインで更新済み
+        emotion_summary = self.timeline.evaluation_summary()
+        if "dominant_emotion" not in emotion_summary:
+            logger.info("このセッションでは感情分析の結果がありませんでした。")
 
-    def _summarize_pitch_data(self):
-        """ピッチデータのリストから統計情報を計算するよ"""
-        if not self.pitch_values:
-            logger.info("ピッチデータが収集されなかったので、ピッチの要約はスキップします。")
-            return {}
+        # 2. Geminiに渡すための評価コンテキストを作成
+        return {
+            "interview_question": self.current_interview_question,
+            "transcript": self.transcript.text(),
+            "average_pitch": pitch_summary.get("average_pitch", "N/A"),
+            "pitch_variation": pitch_summary.get("pitch_variation", "N/A"),
+            "pitch_min": pitch_summary.get("pitch_min", "N/A"),
+            "pitch_max": pitch_summary.get("pitch_max", "N/A"),
+            "pitch_p10": pitch_summary.get("pitch_p10", "N/A"),
+            "pitch_p50": pitch_summary.get("pitch_p50", "N/A"),
+            "pitch_p90": pitch_summary.get("pitch_p90", "N/A"),
+            "dominant_emotion": emotion_summary.get("dominant_emotion", "N/A"),
+            "emotion_score": emotion_summary.get("emotion_score", "N/A"),
+            "emotion_magnitude": emotion_summary.get("emotion_magnitude", "N/A"),
+            "emotion_breakdown": emotion_summary.get("emotion_breakdown", "N/A"),
+        }
 
-        # npをインポート
-        try:
-            import numpy as np
-        except ImportError:
-            logger.warning("numpyがインストールされていないため、ピッチの統計情報を計算できません。")
-            return {}
 
+    async def _deliver_meta_evaluation(self, meta_evaluation: dict):
+        """
+        メタ評価の結果を、セッションの記録 (Pub/Sub) に残して、まだつながっていればクライアントにも送る。
+        """
+        await self._publish_to_pubsub({"type": "meta_evaluation", **meta_evaluation})
         try:
-            pitches = np.array(self.pitch_values)
-            average_pitch = np.mean(pitches)
-            pitch_variation = np.std(pitches)
-            
-            summary = {
-                "average_pitch": f"{average_pitch:.2f}",
-                "pitch_variation": f"{pitch_variation:.2f}",
-            }
-            return summary
+            await self._send_to_client("meta_evaluation", meta_evaluation)
         except Exception as e:
-            logger.error(f"ピッチデータの要約中にエラー: {e}", exc_info=True)
+            logger.info(f"メタ評価の結果をクライアントに送れませんでした (切断済み?): {e}")
+
+    async def _send_evaluation_partial(self, section: str, evaluation: dict):
+        """できあがったSTARの項目を1つ送る (最後に final_evaluation で全体を送り直すよ)"""
+        logger.info(f"📝 STAR評価の「{section}」ができたので先に送ります。")
+        await self._send_to_client("evaluation_partial", {"section": section, "evaluation": evaluation})
+
+    def _summarize_pitch_data(self):
+        """
+        ピッチの統計情報をまとめるよ。
+        統計はセッション中に逐次更新してあるので、ここでは整形するだけ (セッションの長さに関係なく一瞬！)
+        """
+        stats = self.pitch_stats.summary()
+        if not stats:
+            logger.info("ピッチデータが収集されなかったので、ピッチの要約はスキップします。")
             return {}
 
+        summary = {
+            "average_pitch": f"{stats['mean']:.2f}",
+            "pitch_variation": f"{stats['std']:.2f}",
+            "pitch_min": f"{stats['min']:.2f}",
+            "pitch_max": f"{stats['max']:.2f}",
+            "pitch_p10": f"{stats['p10']:.2f}",
+            "pitch_p50": f"{stats['p50']:.2f}",
+            "pitch_p90": f"{stats['p90']:.2f}",
+            "pitch_sample_count": stats["count"],
+        }
+        logger.info(f"🎶 ピッチの要約: {summary}")
+        return summary
+
 
     def __del__(self):
         # オブジェクトが破棄されるときにPyAudioをクリーンアップ
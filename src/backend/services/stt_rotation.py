@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TranscriptResult:
+    """ストリーミング認識の結果1つぶん (Google のレスポンスに依存しない形にしてあるよ)。"""
+    transcript: str
+    is_final: bool
+    stream_index: int = 0
+    # ストリーム開始からの、この結果の終わりの時刻 (秒)。わからなければ None
+    end_offset: float | None = None
+
+
+# recognize(audio) は、音声の非同期イテレータを受け取って TranscriptResult の非同期イテレータを返す
+Recognizer = Callable[[AsyncIterator[bytes]], Awaitable[AsyncIterator[TranscriptResult]]]
+
+_END = object()
+
+
+class _StreamLeg:
+    """ローテーションで作られる1本ぶんのストリーミング認識。"""
+
+    def __init__(self, index: int, started_at: float, replayed_seconds: float):
+        self.index = index
+        self.started_at = started_at
+        self.replayed_seconds = replayed_seconds  # 先頭でリプレイした重なり部分の長さ
+        self.audio = asyncio.Queue()
+        self.task = None
+        self.closed_by_us = False  # こっちから音声を閉じて、正常に終わらせたか
+        self.expired = False  # APIに打ち切られた (OutOfRange など)
+        self.ended = False
+        self.emitted_final = False
+        self.held = []  # 前のストリームが終わるまで待たせている確定結果
+
+    async def audio_requests(self) -> AsyncIterator[bytes]:
+        while True:
+            chunk = await self.audio.get()
+            if chunk is None:
+                return
+            yield chunk
+
+
+class RotatingSpeechStream:
+    """
+    Speech-to-Text のストリーミング認識を、制限時間 (~5分) の少し前に新しいストリームへ張り替えるよ。
+
+    - rotate_after 秒たったら、次の音声から新しいストリームに送る。古いストリームは音声を閉じて、残りの確定結果を出し切らせる
+    - 新しいストリームの先頭には、直近 overlap_seconds 秒の音声をリプレイするので、境界の単語が切れない
+    - リプレイ部分の確定結果は重複になるので、時刻 (end_offset) と文字列の重なりで取り除く
+    - 前のストリームが終わるまで、新しいストリームの確定結果は待たせておくので順番が入れ替わらない
+    - rotate_on に指定した例外 (OutOfRange など) で打ち切られたときも、次の音声で張り替えて続けるよ
+    """
+
+    def __init__(self, recognize: Recognizer, bytes_per_second: int, rotate_after: float = 270.0,
+                 overlap_seconds: float = 2.0, rotate_on: tuple = (), clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            recognize (Recognizer): 1本ぶんのストリーミング認識を開始する関数。
+            bytes_per_second (int): 音声1秒あたりのバイト数 (16kHz / 16-bit なら 32000)。
+            rotate_after (float): ストリームを張り替えるまでの秒数。API の上限より少し短くしてね。
+            overlap_seconds (float): 新しいストリームの先頭でリプレイする音声の長さ (秒)。
+            rotate_on (tuple): ストリームの打ち切りとして扱う (= 張り替えて続ける) 例外の型。
+            clock (Callable[[], float]): 経過時間を測る時計 (テスト用に差し替えられる)。
+        """
+        if rotate_after <= 0:
+            raise ValueError(f"rotate_after は正の値である必要があります: {rotate_after}")
+        self.recognize = recognize
+        self.bytes_per_second = bytes_per_second
+        self.rotate_after = rotate_after
+        self.overlap_bytes = int(bytes_per_second * overlap_seconds)
+        self.rotate_on = tuple(rotate_on)
+        self.clock = clock
+        self._overlap = deque()
+        self._overlap_size = 0
+        self.rotations = 0
+        self.duplicates_dropped = 0
+
+    async def results(self, audio_source: AsyncIterator[bytes]) -> AsyncIterator[TranscriptResult]:
+        """
+        audio_source の音声を認識して、結果を順番に返す非同期ジェネレータ。
+        audio_source が終わり、全部のストリームが結果を出し切ったら終わる。
+        """
+        self._out = asyncio.Queue()
+        self._legs = []
+        self._last_final_text = ""
+        self._audio_done = False
+        pump = asyncio.create_task(self._pump(audio_source))
+        pump_done = False
+        try:
+            while not (pump_done and all(leg.ended for leg in self._legs)):
+                leg, item = await self._out.get()
+                if leg is None:  # ポンプ側の終了 / エラー
+                    if isinstance(item, BaseException):
+                        raise item
+                    pump_done = True
+                    continue
+                if isinstance(item, BaseException):
+                    raise item
+                if item is _END:
+                    leg.ended = True
+                    for result in self._release_held():
+                        yield result
+                    continue
+                if self._has_active_predecessor(leg):
+                    # 前のストリームがまだ出し切っていない。確定結果だけ取っておく (途中結果は捨てる)
+                    if item.is_final:
+                        leg.held.append(item)
+                    continue
+                result = self._deduplicate(leg, item)
+                if result is not None:
+                    yield result
+        finally:
+            pump.cancel()
+            for leg in self._legs:
+                if leg.task is not None:
+                    leg.task.cancel()
+
+    # --- 音声の振り分け ---
+
+    async def _pump(self, audio_source: AsyncIterator[bytes]):
+        try:
+            leg = self._open_leg()
+            async for chunk in audio_source:
+                if leg.expired or self.clock() - leg.started_at >= self.rotate_after:
+                    leg = self._rotate(leg)
+                leg.audio.put_nowait(chunk)
+                self._remember(chunk)
+            self._audio_done = True
+            if leg.expired:
+                # 最後のチャンクのあたりで打ち切られていたら、リプレイだけのストリームで拾い直す
+                leg = self._rotate(leg)
+            leg.closed_by_us = True
+            leg.audio.put_nowait(None)
+            self._out.put_nowait((None, _END))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._out.put_nowait((None, e))
+
+    def _remember(self, chunk: bytes):
+        """直近 overlap_bytes ぶんの音声をリプレイ用に覚えておく。"""
+        if self.overlap_bytes <= 0:
+            return
+        self._overlap.append(chunk)
+        self._overlap_size += len(chunk)
+        while self._overlap and self._overlap_size - len(self._overlap[0]) >= self.overlap_bytes:
+            self._overlap_size -= len(self._overlap.popleft())
+
+    def _open_leg(self, replay: list[bytes] = ()) -> _StreamLeg:
+        replayed = sum(len(chunk) for chunk in replay) / self.bytes_per_second
+        leg = _StreamLeg(len(self._legs), self.clock(), replayed)
+        for chunk in replay:
+            leg.audio.put_nowait(chunk)
+        leg.task = asyncio.create_task(self._run_leg(leg))
+        self._legs.append(leg)
+        return leg
+
+    def _rotate(self, leg: _StreamLeg) -> _StreamLeg:
+        if not leg.expired:
+            leg.closed_by_us = True
+        leg.audio.put_nowait(None)
+        self.rotations += 1
+        replay = list(self._overlap)
+        logger.info(
+            f"🔁 STTストリームを張り替えます (#{leg.index} → #{leg.index + 1}, "
+            f"経過: {self.clock() - leg.started_at:.1f}秒, リプレイ: {self._overlap_size / self.bytes_per_second:.1f}秒)"
+        )
+        return self._open_leg(replay)
+
+    async def _run_leg(self, leg: _StreamLeg):
+        try:
+            stream = await self.recognize(leg.audio_requests())
+            async for result in stream:
+                result.stream_index = leg.index
+                self._out.put_nowait((leg, result))
+        except asyncio.CancelledError:
+            raise
+        except self.rotate_on as e:
+            logger.warning(f"⏱️ STTストリーム #{leg.index} が打ち切られました。次の音声で張り替えます: {e}")
+            leg.expired = True
+            leg.closed_by_us = False
+            if self._audio_done and leg is self._legs[-1]:
+                # 音声はもう来ないので、ここでリプレイだけのストリームを開いて閉じる
+                replacement = self._rotate(leg)
+                replacement.closed_by_us = True
+                replacement.audio.put_nowait(None)
+        except Exception as e:
+            self._out.put_nowait((leg, e))
+            return
+        self._out.put_nowait((leg, _END))
+
+    # --- 結果の並べ替えと重複除去 ---
+
+    def _has_active_predecessor(self, leg: _StreamLeg) -> bool:
+        return any(not other.ended for other in self._legs[:leg.index])
+
+    def _release_held(self) -> list[TranscriptResult]:
+        released = []
+        for leg in self._legs:
+            if self._has_active_predecessor(leg):
+                break
+            while leg.held:
+                result = self._deduplicate(leg, leg.held.pop(0))
+                if result is not None:
+                    released.append(result)
+        return released
+
+    def _deduplicate(self, leg: _StreamLeg, result: TranscriptResult) -> TranscriptResult | None:
+        if not result.is_final:
+            return result
+        first_final = not leg.emitted_final
+        if leg.index > 0 and first_final:
+            previous = self._legs[leg.index - 1]
+            # 前のストリームが最後まで認識し終えていれば、リプレイ部分に収まる結果はまるごと重複
+            if (previous.closed_by_us and result.end_offset is not None
+                    and result.end_offset <= leg.replayed_seconds):
+                self.duplicates_dropped += 1
+                return None
+            overlap = _text_overlap(self._last_final_text, result.transcript)
+            if overlap:
+                trimmed = result.transcript[overlap:].lstrip()
+                self.duplicates_dropped += 1
+                if not trimmed:
+                    return None
+                result.transcript = trimmed
+        leg.emitted_final = True
+        self._last_final_text = result.transcript
+        return result
+
+
+def _text_overlap(previous: str, current: str, min_length: int = 4) -> int:
+    """previous の末尾と current の先頭が重なっている文字数 (min_length 未満なら 0)。"""
+    previous = previous.rstrip()
+    for n in range(min(len(previous), len(current)), min_length - 1, -1):
+        if previous.endswith(current[:n]):
+            return n
+    return 0
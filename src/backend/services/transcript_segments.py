@@ -0,0 +1,74 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# transcript_update の送り方
+PROTOCOL_FULL = "full"  # 従来どおり、毎回それまでの全文を送る
+PROTOCOL_DELTA = "delta"  # 変わった断片だけを transcript_delta で送る
+PROTOCOLS = (PROTOCOL_FULL, PROTOCOL_DELTA)
+
+STATUS_STABLE = "stable"
+STATUS_INTERIM = "interim"
+
+
+class TranscriptSegments:
+    """
+    文字起こしを「確定した断片のリスト + 途中の断片1つ」で持つよ。
+
+    - 確定結果が来たら断片を1つ追加するだけ (文字列の連結はしない)
+    - 全文が必要になったとき (評価のときなど) に1回だけ join して、次の確定までキャッシュする
+    - update() はクライアントに送る差分 {"segment_id", "status", "text"} を返す
+      segment_id は断片の番号で、途中結果は次に確定する断片と同じ番号を使う
+    """
+
+    def __init__(self, separator: str = " "):
+        self.separator = separator
+        self.reset()
+
+    def reset(self):
+        self._segments: list[str] = []
+        self._interim = ""
+        self._joined = None
+
+    def __len__(self) -> int:
+        return len(self._segments)
+
+    @property
+    def segments(self) -> tuple[str, ...]:
+        """確定した断片。"""
+        return tuple(self._segments)
+
+    @property
+    def interim(self) -> str:
+        """まだ確定していない途中の断片。"""
+        return self._interim
+
+    def update(self, transcript: str, is_final: bool) -> dict | None:
+        """
+        STTの結果を1つ反映して、クライアントに送る差分を返す。
+        途中結果が前回と同じ文字列なら、送る必要がないので None を返すよ。
+        """
+        segment_id = len(self._segments)
+        if is_final:
+            self._segments.append(transcript)
+            self._interim = ""
+            self._joined = None
+            return {"segment_id": segment_id, "status": STATUS_STABLE, "text": transcript}
+        if transcript == self._interim:
+            return None
+        self._interim = transcript
+        return {"segment_id": segment_id, "status": STATUS_INTERIM, "text": transcript}
+
+    def text(self) -> str:
+        """確定した全文 (断片を separator でつないだもの)。"""
+        if self._joined is None:
+            self._joined = self.separator.join(self._segments)
+        return self._joined
+
+    def display_text(self) -> str:
+        """確定した全文 + 途中の断片 (従来の transcript_update 用)。"""
+        if not self._interim:
+            return self.text()
+        if not self._segments:
+            return self._interim
+        return self.text() + self.separator + self._interim
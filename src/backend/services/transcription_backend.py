@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import random
+from abc import ABC, abstractmethod
+from typing import AsyncIterator
+
+from google.cloud import speech_v1p1beta1 as speech
+
+from backend.services.stt_rotation import TranscriptResult
+
+logger = logging.getLogger(__name__)
+
+
+class TranscriptionBackend(ABC):
+    """
+    ストリーミング文字起こしのバックエンドのインターフェースだよ。
+    recognize() を実装していないサブクラスは、インスタンスを作る時点でエラーになる。
+
+    recognize(audio) はストリーミング認識を1本開始して、TranscriptResult の非同期イテレータを返す。
+    RotatingSpeechStream の張り替えのたびに呼ばれるので、1セッションで何度も呼ばれることがあるよ。
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def recognize(self, audio: AsyncIterator[bytes]) -> AsyncIterator[TranscriptResult]:
+        """ストリーミング認識を1本開始して、TranscriptResult を順に返す。"""
+
+    async def close(self):
+        """プロセス終了時に、クライアントを片付ける。"""
+
+
+class GoogleTranscriptionBackend(TranscriptionBackend):
+    """Google Cloud Speech-to-Text のストリーミング認識 (デフォルト)。"""
+
+    name = "google"
+
+    def __init__(self, sample_rate: int = 16000, language_code: str = "ja-JP", credentials=None):
+        self.sample_rate = sample_rate
+        self.language_code = language_code
+        # grpc.aio のチャネルを作るので、イベントループのスレッドで作ること！
+        self.client = speech.SpeechAsyncClient(credentials=credentials)
+
+    async def close(self):
+        await self.client.transport.close()
+
+    def _streaming_config(self) -> speech.StreamingRecognitionConfig:
+        recognition_config = speech.RecognitionConfig(
+            encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+            sample_rate_hertz=self.sample_rate,
+            language_code=self.language_code,
+            enable_automatic_punctuation=True,
+            profanity_filter=True, # 不適切な単語をフィルタリング
+        )
+        return speech.StreamingRecognitionConfig(
+            config=recognition_config,
+            interim_results=True, # 暫定的な結果も受け取る
+        )
+
+    async def _requests(self, audio: AsyncIterator[bytes]):
+        """最初に設定情報を送って、そのあとはひたすら音声データを送る！"""
+        yield speech.StreamingRecognizeRequest(streaming_config=self._streaming_config())
+        async for chunk in audio:
+            if not chunk:
+                break
+            yield speech.StreamingRecognizeRequest(audio_content=chunk)
+
+    async def recognize(self, audio: AsyncIterator[bytes]) -> AsyncIterator[TranscriptResult]:
+        # streaming_recognizeはコルーチンなのでawaitする
+        stream = await self.client.streaming_recognize(requests=self._requests(audio))
+
+        async def results():
+            async for response in stream:
+                if not response.results:
+                    continue
+                result = response.results[0]
+                if not result.alternatives:
+                    continue
+                end_time = result.result_end_time
+                yield TranscriptResult(
+                    transcript=result.alternatives[0].transcript,
+                    is_final=result.is_final,
+                    end_offset=end_time.total_seconds() if end_time is not None else None,
+                )
+
+        return results()
+
+
+# フェイクが読み上げる台本 (スペース区切りの単語を、音声 word_seconds 秒ごとに1つずつ「認識」する)
+DEFAULT_SCRIPT = (
+    "私は 前職で バックエンドの 開発を 担当していました。",
+    "特に 音声処理の パイプラインを 設計して、 遅延を 半分に しました。",
+    "チームでは レビューの 文化を 大事に しています。",
+)
+
+
+class FakeTranscriptionBackend(TranscriptionBackend):
+    """
+    GCP なしで動く、プロセス内のフェイク認識器だよ。負荷試験や、パイプライン自体の遅延の測定に使う。
+
+    - 受け取った音声が word_seconds 秒たまるごとに、台本の次の単語を途中結果 (interim) として出す
+    - 文の最後の単語で確定結果 (final) を出して、次の文に進む (台本は繰り返す)
+    - 音声が閉じられたら、途中の文をそこまでで確定させる (Google の half-close と同じ)
+    - 結果は latency ± jitter 秒遅れて届く。順番は入れ替わらないよ
+    """
+
+    name = "fake"
+
+    def __init__(self, sample_rate: int = 16000, sample_width: int = 2, script=DEFAULT_SCRIPT,
+                 word_seconds: float = 0.4, latency: float = 0.3, jitter: float = 0.1, seed: int | None = None):
+        """
+        Args:
+            sample_rate (int): 受け取る音声のサンプリングレート (Hz)。
+            sample_width (int): 1サンプルあたりのバイト数。
+            script: 認識結果として出す文のリスト (単語はスペース区切り)。
+            word_seconds (float): 1単語あたりの音声の長さ (秒)。
+            latency (float): 結果が届くまでの遅延 (秒)。
+            jitter (float): 遅延のゆらぎ (秒)。latency ± jitter の一様分布になる。
+            seed (int | None): ゆらぎの乱数シード。
+        """
+        if word_seconds <= 0:
+            raise ValueError(f"word_seconds は正の値である必要があります: {word_seconds}")
+        self.bytes_per_second = sample_rate * sample_width
+        self.phrases = [phrase.split() for phrase in script if phrase.split()]
+        if not self.phrases:
+            raise ValueError("script には1つ以上の単語が必要です。")
+        self.word_seconds = word_seconds
+        self.word_bytes = max(1, round(word_seconds * self.bytes_per_second))
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self.streams_opened = 0
+        self.results_emitted = 0
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+
+    async def recognize(self, audio: AsyncIterator[bytes]) -> AsyncIterator[TranscriptResult]:
+        self.streams_opened += 1
+        loop = asyncio.get_running_loop()
+        scheduled = asyncio.Queue()
+
+        async def listen():
+            received = 0
+            words_done = 0  # このストリームで出し終えた単語の数
+            phrase_index, n_words = 0, 0
+            last_due = 0.0
+
+            def schedule(is_final: bool):
+                nonlocal last_due
+                words = self.phrases[phrase_index % len(self.phrases)]
+                result = TranscriptResult(
+                    transcript="".join(words[:n_words]),
+                    is_final=is_final,
+                    end_offset=received / self.bytes_per_second,
+                )
+                # 遅延がゆらいでも、前の結果より先には届かない
+                last_due = max(last_due, loop.time() + self._delay())
+                scheduled.put_nowait((last_due, result))
+
+            try:
+                async for chunk in audio:
+                    received += len(chunk)
+                    while words_done < received // self.word_bytes:
+                        words_done += 1
+                        n_words += 1
+                        if n_words == len(self.phrases[phrase_index % len(self.phrases)]):
+                            schedule(is_final=True)
+                            phrase_index, n_words = phrase_index + 1, 0
+                        else:
+                            schedule(is_final=False)
+                if n_words:
+                    schedule(is_final=True)
+            finally:
+                scheduled.put_nowait(None)
+
+        async def results():
+            listener = asyncio.create_task(listen())
+            try:
+                while True:
+                    item = await scheduled.get()
+                    if item is None:
+                        break
+                    due, result = item
+                    wait = due - loop.time()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    self.results_emitted += 1
+                    yield result
+                await listener  # 音声側で起きた例外はここで伝える
+            finally:
+                listener.cancel()
+
+        return results()
+
+
+BACKENDS = {
+    GoogleTranscriptionBackend.name: GoogleTranscriptionBackend,
+    FakeTranscriptionBackend.name: FakeTranscriptionBackend,
+}
+
+
+def create_transcription_backend(name: str = "google", **kwargs) -> TranscriptionBackend:
+    """設定の名前 ("google" / "fake") からバックエンドを作る。"""
+    if name not in BACKENDS:
+        raise ValueError(f"サポートされていない文字起こしバックエンド: {name}。{tuple(BACKENDS)} のどれかを指定してね。")
+    backend = BACKENDS[name](**kwargs)
+    logger.info(f"📝 文字起こしバックエンド: {name}")
+    return backend
@@ -35,12 +35,70 @@ FORMAT = pyaudio.paInt16
 # paInt16 は 16bit = 2byte だから、2になるよ。
 SAMPLE_WIDTH = 2
 
+# 音声解析 (audio:) の設定
+_audio_config = config.get("audio", {}) or {}
+
+# Speech-to-Text に送る1リクエストあたりの音声の長さ (ミリ秒)。Googleの推奨は100ms前後
+STT_REQUEST_MS = int(_audio_config.get("stt_request_ms", 100))
+
+# STTへの送信待ちキューの上限 (秒) と、あふれたときのポリシー ("block" / "drop_oldest" / "drop_silence")
+_stt_queue_config = _audio_config.get("stt_queue", {}) or {}
+STT_QUEUE_MAX_SECONDS = float(_stt_queue_config.get("max_seconds", 5.0))
+STT_QUEUE_POLICY = _stt_queue_config.get("policy", "drop_silence")
+
+# 文字起こしのバックエンド ("google" または "fake")。環境変数 STT_BACKEND で上書きできるよ
+STT_BACKEND = os.getenv("STT_BACKEND", _audio_config.get("stt_backend", "google"))
+_stt_fake_config = _audio_config.get("stt_fake", {}) or {}
+STT_FAKE_LATENCY_MS = float(_stt_fake_config.get("latency_ms", 300))
+STT_FAKE_JITTER_MS = float(_stt_fake_config.get("jitter_ms", 100))
+
+# ストリーミング認識の張り替え (Googleは ~5分でストリームを閉じるので、その前に張り替える)
+_stt_stream_config = _audio_config.get("stt_stream", {}) or {}
+STT_STREAM_ROTATE_SECONDS = float(_stt_stream_config.get("rotate_after_seconds", 270))
+STT_STREAM_OVERLAP_SECONDS = float(_stt_stream_config.get("overlap_seconds", 2.0))
+
+# ピッチ輪郭の出力 (pitch_analysis イベント) の設定
+PITCH_OUTPUT_RATE_HZ = float(_audio_config.get("pitch_output_rate_hz", 10))
+PITCH_POINTS_PER_MESSAGE = int(_audio_config.get("pitch_points_per_message", 2))
+
+# ピッチ解析の実行場所 ("inline" または "engine")
+PITCH_BACKEND = _audio_config.get("pitch_backend", "inline")
+_dsp_config = _audio_config.get("dsp_engine", {}) or {}
+DSP_ENGINE_WORKERS = int(_dsp_config.get("workers", 2))
+DSP_ENGINE_MAX_SESSIONS = int(_dsp_config.get("max_sessions", 64))
+
+# 無音検出 (VAD) の設定
+_vad_config = _audio_config.get("vad", {}) or {}
+VAD_ENABLED = _vad_config.get("enabled", True)
+VAD_ENERGY_THRESHOLD_DB = float(_vad_config.get("energy_threshold_db", -50.0))
+VAD_HANGOVER_MS = float(_vad_config.get("hangover_ms", 300))
+VAD_KEEP_SILENCE_MS = float(_vad_config.get("keep_silence_ms", 600))
+VAD_KEEPALIVE_MS = float(_vad_config.get("keepalive_ms", 5000))
+
 # Geminiのモデル設定
 GEMINI_MODEL_NAME = config.get("gemini", {}).get("model_name", "gemini-1.5-flash-001")
+# 最終評価をストリーミングで生成して、STARの項目ができたそばから evaluation_partial で送るか
+GEMINI_STREAMING_EVALUATION = bool(config.get("gemini", {}).get("streaming_evaluation", True))
+# 話の切れ目で最終評価を先回りする設定 (1セッションあたりの回数と間隔で、コストに上限をかける)
+# キャンセルした先回りもGeminiの課金対象なので、デフォルトはオフ
+_speculative_config = config.get("gemini", {}).get("speculative", {}) or {}
+SPECULATIVE_EVALUATION_ENABLED = bool(_speculative_config.get("enabled", False))
+SPECULATIVE_PAUSE_SECONDS = float(_speculative_config.get("pause_seconds", 2.0))
+SPECULATIVE_MIN_NEW_CHARS = int(_speculative_config.get("min_new_chars", 40))
+SPECULATIVE_MIN_INTERVAL_SECONDS = float(_speculative_config.get("min_interval_seconds", 30.0))
+SPECULATIVE_MAX_RUNS = int(_speculative_config.get("max_runs", 3))
 
 # Dialogflowの設定
 DIALOGFLOW_LANGUAGE_CODE = config.get("dialogflow", {}).get("language_code", "ja")
 DIALOGFLOW_LOCATION = config.get("dialogflow", {}).get("location") # デフォルトNoneをやめて、設定ファイルに必須とする
+# 感情分析ステージの同時実行数・キューの長さ・セッション終了時に待つ秒数
+_sentiment_config = config.get("dialogflow", {}).get("sentiment", {}) or {}
+SENTIMENT_CONCURRENCY = int(_sentiment_config.get("concurrency", 4))
+SENTIMENT_QUEUE_SIZE = int(_sentiment_config.get("max_queue", 64))
+SENTIMENT_DRAIN_SECONDS = float(_sentiment_config.get("drain_seconds", 5.0))
+# 文の区切りが来ないときに、たまった断片を送ってしまうまでの秒数と、結果のLRUキャッシュの件数
+SENTIMENT_SENTENCE_TIMEOUT_SECONDS = float(_sentiment_config.get("sentence_timeout_seconds", 1.5))
+SENTIMENT_CACHE_SIZE = int(_sentiment_config.get("cache_size", 1024))
 
 # Pub/Subのトピック名
 PUBSUB_TOPIC_ID = config.get("pubsub", {}).get("topic_id", "ep-x-transcriptions")
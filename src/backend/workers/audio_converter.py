@@ -0,0 +1,187 @@
+# このモジュールは NumPy ライブラリに依存しています。
+
+import logging
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+logger = logging.getLogger(__name__)
+
+# クライアントが宣言できるサンプル形式 → NumPy の dtype
+ENCODINGS = {
+    "int16": np.dtype("<i2"),
+    "float32": np.dtype("<f4"),
+}
+
+
+def _as_int(name: str, value) -> int:
+    """JSON から来た数値を int にする。整数として読めない値 (null・文字列・小数・真偽値) は ValueError。"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not float(value).is_integer():
+        raise ValueError(f"{name} は整数で指定してね: {value!r}")
+    return int(value)
+
+
+class AudioFormat:
+    """
+    クライアントが送ってくる音声の形式 (start アクションの audio_format で宣言してもらう)。
+    例: {"encoding": "float32", "sample_rate": 48000, "channels": 1}
+    """
+
+    def __init__(self, encoding: str = "int16", sample_rate: int = 16000, channels: int = 1):
+        if not isinstance(encoding, str) or encoding not in ENCODINGS:
+            raise ValueError(f"サポートされていないエンコーディング: {encoding!r}。{tuple(ENCODINGS)} のどれかを指定してね。")
+        sample_rate = _as_int("sample_rate", sample_rate)
+        channels = _as_int("channels", channels)
+        if not 8000 <= sample_rate <= 192000:
+            raise ValueError(f"サポートされていないサンプリングレート: {sample_rate}")
+        if not 1 <= channels <= 8:
+            raise ValueError(f"サポートされていないチャンネル数: {channels}")
+        self.encoding = encoding
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.dtype = ENCODINGS[encoding]
+
+    @classmethod
+    def from_message(cls, message: dict | None) -> "AudioFormat":
+        """
+        start アクションの audio_format (省略時は従来どおり 16kHz / int16 / モノラル) から作る。
+        クライアントから来た値なので、型がおかしいときも ValueError にそろえるよ。
+        """
+        if message is None:
+            message = {}
+        if not isinstance(message, dict):
+            raise ValueError(f"audio_format はオブジェクトで指定してね: {message!r}")
+        return cls(
+            encoding=message.get("encoding", "int16"),
+            sample_rate=message.get("sample_rate", 16000),
+            channels=message.get("channels", 1),
+        )
+
+    @property
+    def frame_bytes(self) -> int:
+        """1サンプル (全チャンネル分) のバイト数。"""
+        return self.dtype.itemsize * self.channels
+
+    def __repr__(self):
+        return f"AudioFormat({self.encoding}, {self.sample_rate}Hz, {self.channels}ch)"
+
+
+class PolyphaseResampler:
+    """
+    チャンク単位で使えるポリフェーズ・リサンプラーだよ。
+
+    レート比を L/M (既約分数) にして、「L倍にアップサンプル → ローパス → 1/M にダウンサンプル」を
+    出力サンプルに必要な位相の係数だけで直接計算する。前のチャンクの末尾を履歴として持つので、
+    チャンクの境界でもつなぎ目が出ない。1チャンクぶんの出力は1回の einsum でまとめて計算するよ。
+    """
+
+    def __init__(self, source_rate: int, target_rate: int, taps_per_phase: int = 24, kaiser_beta: float = 8.0):
+        """
+        Args:
+            source_rate (int): 入力のサンプリングレート (Hz)。
+            target_rate (int): 出力のサンプリングレート (Hz)。
+            taps_per_phase (int): 位相ごとのタップ数 (= 入力サンプル何個ぶんの窓で1出力を計算するか)。
+            kaiser_beta (float): カイザー窓のβ。大きいほど阻止域の減衰が大きい。
+        """
+        g = math.gcd(source_rate, target_rate)
+        self.up = target_rate // g
+        self.down = source_rate // g
+        self.taps_per_phase = taps_per_phase
+
+        # アップサンプル後の領域で設計したローパスFIR。カットオフは低い方のナイキストの 95%
+        up, down = self.up, self.down
+        n_taps = taps_per_phase * up
+        cutoff = 0.95 / max(up, down)
+        k = np.arange(n_taps) - (n_taps - 1) / 2
+        h = cutoff * np.sinc(cutoff * k) * np.kaiser(n_taps, kaiser_beta)
+        h *= up / h.sum()  # アップサンプルで落ちるゲインを戻す
+        # phases[p, j] = h[p + (T-1-j) * L] : 入力の窓 x[n-T+1 .. n] にそのまま掛けられる並び
+        self.phases = h.reshape(taps_per_phase, up).T[:, ::-1].astype(np.float32)
+        self.reset()
+
+    def reset(self):
+        """履歴をリセットする。"""
+        self._history = np.zeros(self.taps_per_phase - 1, dtype=np.float32)
+        self._consumed = 0  # これまでに受け取った入力サンプル数
+        self._produced = 0  # これまでに出力したサンプル数
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """
+        入力サンプル (float32, モノラル) を渡すと、出せるだけの出力サンプルを返す。
+        """
+        if samples.size == 0:
+            return np.zeros(0, dtype=np.float32)
+        taps = self.taps_per_phase
+        buf = np.concatenate((self._history, samples))
+        total = self._consumed + samples.size
+
+        # 出力 m は入力 n = floor(m*M/L) までを使う → n < total を満たす m を全部出す
+        end = -(-total * self.up // self.down)
+        m = np.arange(self._produced, end)
+        t = m * self.down
+        # buf[i] は入力 (consumed - (T-1) + i) に対応するので、窓 x[n-T+1 .. n] の先頭は buf[n - consumed]
+        first = t // self.up - self._consumed
+        windows = sliding_window_view(buf, taps)[first]
+        out = np.einsum("mj,mj->m", windows, self.phases[t % self.up])
+
+        self._history = buf[buf.size - (taps - 1):].copy()
+        self._consumed = total
+        self._produced = end
+        return out
+
+
+class AudioConverter:
+    """
+    クライアントの音声を、バックエンドが扱う形式 (16-bit PCM / モノラル / target_rate) に変換するよ。
+
+    バイト列 → 配列 → (チャンネルを平均) → float32 → リサンプル → int16 を NumPy だけで1パスで処理する。
+    チャンクがサンプルの途中で切れていても、端数バイトは次のチャンクに持ち越すから大丈夫！
+    """
+
+    def __init__(self, source: AudioFormat, target_rate: int = 16000):
+        self.source = source
+        self.target_rate = target_rate
+        self._pending = b""
+        self.resampler = None
+        if source.sample_rate != target_rate:
+            self.resampler = PolyphaseResampler(source.sample_rate, target_rate)
+        logger.info(f"🎚️ 音声フォーマット変換: {source} → int16, {target_rate}Hz, 1ch")
+
+    @property
+    def is_passthrough(self) -> bool:
+        """変換が不要 (すでに int16 / モノラル / target_rate) なら True。"""
+        return self.resampler is None and self.source.encoding == "int16" and self.source.channels == 1
+
+    def reset(self):
+        self._pending = b""
+        if self.resampler:
+            self.resampler.reset()
+
+    def convert(self, chunk: bytes) -> bytes:
+        """
+        1チャンクを変換する。出力できるサンプルがなければ空の bytes を返す。
+        """
+        if self.is_passthrough:
+            return chunk
+        if self._pending:
+            chunk = self._pending + chunk
+        frame_bytes = self.source.frame_bytes
+        usable = len(chunk) - len(chunk) % frame_bytes
+        self._pending = bytes(chunk[usable:])
+        if usable == 0:
+            return b""
+
+        samples = np.frombuffer(chunk, dtype=self.source.dtype, count=usable // self.source.dtype.itemsize)
+        if self.source.channels > 1:
+            samples = samples.reshape(-1, self.source.channels).mean(axis=1, dtype=np.float32)
+        # float32 は [-1, 1]、int16 はそのままのスケールで扱う
+        if self.source.encoding == "float32":
+            samples = samples.astype(np.float32, copy=False) * 32767.0
+        else:
+            samples = samples.astype(np.float32)
+
+        if self.resampler:
+            samples = self.resampler.process(samples)
+        np.clip(samples, -32768.0, 32767.0, out=samples)
+        return np.rint(samples).astype(np.int16).tobytes()
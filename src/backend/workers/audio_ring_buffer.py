@@ -0,0 +1,197 @@
+# このモジュールは NumPy ライブラリに依存しています。
+
+import logging
+from typing import Iterator
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+logger = logging.getLogger(__name__)
+
+
+class PitchRingBuffer:
+    """
+    ピッチ解析のフレーミング用に使う、固定長の int16 リングバッファだよ。
+
+    WebSocketのチャンクを `bytes +=` で繋いでスライスし直す代わりに、
+    セッションごとに一度だけ確保した配列へ書き込んでいく。
+    内部配列は容量の2倍の長さを持っていて、後半に前半のミラーを書き込むから、
+    ラップ位置をまたぐ解析ウィンドウでも常に「連続したビュー」(ゼロコピー) として取り出せる！
+    """
+
+    def __init__(self, capacity: int, dtype=np.int16, buffer=None):
+        """
+        Args:
+            capacity (int): 保持できる最大サンプル数。解析ウィンドウ長 + 最大チャンク長より大きくしてね。
+            dtype: サンプルの型 (デフォルトは 16-bit PCM)。
+            buffer: 外部で確保した書き込み可能なバッファ (共有メモリなど)。省略時は自前で確保するよ。
+                長さは 2 * capacity * サンプル幅 バイト必要。
+        """
+        if capacity <= 0:
+            raise ValueError(f"capacity は正の整数である必要があります: {capacity}")
+        self.capacity = int(capacity)
+        self.dtype = np.dtype(dtype)
+        self._sample_width = self.dtype.itemsize
+        self._capacity_bytes = self.capacity * self._sample_width
+        # 前半が本体、後半がミラー。書き込みはバイト単位のmemcpyで、読み出しはNumPyのビューで行う
+        if buffer is None:
+            buffer = bytearray(2 * self._capacity_bytes)
+        elif len(memoryview(buffer).cast("B")) != 2 * self._capacity_bytes:
+            raise ValueError(f"buffer の長さは {2 * self._capacity_bytes} バイトである必要があります。")
+        self._raw = buffer
+        self._raw_view = memoryview(buffer).cast("B")
+        self._data = np.frombuffer(self._raw_view, dtype=self.dtype)
+        self._written_bytes = 0  # これまでに書き込んだ総バイト数 (端数バイトも含む)
+        self._read_pos = 0       # 次の解析ウィンドウの先頭 (絶対サンプル位置)
+        self.dropped_samples = 0  # 容量オーバーで捨てたサンプル数
+
+    @property
+    def available(self) -> int:
+        """まだウィンドウとして消費されていないサンプル数 (端数バイトは含まない)。"""
+        return self._written_bytes // self._sample_width - self._read_pos
+
+    def clear(self):
+        """バッファを空にする (確保済みの配列はそのまま再利用するよ)。"""
+        self._written_bytes = 0
+        self._read_pos = 0
+        self.dropped_samples = 0
+
+    def push(self, chunk: bytes) -> int:
+        """
+        生のPCMバイト列を書き込む。
+        サンプル幅で割り切れない端数バイトもそのまま書き込んでおき、次のチャンクで1サンプルとして完成させるよ。
+
+        Returns:
+            int: 新たに完成したサンプル数。
+        """
+        m = len(chunk)
+        if m == 0:
+            return 0
+        before = self._written_bytes // self._sample_width
+        cap_b = self._capacity_bytes
+        src = memoryview(chunk)
+        if m > cap_b:
+            # 1回で容量を超えるなら、最新の capacity 分だけ残す (サンプル境界は総バイト数で保たれる)
+            skipped = m - cap_b
+            self._written_bytes += skipped
+            src = src[skipped:]
+            m = cap_b
+
+        raw = self._raw_view
+        start = self._written_bytes % cap_b
+        first = min(m, cap_b - start)
+        raw[start:start + first] = src[:first]
+        raw[start + cap_b:start + cap_b + first] = src[:first]
+        rest = m - first
+        if rest:
+            raw[:rest] = src[first:]
+            raw[cap_b:cap_b + rest] = src[first:]
+        self._written_bytes += m
+
+        # 読み出されていないデータを上書きしてしまったら、読み出し位置を進める
+        # (端数バイトが先頭サンプルを踏むこともあるので、バイト単位で判定する)
+        used_bytes = self._written_bytes - self._read_pos * self._sample_width
+        if used_bytes > cap_b:
+            overflow = -(-(used_bytes - cap_b) // self._sample_width)
+            self._read_pos += overflow
+            self.dropped_samples += overflow
+            logger.warning(f"ピッチ用リングバッファが溢れたため {overflow} サンプルを破棄しました。")
+        return self._written_bytes // self._sample_width - before
+
+    def _view(self, abs_pos: int, length: int) -> np.ndarray:
+        start = abs_pos % self.capacity
+        return self._data[start:start + length]
+
+    def pop_window(self, window: int, hop: int) -> np.ndarray | None:
+        """
+        次の解析ウィンドウをゼロコピーのビューとして返し、読み出し位置を hop だけ進める。
+        返したビューは次の push で上書きされる可能性があるので、使うのはその場だけにしてね。
+
+        Returns:
+            np.ndarray | None: 長さ window のビュー。データが足りなければNone。
+        """
+        if window > self.capacity:
+            raise ValueError(f"window ({window}) が capacity ({self.capacity}) を超えています。")
+        if self.available < window:
+            return None
+        frame = self._view(self._read_pos, window)
+        self._read_pos += hop
+        return frame
+
+    def windows(self, window: int, hop: int) -> Iterator[np.ndarray]:
+        """取り出せるだけの解析ウィンドウを順番に返すジェネレータ。"""
+        while True:
+            frame = self.pop_window(window, hop)
+            if frame is None:
+                return
+            yield frame
+
+    def feed(self, chunk: bytes, window: int, hop: int) -> Iterator[np.ndarray]:
+        """
+        チャンクを書き込みながら、完成した解析ウィンドウを順番に返す。
+        容量より大きなチャンクでも、空き容量ごとに区切って書き込む→取り出すを繰り返すから取りこぼさないよ。
+        """
+        if window > self.capacity:
+            raise ValueError(f"window ({window}) が capacity ({self.capacity}) を超えています。")
+        src = memoryview(chunk)
+        width = self._sample_width
+        while len(src):
+            free_bytes = self._capacity_bytes - (self._written_bytes - self._read_pos * width)
+            piece = src[:free_bytes]
+            self.push(piece)
+            src = src[len(piece):]
+            # ここは windows() を展開したホットパス
+            while self._written_bytes // width - self._read_pos >= window:
+                start = self._read_pos % self.capacity
+                self._read_pos += hop
+                yield self._data[start:start + window]
+
+    def pop_frames(self, window: int, hop: int) -> np.ndarray | None:
+        """
+        取り出せる解析ウィンドウをまとめて (フレーム数 × window) の2次元ビューとして返す。
+        stride tricks で作ったビューなので、フレーム同士のオーバーラップ部分もコピーされないよ。
+
+        Returns:
+            np.ndarray | None: 2次元ビュー。1フレームも揃っていなければNone。
+        """
+        span = self.pop_frame_span(window, hop)
+        if span is None:
+            return None
+        start, n_frames = span
+        base = self._data[start:start + window + (n_frames - 1) * hop]
+        stride = base.strides[0]
+        return as_strided(base, shape=(n_frames, window), strides=(hop * stride, stride), writeable=False)
+
+    def pop_frame_span(self, window: int, hop: int) -> tuple[int, int] | None:
+        """
+        pop_frames() のビューを作らない版。取り出せるフレームの (内部配列上の先頭位置, フレーム数) を返す。
+        別プロセスから同じ共有メモリを読むときは、この位置だけを渡せばいいよ。
+        """
+        if window > self.capacity:
+            raise ValueError(f"window ({window}) が capacity ({self.capacity}) を超えています。")
+        available = self.available
+        if available < window:
+            return None
+        # ミラー領域に収まる (= capacity 以内の) 範囲で取れるだけ取る
+        n_frames = (min(available, self.capacity) - window) // hop + 1
+        start = self._read_pos % self.capacity
+        self._read_pos += n_frames * hop
+        return start, n_frames
+
+    def feed_frames(self, chunk: bytes, window: int, hop: int) -> Iterator[np.ndarray]:
+        """
+        feed() のバッチ版。チャンクを書き込みながら、揃ったフレームを2次元ビューでまとめて返す。
+        通常サイズのチャンクなら1回のyieldで全フレームが出てくるよ。
+        """
+        if window > self.capacity:
+            raise ValueError(f"window ({window}) が capacity ({self.capacity}) を超えています。")
+        src = memoryview(chunk)
+        width = self._sample_width
+        while len(src):
+            free_bytes = self._capacity_bytes - (self._written_bytes - self._read_pos * width)
+            piece = src[:free_bytes]
+            self.push(piece)
+            src = src[len(piece):]
+            frames = self.pop_frames(window, hop)
+            if frames is not None:
+                yield frames
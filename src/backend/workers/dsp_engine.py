@@ -0,0 +1,406 @@
+# このモジュールは NumPy ライブラリに依存しています。
+
+import asyncio
+import itertools
+import logging
+import multiprocessing as mp
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+from backend.workers.audio_ring_buffer import PitchRingBuffer
+from backend.workers.pitch_worker import PitchWorker
+
+logger = logging.getLogger(__name__)
+
+# ワーカープロセスに「もう終わりだよ」と伝えるための合図
+_STOP = None
+
+
+class _SlotLayout:
+    """
+    共有メモリ1ブロックの中の並び方。プロセスをまたいで同じ計算をするので、ここにまとめておく。
+
+    [ 入力リング (スロット数 × 2 * capacity サンプル) | 結果 (スロット数 × 2 × max_frames の float64) | 結果の通し番号 (スロット数の int64) ]
+    """
+
+    def __init__(self, n_slots: int, capacity: int, max_frames: int, dtype=np.int16):
+        self.n_slots = n_slots
+        self.capacity = capacity
+        self.max_frames = max_frames
+        self.dtype = np.dtype(dtype)
+        self.ring_bytes = 2 * capacity * self.dtype.itemsize
+        self.rings_bytes = n_slots * self.ring_bytes
+        self.result_offset = self.rings_bytes
+        self.seq_offset = self.result_offset + n_slots * 2 * max_frames * 8
+        self.total_bytes = self.seq_offset + n_slots * 8
+
+    def ring_buffer(self, buf: memoryview, slot: int) -> memoryview:
+        start = slot * self.ring_bytes
+        return buf[start:start + self.ring_bytes]
+
+    def ring_samples(self, buf: memoryview) -> np.ndarray:
+        return np.frombuffer(buf, dtype=self.dtype, count=self.rings_bytes // self.dtype.itemsize)
+
+    def results(self, buf: memoryview) -> np.ndarray:
+        return np.frombuffer(
+            buf, dtype=np.float64, count=self.n_slots * 2 * self.max_frames, offset=self.result_offset
+        ).reshape(self.n_slots, 2, self.max_frames)
+
+    def result_seqs(self, buf: memoryview) -> np.ndarray:
+        """スロットごとに「今の結果はどのジョブのものか」を表す通し番号。"""
+        return np.frombuffer(buf, dtype=np.int64, count=self.n_slots, offset=self.seq_offset)
+
+
+def _worker_main(shm_name: str, layout: _SlotLayout, pitch_kwargs: dict, tasks, results):
+    """
+    ワーカープロセスの本体だよ。
+    タスクとして受け取るのは「どのスロットの、どこから何フレーム」という小さな記述子だけで、
+    音声そのものは共有メモリから直接ビューとして読む (pickle しない！)。
+    結果を書いたあとにスロットの通し番号を書くので、親はそれを見て古いジョブの結果を捨てられるよ。
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    samples = layout.ring_samples(shm.buf)
+    out = layout.results(shm.buf)
+    seqs = layout.result_seqs(shm.buf)
+    ring_len = layout.capacity * 2
+    itemsize = samples.itemsize
+    workers = {}
+    try:
+        while True:
+            task = tasks.get()
+            if task is _STOP:
+                break
+            job_id, slot, seq, start, n_frames, window, hop = task
+            try:
+                worker = workers.get(window)
+                if worker is None:
+                    worker = workers[window] = PitchWorker(frame_length=window, **pitch_kwargs)
+                base = samples[slot * ring_len + start:]
+                frames = as_strided(base, shape=(n_frames, window), strides=(hop * itemsize, itemsize), writeable=False)
+                frequencies, confidences = worker.analyze_pitch_batch(frames)
+                out[slot, 0, :n_frames] = frequencies
+                out[slot, 1, :n_frames] = confidences
+                seqs[slot] = seq
+                results.put((job_id, slot, None))
+            except Exception as e:
+                results.put((job_id, slot, f"{type(e).__name__}: {e}"))
+    finally:
+        # ビューを残したまま close すると BufferError になるので先に手放す
+        del samples, out, seqs
+        shm.close()
+
+
+class DSPSession:
+    """
+    DSPEngine の中の1セッション分のスロット。
+    ring (共有メモリ上の PitchRingBuffer) にチャンクを書き込み、取り出したフレームを
+    analyze_pitch_batch() に渡すと、ワーカープロセスで解析した結果が返ってくるよ。
+    エンジンが使えないとき (サーキットブレーカーが開いている、前のジョブがまだスロットを使っている) は、
+    このプロセスの中で解析して返す。
+    """
+
+    def __init__(self, engine: "DSPEngine", slot: int, ring: PitchRingBuffer):
+        self.engine = engine
+        self.slot = slot
+        self.ring = ring
+        self._base_address = ring._data.ctypes.data
+
+    def feed_frames(self, chunk: bytes, window: int, hop: int):
+        """PitchRingBuffer.feed_frames() と同じ。返ってくるフレームは共有メモリ上のビューだよ。"""
+        return self.ring.feed_frames(chunk, window, hop)
+
+    async def analyze_pitch_batch(self, frames: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        PitchWorker.analyze_pitch_batch() の非同期版。
+        frames はこのセッションの ring から取り出したビューである必要があるよ (位置だけをワーカーに送るため)。
+        """
+        if self.ring is None:
+            raise RuntimeError("このDSPセッションはすでに閉じられています。")
+        itemsize = self.ring.dtype.itemsize
+        offset = frames.ctypes.data - self._base_address
+        if frames.ndim != 2 or offset < 0 or offset >= self.ring.capacity * itemsize or frames.strides[1] != itemsize:
+            raise ValueError("frames はこのセッションのリングバッファから取り出したビューを渡してね。")
+        hop = frames.strides[0] // itemsize
+        if self.engine._can_submit(self.slot):
+            try:
+                return await self.engine._submit(self.slot, offset // itemsize, frames.shape[0], frames.shape[1], hop)
+            except Exception as e:
+                logger.warning(f"DSPエンジンでの解析に失敗したので、イベントループ内で解析します (スロット: {self.slot}): {e}")
+        return self.engine._analyze_inline(frames)
+
+    def close(self):
+        """スロットをエンジンに返す。"""
+        if self.ring is not None:
+            self.ring = None
+            self.engine._release(self.slot)
+
+
+class DSPEngine:
+    """
+    複数セッションのピッチ解析 (FFT) を、少数のワーカープロセスにまとめて任せるエンジンだよ。
+
+    - セッションごとのリングバッファは multiprocessing.shared_memory 上に置くので、音声はプロセス間でコピーされない
+    - ワーカーには (スロット, 先頭位置, フレーム数) だけをキューで送り、結果も共有メモリに書いてもらう
+    - 完了通知は受信スレッドが受け取り、call_soon_threadsafe でイベントループの Future を解決する
+    - ジョブにはスロットごとの通し番号を付け、タイムアウトしたジョブの結果は捨てる。
+      タイムアウトしたジョブがまだスロットを使っている間は、そのスロットには次のジョブを送らない
+    - 失敗が max_failures 回続いたら retry_seconds の間はワーカーに送らず、イベントループ内で解析する (サーキットブレーカー)
+    """
+
+    def __init__(self, pitch_kwargs: dict, n_workers: int = 2, max_sessions: int = 64,
+                 capacity: int = 16000, min_hop: int = 160, timeout: float = 2.0,
+                 max_failures: int = 3, retry_seconds: float = 30.0, clock=time.monotonic):
+        """
+        Args:
+            pitch_kwargs (dict): ワーカー側で PitchWorker を作るときの引数 (frame_length 以外)。
+            n_workers (int): ワーカープロセス数。
+            max_sessions (int): 同時に使えるセッション (スロット) の数。
+            capacity (int): スロットごとのリングバッファ容量 (サンプル)。
+            min_hop (int): 想定する最小ホップ。結果領域の大きさ (最大フレーム数) の計算に使う。
+            timeout (float): 1回の解析を待つ最大秒数。
+            max_failures (int): 何回続けて失敗したらワーカーに送るのをやめるか。
+            retry_seconds (float): 送るのをやめてから、もう一度ワーカーを試すまでの秒数。
+        """
+        self.pitch_kwargs = dict(pitch_kwargs)
+        self.n_workers = n_workers
+        self.timeout = timeout
+        self.max_failures = max_failures
+        self.retry_seconds = retry_seconds
+        self.clock = clock
+        self.layout = _SlotLayout(max_sessions, capacity, capacity // min_hop + 1)
+        self._free_slots = list(range(max_sessions - 1, -1, -1))
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._job_ids = itertools.count()
+        self._slot_seqs = [0] * max_sessions
+        # タイムアウトしたけど、まだワーカーが処理中かもしれないジョブ (スロット → ジョブID)
+        self._stale_jobs = {}
+        self._failures = 0
+        self._open_until = None
+        # フォールバック用に、このプロセスで使う PitchWorker (ウィンドウ長ごと)
+        self._local_workers = {}
+        self.completed = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.stale_results = 0
+        self.fallbacks = 0
+        self._shm = None
+        self._results_view = None
+        self._seqs_view = None
+        self._processes = []
+        self._receiver = None
+        self._started = False
+
+    def start(self):
+        """共有メモリを確保して、ワーカープロセスと受信スレッドを起動する。"""
+        if self._started:
+            return
+        ctx = mp.get_context("spawn")
+        self._shm = shared_memory.SharedMemory(create=True, size=self.layout.total_bytes)
+        self._results_view = self.layout.results(self._shm.buf)
+        self._seqs_view = self.layout.result_seqs(self._shm.buf)
+        self._seqs_view[:] = -1
+        self._tasks = ctx.Queue()
+        self._results = ctx.Queue()
+        for i in range(self.n_workers):
+            process = ctx.Process(
+                target=_worker_main,
+                args=(self._shm.name, self.layout, self.pitch_kwargs, self._tasks, self._results),
+                name=f"dsp-worker-{i}",
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+        self._receiver = threading.Thread(target=self._receive_results, name="dsp-results", daemon=True)
+        self._receiver.start()
+        self._started = True
+        logger.info(
+            f"🏭 DSPEngine 起動！ ワーカー: {self.n_workers}プロセス, スロット: {self.layout.n_slots}, "
+            f"共有メモリ: {self.layout.total_bytes / 1024 / 1024:.1f}MiB"
+        )
+
+    def open_session(self) -> DSPSession:
+        """空いているスロットを1つ割り当てる。空きがなければ RuntimeError。"""
+        if not self._started:
+            raise RuntimeError("DSPEngine が起動していません。")
+        try:
+            slot = self._free_slots.pop()
+        except IndexError:
+            raise RuntimeError("DSPEngine の空きスロットがありません。") from None
+        ring = PitchRingBuffer(
+            self.layout.capacity, dtype=self.layout.dtype, buffer=self.layout.ring_buffer(self._shm.buf, slot)
+        )
+        return DSPSession(self, slot, ring)
+
+    def _release(self, slot: int):
+        self._free_slots.append(slot)
+
+    @property
+    def circuit_open(self) -> bool:
+        """失敗が続いて、ワーカーに送るのを休んでいる最中なら True。"""
+        return self._open_until is not None and self.clock() < self._open_until
+
+    def _can_submit(self, slot: int) -> bool:
+        if not self._started or self.circuit_open:
+            return False
+        if not any(process.is_alive() for process in self._processes):
+            self._record_failure("ワーカープロセスがすべて停止しています")
+            return False
+        with self._pending_lock:
+            # タイムアウトしたジョブがまだこのスロットの結果領域に書き込むかもしれない
+            return slot not in self._stale_jobs
+
+    def _record_failure(self, reason: str):
+        self._failures += 1
+        if self._failures >= self.max_failures and not self.circuit_open:
+            self._open_until = self.clock() + self.retry_seconds
+            logger.warning(
+                f"🔌 DSPエンジンの失敗が{self._failures}回続いたので、{self.retry_seconds:.0f}秒間は"
+                f"イベントループ内で解析します: {reason}"
+            )
+
+    def _analyze_inline(self, frames: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """ワーカーに送れないときの代わり。このプロセスの PitchWorker で解析する。"""
+        window = frames.shape[1]
+        worker = self._local_workers.get(window)
+        if worker is None:
+            worker = self._local_workers[window] = PitchWorker(frame_length=window, **self.pitch_kwargs)
+        self.fallbacks += 1
+        frequencies, confidences = worker.analyze_pitch_batch(frames)
+        return frequencies.copy(), confidences.copy()
+
+    async def _submit(self, slot: int, start: int, n_frames: int, window: int, hop: int):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        job_id = next(self._job_ids)
+        self._slot_seqs[slot] += 1
+        seq = self._slot_seqs[slot]
+        with self._pending_lock:
+            self._pending[job_id] = (loop, future)
+        self._tasks.put((job_id, slot, seq, start, n_frames, window, hop))
+        try:
+            await asyncio.wait_for(future, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            with self._pending_lock:
+                if self._pending.pop(job_id, None) is not None:
+                    # 完了通知が来るまで、このスロットには次のジョブを送らない
+                    self._stale_jobs[slot] = job_id
+            self.timeouts += 1
+            self._record_failure("タイムアウト")
+            raise
+        except Exception as e:
+            self.errors += 1
+            self._record_failure(str(e))
+            raise
+        finally:
+            with self._pending_lock:
+                self._pending.pop(job_id, None)
+        # 結果領域は次のジョブで上書きされるので、ここでコピーして返す
+        result = self._results_view[slot, :, :n_frames].copy()
+        if self._seqs_view[slot] != seq:
+            self.stale_results += 1
+            self._record_failure("古いジョブの結果")
+            raise RuntimeError(f"スロット {slot} の結果が古いジョブのものでした。")
+        self._failures = 0
+        self._open_until = None
+        self.completed += 1
+        return result[0], result[1]
+
+    def stats(self) -> dict:
+        return {
+            "completed": self.completed,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "stale_results": self.stale_results,
+            "fallbacks": self.fallbacks,
+            "circuit_open": self.circuit_open,
+        }
+
+    def _receive_results(self):
+        """受信スレッド: ワーカーからの完了通知を、各イベントループの Future に届ける。"""
+        while True:
+            try:
+                message = self._results.get()
+            except (EOFError, OSError):
+                break
+            if message is _STOP:
+                break
+            job_id, slot, error = message
+            with self._pending_lock:
+                # 受け取った時点で pending から外す (タイムアウト側は「まだ届いていない」ときだけスロットを止める)
+                entry = self._pending.pop(job_id, None)
+                if entry is None:
+                    # タイムアウト済み。結果は捨てて、スロットを次のジョブに使えるようにする
+                    if self._stale_jobs.get(slot) == job_id:
+                        del self._stale_jobs[slot]
+                    continue
+            loop, future = entry
+            loop.call_soon_threadsafe(self._resolve, future, error)
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, error: str | None):
+        if future.done():
+            return
+        if error:
+            future.set_exception(RuntimeError(f"DSPワーカーでエラー: {error}"))
+        else:
+            future.set_result(None)
+
+    def close(self):
+        """ワーカーと受信スレッドを止めて、共有メモリを解放する。"""
+        if not self._started:
+            return
+        for _ in self._processes:
+            self._tasks.put(_STOP)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                logger.warning(f"DSPワーカー {process.name} が止まらないので強制終了します。")
+                process.terminate()
+        self._results.put(_STOP)
+        self._receiver.join(timeout=5)
+        self._processes = []
+        self._results_view = None
+        self._seqs_view = None
+        self._stale_jobs.clear()
+        self._started = False
+        try:
+            self._shm.close()
+        except BufferError:
+            # まだ閉じていないセッションのビューが残っている。プロセス終了時に解放される
+            logger.warning("DSPセッションが残っているため、共有メモリのクローズを後回しにします。")
+        self._shm.unlink()
+        logger.info(f"🏭 DSPEngine を停止しました: {self.stats()}")
+
+
+_engine_instance = None
+
+
+def start_dsp_engine(pitch_kwargs: dict, **options) -> DSPEngine:
+    """
+    プロセス全体で1つの DSPEngine を起動する (起動済みならそれを返す)。
+    ワーカーの spawn は重いので、アプリの起動時に (イベントループの外で) 呼んでね。
+    """
+    global _engine_instance
+    if _engine_instance is None:
+        engine = DSPEngine(pitch_kwargs, **options)
+        engine.start()
+        _engine_instance = engine
+    return _engine_instance
+
+
+def get_dsp_engine() -> DSPEngine | None:
+    """start_dsp_engine() で起動したエンジンを返す。起動していなければ None。"""
+    return _engine_instance
+
+
+def shutdown_dsp_engine():
+    """start_dsp_engine() で起動したエンジンがあれば停止する。"""
+    global _engine_instance
+    if _engine_instance is not None:
+        _engine_instance.close()
+        _engine_instance = None
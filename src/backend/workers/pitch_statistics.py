@@ -0,0 +1,142 @@
+# このモジュールは NumPy ライブラリに依存しています。
+
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class PitchStatistics:
+    """
+    セッション中のピッチを、float32 配列 + オンライン統計で保持するストアだよ。
+
+    - 生の値は倍々で伸びる float32 配列に保存 (Python の float オブジェクトのリストより ~8倍コンパクト)
+    - 平均・分散は Welford 法 (バッチ更新は Chan らの合成式) で逐次更新
+    - 最小・最大も逐次更新
+    - p10/p50/p90 は対数間隔の固定長ヒストグラム (分位点スケッチ) から求める
+    だから summary() はセッションの長さに関係なく O(1) で返せる！
+    """
+
+    QUANTILES = (0.1, 0.5, 0.9)
+
+    def __init__(self, min_freq: float = 50.0, max_freq: float = 600.0,
+                 n_bins: int = 256, initial_capacity: int = 1024):
+        """
+        Args:
+            min_freq (float): スケッチの下限 (Hz)。PitchWorker の min_freq と揃えてね。
+            max_freq (float): スケッチの上限 (Hz)。
+            n_bins (int): スケッチのビン数。対数間隔なので、256ビンなら 50〜600Hz で相対誤差 ~1% 以内。
+            initial_capacity (int): 生の値を入れる配列の初期容量。
+        """
+        self._log_min = np.log(min_freq)
+        self._log_max = np.log(max_freq)
+        self.n_bins = n_bins
+        self._bin_scale = n_bins / (self._log_max - self._log_min)
+        self._histogram = np.zeros(n_bins, dtype=np.int64)
+        self._values = np.empty(initial_capacity, dtype=np.float32)
+        self.clear()
+
+    def clear(self):
+        """全部リセットする (確保済みの配列は再利用するよ)。"""
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+        self._histogram[:] = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def values(self) -> np.ndarray:
+        """これまでに追加した値 (float32) のビュー。"""
+        return self._values[:self.count]
+
+    @property
+    def variance(self) -> float:
+        """母分散 (np.var と同じ ddof=0)。"""
+        return self._m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.variance))
+
+    def append(self, value: float):
+        """値を1つ追加する。"""
+        self.extend(np.array([value], dtype=np.float64))
+
+    def extend(self, values) -> int:
+        """
+        複数の値をまとめて追加する (NaN は無視)。
+
+        Returns:
+            int: 実際に追加した個数。
+        """
+        batch = np.asarray(values, dtype=np.float64).ravel()
+        batch = batch[~np.isnan(batch)]
+        n = batch.size
+        if n == 0:
+            return 0
+
+        # 生の値を保存 (足りなければ倍々で確保し直す)
+        end = self.count + n
+        if end > self._values.size:
+            grown = np.empty(max(end, 2 * self._values.size), dtype=np.float32)
+            grown[:self.count] = self._values[:self.count]
+            self._values = grown
+        self._values[self.count:end] = batch
+
+        # Welford (バッチ同士の合成): 平均と二乗偏差和をまとめて更新
+        batch_mean = float(batch.mean())
+        batch_m2 = float(np.square(batch - batch_mean).sum())
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean += delta * n / total
+        self._m2 += batch_m2 + delta * delta * self.count * n / total
+        self.count = total
+
+        self.min = min(self.min, float(batch.min()))
+        self.max = max(self.max, float(batch.max()))
+
+        # 分位点スケッチ: 対数周波数のビンに数え上げる (範囲外は端のビンに寄せる)
+        bins = ((np.log(batch) - self._log_min) * self._bin_scale).astype(np.int64)
+        np.clip(bins, 0, self.n_bins - 1, out=bins)
+        self._histogram += np.bincount(bins, minlength=self.n_bins)
+        return n
+
+    def quantile(self, q: float) -> float | None:
+        """
+        スケッチから分位点を近似する (ビン内は対数スケールで線形補間)。
+        結果は実際の最小・最大の範囲に収めるよ。
+        """
+        if self.count == 0:
+            return None
+        cumulative = np.cumsum(self._histogram)
+        target = q * self.count
+        index = int(np.searchsorted(cumulative, target, side="left"))
+        index = min(index, self.n_bins - 1)
+        below = cumulative[index - 1] if index > 0 else 0
+        in_bin = self._histogram[index]
+        fraction = (target - below) / in_bin if in_bin else 0.5
+        log_value = self._log_min + (index + fraction) / self._bin_scale
+        return float(np.clip(np.exp(log_value), self.min, self.max))
+
+    def summary(self) -> dict:
+        """
+        統計情報をまとめて返す。値がなければ空の辞書。
+        キーは count / mean / std / min / max / p10 / p50 / p90 (周波数は Hz)。
+        """
+        if self.count == 0:
+            return {}
+        result = {
+            "count": self.count,
+            "mean": self.mean,
+            "std": self.std,
+            "min": self.min,
+            "max": self.max,
+        }
+        for q in self.QUANTILES:
+            result[f"p{int(q * 100)}"] = self.quantile(q)
+        return result
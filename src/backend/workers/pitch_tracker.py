@@ -0,0 +1,204 @@
+# このモジュールは NumPy ライブラリに依存しています。
+
+import logging
+import math
+from collections import deque
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+logger = logging.getLogger(__name__)
+
+
+def _small_median(values) -> float:
+    """数個の値の中央値 (np.median と同じ値)。小さい窓では Python の sorted の方がずっと速いよ。"""
+    ordered = sorted(values)
+    half = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[half]
+    return (ordered[half - 1] + ordered[half]) / 2.0
+
+
+class PitchContourTracker:
+    """
+    PitchWorker が出したフレームごとのピッチを、なめらかな輪郭 (コンター) に整えるトラッカーだよ。
+
+    1. オクターブ補正: 直近の中央値から見て ほぼ2倍 / ほぼ半分 の値は、オクターブ誤りとして中央値側に折り返す
+    2. ランニングメディアン: 直近 median_window フレームの中央値で、単発の外れ値を消す
+    3. 間引き: output_rate_hz ごとに1点だけ (区間内の中央値を) 出力する
+
+    50フレーム/秒の生の値を、例えば10点/秒のきれいなカーブにして送れるよ。
+    """
+
+    def __init__(self, frame_period: float, output_rate_hz: float = 10.0, median_window: int = 5,
+                 octave_tolerance: float = 0.2, max_gap: float = 0.3):
+        """
+        Args:
+            frame_period (float): フレームの間隔 (秒)。ホップ長 / サンプリングレート。
+            output_rate_hz (float): 出力する点の頻度 (Hz)。
+            median_window (int): ランニングメディアンの長さ (フレーム数)。
+            octave_tolerance (float): オクターブ誤りとみなす範囲 (log2 での ±幅)。
+            max_gap (float): 無音がこれより長く続いたら、履歴をリセットする (秒)。
+        """
+        self.frame_period = frame_period
+        self.output_period = 1.0 / output_rate_hz
+        self.octave_tolerance = octave_tolerance
+        self.max_gap_frames = max(1, int(round(max_gap / frame_period)))
+        self.median_window = median_window
+        self._history = deque(maxlen=median_window)
+        self.reset()
+
+    def reset(self):
+        """状態をリセットする (新しいセッションの開始時に呼んでね)。"""
+        self._clear_history()
+        self._gap_frames = 0
+        self._bucket = []
+        self._bucket_end = None
+
+    def _clear_history(self):
+        self._history.clear()
+        # 直近の履歴の中央値 (= 次のフレームのオクターブ補正の基準)。履歴が空なら NaN
+        self._reference = math.nan
+
+    @staticmethod
+    def _window_median(windows: np.ndarray) -> np.ndarray:
+        """(点の数 × 窓の長さ) の各行の中央値。np.median と同じ値になるけど、小さい窓ではずっと軽いよ。"""
+        ordered = np.sort(windows, axis=-1)
+        half = ordered.shape[-1] // 2
+        if ordered.shape[-1] % 2:
+            return ordered[:, half]
+        return (ordered[:, half - 1] + ordered[:, half]) / 2.0
+
+    def _running_median(self, values: np.ndarray) -> np.ndarray:
+        """
+        履歴 (self._history) のうしろに values を足した列で、values の各点までの直近 median_window 個の中央値を返す。
+        窓がそろっている点は sliding_window_view でまとめて計算するよ (そろわないのはリセット直後の数点だけ)。
+        """
+        carried = len(self._history)
+        sequence = np.concatenate([np.fromiter(self._history, dtype=np.float64, count=carried), values])
+        medians = np.empty(len(values))
+        window = self.median_window
+        for k in range(carried, min(window - 1, len(sequence))):
+            medians[k - carried] = _small_median(sequence[:k + 1].tolist())
+        full_from = max(window - 1, carried)
+        if len(sequence) > full_from:
+            windows = sliding_window_view(sequence[full_from - window + 1:], window)
+            medians[full_from - carried:] = self._window_median(windows)
+        return medians
+
+    def _smooth(self, pitches: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        ひと続きの有声フレームのピッチに、オクターブ補正とランニングメディアンをかける (履歴も更新する)。
+
+        オクターブ補正の基準は「1つ前のフレームまでの中央値」なので本来は1フレームずつの漸化式だけど、
+        折り返しはめったに起きない。なので、まず補正なしとしてまとめて中央値を出し、
+        最初に折り返すフレームまでを確定 → そのフレームだけ補正して、残りをもう一度まとめて計算する。
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: (オクターブ補正後のピッチ, スムージング後のピッチ)
+        """
+        if len(pitches) == 1:
+            # 1フレームだけ (マイクの小さいチャンクごとに呼ばれるとき) は、まとめる意味がないのでそのまま計算する
+            pitch = float(pitches[0])
+            if self._history:
+                octaves = math.log2(pitch / self._reference)
+                jump = round(octaves)
+                if jump != 0 and abs(octaves - jump) < self.octave_tolerance:
+                    pitch /= 2.0 ** jump
+            self._history.append(pitch)
+            self._reference = _small_median(self._history)
+            return np.array([pitch]), np.array([self._reference])
+
+        corrected = pitches.copy()
+        smoothed = np.empty(len(pitches))
+        start = 0
+        while start < len(pitches):
+            rest = corrected[start:]
+            medians = self._running_median(rest)
+            # 各フレームの基準 = 1つ前のフレームまでの中央値
+            references = np.concatenate([[self._reference], medians[:-1]])
+            with np.errstate(invalid="ignore"):
+                octaves = np.log2(rest / references)
+            jumps = np.round(octaves)
+            folds = np.flatnonzero((jumps != 0) & (np.abs(octaves - jumps) < self.octave_tolerance))
+            stop = int(folds[0]) if len(folds) else len(rest)
+            smoothed[start:start + stop] = medians[:stop]
+            self._history.extend(rest[:stop].tolist())
+            if stop == len(rest):
+                self._reference = float(medians[-1])
+                break
+            # オクターブ誤りとして中央値側に折り返す
+            corrected[start + stop] = rest[stop] / (2.0 ** jumps[stop])
+            self._history.append(float(corrected[start + stop]))
+            self._reference = smoothed[start + stop] = _small_median(self._history)
+            start += stop + 1
+        return corrected, smoothed
+
+    def push(self, frequencies: np.ndarray, timestamp: float) -> tuple[np.ndarray, list[dict]]:
+        """
+        フレームのピッチ (無声は NaN) を時間順に渡す。
+
+        Args:
+            frequencies (np.ndarray): PitchWorker.analyze_pitch_batch() の周波数。
+            timestamp (float): 最後のフレームの時刻 (UNIX秒)。それ以前のフレームは frame_period ずつ遡って扱う。
+
+        Returns:
+            tuple[np.ndarray, list[dict]]:
+                - オクターブ補正後のフレームごとのピッチ (無声は NaN)
+                - 出力区間が締まった輪郭の点 [{"pitch": Hz, "timestamp": 秒}, ...]
+        """
+        frequencies = np.asarray(frequencies, dtype=np.float64)
+        n = len(frequencies)
+        corrected = np.full(n, np.nan)
+        smoothed = np.full(n, np.nan)
+        if n == 0:
+            return corrected, []
+
+        # 有声フレームを、長い無音 (履歴のリセット) で区切ってまとめてスムージングする
+        voiced = np.flatnonzero(~np.isnan(frequencies))
+        if len(voiced):
+            gaps = np.empty(len(voiced), dtype=np.int64)  # 各有声フレームの直前に続いた無音のフレーム数
+            gaps[0] = voiced[0] + self._gap_frames
+            gaps[1:] = voiced[1:] - voiced[:-1] - 1
+            resets = np.flatnonzero(gaps >= self.max_gap_frames).tolist()
+            bounds = ([] if resets[:1] == [0] else [0]) + resets + [len(voiced)]
+            for begin, end in zip(bounds[:-1], bounds[1:]):
+                if gaps[begin] >= self.max_gap_frames:
+                    self._clear_history()
+                segment = voiced[begin:end]
+                corrected[segment], smoothed[segment] = self._smooth(frequencies[segment])
+            self._gap_frames = n - 1 - int(voiced[-1])
+        else:
+            self._gap_frames += n
+        if self._gap_frames >= self.max_gap_frames:
+            self._clear_history()
+
+        # 出力区間ごとに、区間内のスムージング済みの値をためて中央値を1点として出す
+        frame_times = timestamp - (n - 1 - np.arange(n)) * self.frame_period
+        if self._bucket_end is None:
+            self._bucket_end = float(frame_times[0]) + self.output_period
+        points = []
+        begin = 0
+        while True:
+            # この区間に入るフレームは、区間の終わりより前のもの
+            end = begin + int(np.searchsorted(frame_times[begin:], self._bucket_end, side="left"))
+            values = smoothed[begin:end]
+            self._bucket.extend(values[~np.isnan(values)].tolist())
+            if end >= n:
+                break
+            if self._bucket:
+                points.append({"pitch": float(np.median(self._bucket)), "timestamp": self._bucket_end})
+                self._bucket = []
+            # 無音で何区間も飛んだときも、区間の境界は一定の刻みに揃える
+            skipped = math.floor((float(frame_times[end]) - self._bucket_end) / self.output_period) + 1
+            self._bucket_end += skipped * self.output_period
+            begin = end
+        return corrected, points
+
+    def flush(self) -> list[dict]:
+        """途中の出力区間に値が残っていれば、それを最後の1点として返す。"""
+        points = []
+        if self._bucket:
+            points.append({"pitch": float(np.median(self._bucket)), "timestamp": self._bucket_end})
+        self._bucket = []
+        return points
@@ -2,6 +2,7 @@
 # プロジェクトの requirements.txt に 'numpy' が含まれていることを確認してください。
 # 例: numpy>=1.20.0
 
+import inspect
 import logging
 import numpy as np
 
@@ -14,6 +15,89 @@ logging.basicConfig(
     datefmt="%Y-%m-%d %H:%M:%S"
 )
 
+# NumPy 2.0 以降は np.fft に out= を渡せるので、FFTの出力先まで使い回せる
+_FFT_SUPPORTS_OUT = "out" in inspect.signature(np.fft.rfft).parameters
+
+# フレーム長ごとにキャッシュしておくプランの最大数 (固定ウィンドウ以外の長さが来たとき用)
+_MAX_CACHED_PLANS = 4
+
+
+class AutocorrelationPlan:
+    """
+    固定長フレームの自己相関をFFTで計算するための「プラン」だよ。
+    FFT長の計算と、作業用バッファ・出力バッファの確保を最初に一度だけ済ませておく。
+    毎フレームの処理は、確保済みバッファへのインプレース演算だけで回るようになってる！
+    (NumPy 2.0 未満では rfft/irfft 自体の出力だけは毎回確保されます)
+    """
+
+    def __init__(self, frame_length: int, max_lag: int | None = None, max_frames: int = 1):
+        """
+        Args:
+            frame_length (int): 1フレームのサンプル数。
+            max_lag (int | None): 必要な最大ラグ。指定するとFFT長を n + max_lag まで縮められる。
+                省略時は全ラグ (n-1) を正しく計算できる 2n-1 を使う。
+            max_frames (int): 最初に確保しておくフレーム数 (足りなければ倍々で拡張)。
+        """
+        if frame_length <= 0:
+            raise ValueError(f"frame_length は正の整数である必要があります: {frame_length}")
+        self.frame_length = int(frame_length)
+        # ラグ 0..max_lag の自己相関が循環畳み込みで折り返さない最小のFFT長は n + max_lag。
+        # それ以上の最小の2のべき乗を使う (640サンプル/max_lag 320 なら 2048 ではなく 1024 で済む)
+        self.max_lag = min(int(max_lag), self.frame_length - 1) if max_lag is not None else self.frame_length - 1
+        self.n_lags = self.max_lag + 1
+        self.fft_len = 1 << (self.frame_length + self.max_lag - 1).bit_length()
+        self.max_frames = 0
+        self._allocate(max(1, int(max_frames)))
+
+    def _allocate(self, max_frames: int):
+        n, fft_len = self.frame_length, self.fft_len
+        n_bins = fft_len // 2 + 1
+        # ゼロパディング部分 [n:] は一度ゼロで埋めたら二度と書き込まないので、毎回の埋め直しは不要
+        self._padded = np.zeros((max_frames, fft_len))
+        self._power = np.empty((max_frames, n_bins))
+        self._spectrum = np.empty((max_frames, n_bins), dtype=np.complex128) if _FFT_SUPPORTS_OUT else None
+        self._autocorr = np.empty((max_frames, fft_len)) if _FFT_SUPPORTS_OUT else None
+        # ピーク探索・出力用のバッファ
+        self.energy = np.empty(max_frames)
+        self.normalized = np.empty((max_frames, self.n_lags))
+        self.peak_index = np.empty(max_frames, dtype=np.intp)
+        self.peak_value = np.empty(max_frames)
+        self.voiced = np.empty(max_frames, dtype=bool)
+        self.detected = np.empty(max_frames, dtype=bool)
+        self.frequencies = np.empty(max_frames)
+        self.confidences = np.empty(max_frames)
+        self.max_frames = max_frames
+
+    def ensure_capacity(self, n_frames: int):
+        """フレーム数がバッファに収まらないときだけ、倍々で確保し直す。"""
+        if n_frames > self.max_frames:
+            self._allocate(max(n_frames, self.max_frames * 2))
+
+    def autocorrelate(self, frames: np.ndarray) -> np.ndarray:
+        """
+        (フレーム数 × frame_length) のフレームについて、正規化前の自己相関 (ラグ 0..max_lag) を計算する。
+        返り値はプランのバッファのビューなので、次の呼び出しで上書きされるよ。
+        """
+        k = frames.shape[0]
+        self.ensure_capacity(k)
+        n, fft_len = self.frame_length, self.fft_len
+        padded = self._padded[:k]
+        # int16 → float64 のキャストも、確保済みバッファへの書き込みで済ませる
+        padded[:, :n] = frames
+        if _FFT_SUPPORTS_OUT:
+            spectrum = np.fft.rfft(padded, n=fft_len, axis=-1, out=self._spectrum[:k])
+        else:
+            spectrum = np.fft.rfft(padded, n=fft_len, axis=-1)
+        # パワースペクトル |X|^2 を再利用バッファにインプレースで計算
+        power = np.abs(spectrum, out=self._power[:k])
+        np.square(power, out=power)
+        if _FFT_SUPPORTS_OUT:
+            autocorr = np.fft.irfft(power, n=fft_len, axis=-1, out=self._autocorr[:k])
+        else:
+            autocorr = np.fft.irfft(power, n=fft_len, axis=-1)
+        return autocorr[:, :self.n_lags]
+
+
 class PitchWorker:
     """
     音声チャンクからリアルタイムでピッチ（基本周波数）を推定するクラス。
@@ -21,7 +105,7 @@ class PitchWorker:
     """
     def __init__(self, sample_rate: int, channels: int, sample_width: int, 
                  min_freq: float = 50.0, max_freq: float = 600.0, 
-                 confidence_threshold: float = 0.1):
+                 confidence_threshold: float = 0.1, frame_length: int | None = None):
         """
         PitchWorkerを初期化します。
 
@@ -32,6 +116,8 @@ class PitchWorker:
             min_freq (float): 推定する最小周波数 (Hz)。
             max_freq (float): 推定する最大周波数 (Hz)。
             confidence_threshold (float): ピッチ推定の信頼度閾値 (正規化された自己相関ピーク値)。
+            frame_length (int | None): 解析ウィンドウのサンプル数。省略時は max_lag の2倍。
+                この長さの自己相関プランを初期化時に作っておきます。
         """
         self.logger = logging.getLogger(self.__class__.__name__)
         self.sample_rate = sample_rate
@@ -63,28 +149,38 @@ class PitchWorker:
         if self.min_lag == 0: # max_freq が高すぎる場合、ラグが0になるのを防ぐ
             self.min_lag = 1 
         self.max_lag = int(self.sample_rate / self.min_freq)
+
+        # 解析ウィンドウ長は1セッション中ずっと固定なので、FFT長とバッファはここで計画しておく
+        self.frame_length = int(frame_length) if frame_length else self.max_lag * 2
+        self.plan = AutocorrelationPlan(self.frame_length, max_lag=self.max_lag)
+        self._plans = {self.frame_length: self.plan}
         
         self.logger.info(
             f"🎶 PitchWorker 初期化完了！ Rate: {self.sample_rate}Hz, Channels: {self.channels}, "
             f"Width: {self.sample_width}bytes (dtype: {self.dtype}), "
             f"周波数範囲: [{self.min_freq:.1f}-{self.max_freq:.1f}]Hz, "
             f"ラグ範囲: [{self.min_lag}-{self.max_lag}] サンプル, "
-            f"信頼度閾値: {self.confidence_threshold}"
+            f"信頼度閾値: {self.confidence_threshold}, "
+            f"ウィンドウ: {self.frame_length}サンプル (FFT長: {self.plan.fft_len})"
         )
 
-    def _bytes_to_numpy_array(self, audio_chunk: bytes) -> np.ndarray | None:
+    def _bytes_to_numpy_array(self, audio_chunk: bytes | np.ndarray) -> np.ndarray | None:
         """
         bytes形式の音声チャンクをNumPy配列に変換します。
+        すでにNumPy配列 (リングバッファのビューなど) の場合はコピーせずにそのまま使います。
         処理できない場合はNoneを返します。
         """
-        if not audio_chunk:
+        if audio_chunk is None or len(audio_chunk) == 0:
             self.logger.debug("空のオーディオチャンクを受け取りました。")
             return None
-        try:
-            samples = np.frombuffer(audio_chunk, dtype=self.dtype)
-        except ValueError as e:
-            self.logger.error(f"NumPy配列への変換に失敗: {e}。チャンク長: {len(audio_chunk)}, dtype: {self.dtype}")
-            return None
+        if isinstance(audio_chunk, np.ndarray):
+            samples = audio_chunk
+        else:
+            try:
+                samples = np.frombuffer(audio_chunk, dtype=self.dtype)
+            except ValueError as e:
+                self.logger.error(f"NumPy配列への変換に失敗: {e}。チャンク長: {len(audio_chunk)}, dtype: {self.dtype}")
+                return None
 
         if self.channels > 1:
             # マルチチャンネルの場合、最初のチャンネルのデータを使用 (今後の改善点)
@@ -105,38 +201,36 @@ class PitchWorker:
             self.logger.debug("自己相関計算のための信号が空です。")
             return None
             
-        n = len(signal)
-        # FFTの効率を上げるため、長さをゼロパディング (2のべき乗長が理想的だが、ここでは2n-1以上)
-        fft_len = 1
-        while fft_len < 2 * n - 1: 
-            fft_len <<= 1
-        
         try:
-            # 実数FFT
-            fft_signal = np.fft.rfft(signal, n=fft_len)
-            # パワースペクトル密度
-            power_spectrum = fft_signal * np.conj(fft_signal)
-            # 逆FFTで自己相関関数へ
-            autocorr = np.fft.irfft(power_spectrum, n=fft_len)
+            plan = self._get_plan(len(signal))
+            autocorr = plan.autocorrelate(signal[np.newaxis, :])[0]
         except Exception as e:
             self.logger.error(f"FFTまたはIFFTの計算中にエラー: {e}")
             return None
         
-        # 正のラグ部分を取り出し、ラグ0で正規化
-        autocorr_positive_lag = autocorr[:n] 
-        if autocorr_positive_lag[0] == 0: # 無音の場合など、ラグ0が0になるのを防ぐ
+        # 正のラグ部分を、ラグ0で正規化
+        if autocorr[0] == 0: # 無音の場合など、ラグ0が0になるのを防ぐ
             self.logger.debug("自己相関のラグ0の値が0です。無音の可能性があります。")
             # 全て0の配列を返すと、後の処理でエラーになる可能性があるためNoneを返す
             return None 
         
-        return autocorr_positive_lag / autocorr_positive_lag[0]
+        return np.divide(autocorr, autocorr[0], out=plan.normalized[0])
+
+    def _get_plan(self, frame_length: int) -> AutocorrelationPlan:
+        """フレーム長に対応するプランを返す。初期化時のウィンドウ長以外は少数だけキャッシュする。"""
+        plan = self._plans.get(frame_length)
+        if plan is None:
+            plan = AutocorrelationPlan(frame_length, max_lag=self.max_lag)
+            if len(self._plans) < _MAX_CACHED_PLANS:
+                self._plans[frame_length] = plan
+        return plan
 
-    def analyze_pitch(self, audio_chunk: bytes) -> float | None:
+    def analyze_pitch(self, audio_chunk: bytes | np.ndarray) -> float | None:
         """
         与えられた音声チャンクの基本周波数を推定します。
 
         Args:
-            audio_chunk (bytes): 解析対象の音声データチャンク。
+            audio_chunk (bytes | np.ndarray): 解析対象の音声データチャンク (PCMバイト列またはサンプル配列)。
 
         Returns:
             float | None: 推定された基本周波数 (Hz)。検出できない場合はNone。
@@ -203,6 +297,54 @@ class PitchWorker:
         )
         return float(estimated_frequency)
 
+    def analyze_pitch_batch(self, frames: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        複数の解析ウィンドウをまとめて解析します。FFTはフレーム軸に沿って1回だけ実行します。
+
+        Args:
+            frames (np.ndarray): (フレーム数 × サンプル数) の2次元配列。
+                PitchRingBuffer.pop_frames() が返す stride tricks のビューをそのまま渡せます。
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: (周波数, 信頼度) の配列。
+                ピッチが検出できなかったフレームの周波数は NaN、無音フレームの信頼度は 0 になります。
+                どちらもプランの出力バッファのビューなので、次の呼び出しまでに使い切ってね。
+        """
+        frames = np.asarray(frames)
+        if frames.ndim == 1:
+            frames = frames[np.newaxis, :]
+        n_frames, n = frames.shape
+
+        search_end_lag_idx = min(self.max_lag, n - 1)
+        if n_frames == 0 or n < self.max_lag or self.min_lag > search_end_lag_idx:
+            self.logger.debug(f"フレーム長 {n} ではピッチ検出できないため、バッチ解析をスキップします。")
+            return np.full(n_frames, np.nan), np.zeros(n_frames)
+
+        plan = self._get_plan(n)
+        autocorr = plan.autocorrelate(frames)
+        k = n_frames
+        energy = plan.energy[:k]
+        np.copyto(energy, autocorr[:, 0])
+        voiced = np.greater(energy, 0, out=plan.voiced[:k])  # ラグ0が0のフレームは無音
+
+        search_range = autocorr[:, self.min_lag:search_end_lag_idx + 1]
+        peak_index = np.argmax(search_range, axis=1, out=plan.peak_index[:k])
+        peak_value = np.max(search_range, axis=1, out=plan.peak_value[:k])
+
+        confidences = plan.confidences[:k]
+        confidences.fill(0.0)
+        np.divide(peak_value, energy, out=confidences, where=voiced)
+
+        detected = np.greater_equal(confidences, self.confidence_threshold, out=plan.detected[:k])
+        np.logical_and(detected, voiced, out=detected)
+        # 周波数 = sample_rate / (min_lag + 相対ピーク位置)
+        peak_index += self.min_lag
+        frequencies = plan.frequencies[:k]
+        frequencies.fill(np.nan)
+        np.divide(self.sample_rate, peak_index, out=frequencies, where=detected)
+        self.logger.debug(f"🎤 バッチ解析: {n_frames}フレーム中 {int(np.count_nonzero(detected))}フレームでピッチ検出")
+        return frequencies, confidences
+
 # --- (オプション) テスト用の簡単なコード ---
 # if __name__ == '__main__':
 #     # このテストを実行する場合、loggingレベルをDEBUGにすると詳細が見れます
@@ -0,0 +1,170 @@
+# このモジュールは NumPy ライブラリに依存しています。
+
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# int16 のフルスケール。エネルギーを dBFS に直すときに使う
+_FULL_SCALE = 32768.0
+
+
+class VoiceActivityDetector:
+    """
+    フレームのエネルギー (dBFS) とゼロ交差率 (ZCR) だけで判定する、軽量なストリーミングVADだよ。
+
+    FFTの前に (フレーム数 × サンプル数) の2次元配列をまとめて判定できるから、
+    無音フレームのピッチ解析をまるごとスキップできる。
+    ハングオーバー (最後の有声フレームからしばらくは有声扱いにする) で、語尾や子音が切れるのを防ぐよ。
+    """
+
+    def __init__(self, sample_rate: int, energy_threshold_db: float = -50.0,
+                 zcr_threshold: float = 0.3, loud_margin_db: float = 15.0,
+                 hangover_ms: float = 300.0):
+        """
+        Args:
+            sample_rate (int): サンプリングレート (Hz)。
+            energy_threshold_db (float): これより小さいエネルギー (dBFS) のフレームは無音とみなす。
+            zcr_threshold (float): ZCRがこれ以上のフレームは、エネルギーが十分大きくない限りノイズとみなす。
+            loud_margin_db (float): 閾値よりこれだけ大きければ、ZCRが高くても (摩擦音として) 有声扱いにする。
+            hangover_ms (float): 最後に有声と判定してから、有声扱いを続ける時間 (ミリ秒)。
+        """
+        self.sample_rate = sample_rate
+        self.energy_threshold_db = energy_threshold_db
+        self.zcr_threshold = zcr_threshold
+        self.loud_margin_db = loud_margin_db
+        self.hangover_samples = int(sample_rate * hangover_ms / 1000)
+        # 最後の有声フレームから、次に渡されるフレームまでのサンプル数 (セッション開始時は「ずっと無音」)
+        self._samples_since_voice = self.hangover_samples + 1
+
+    def reset(self):
+        """ハングオーバーの状態をリセットする (新しいセッションの開始時に呼んでね)。"""
+        self._samples_since_voice = self.hangover_samples + 1
+
+    def frame_features(self, frames: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        各フレームのエネルギー (dBFS) とゼロ交差率を計算する。
+
+        Args:
+            frames (np.ndarray): (フレーム数 × サンプル数) の2次元配列。
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: (energy_db, zcr) それぞれ長さはフレーム数。
+        """
+        x = np.asarray(frames, dtype=np.float32)
+        mean_square = np.einsum("ij,ij->i", x, x) / (x.shape[1] * _FULL_SCALE * _FULL_SCALE)
+        energy_db = 10.0 * np.log10(mean_square + 1e-12)
+        # 符号が変わったサンプル対の割合 (0〜1)
+        signs = np.signbit(x)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / max(x.shape[1] - 1, 1)
+        return energy_db, zcr
+
+    def is_speech(self, frames: np.ndarray, step: int | None = None) -> np.ndarray:
+        """
+        フレームごとの有声/無音を判定する (ハングオーバー込み)。
+        呼び出しをまたいで状態を持つので、フレームは時間順に渡してね。
+
+        Args:
+            frames (np.ndarray): (フレーム数 × サンプル数) の2次元配列。
+            step (int | None): フレームの先頭同士の間隔 (サンプル)。省略時はフレーム長 (オーバーラップなし)。
+
+        Returns:
+            np.ndarray: 有声なら True の bool 配列。
+        """
+        n_frames = frames.shape[0]
+        if n_frames == 0:
+            return np.zeros(0, dtype=bool)
+        step = step or frames.shape[1]
+
+        energy_db, zcr = self.frame_features(frames)
+        raw = (energy_db > self.energy_threshold_db) & (
+            (zcr < self.zcr_threshold) | (energy_db > self.energy_threshold_db + self.loud_margin_db)
+        )
+
+        # ハングオーバーをベクトル化: 各フレームで「直近の有声フレームの番号」を累積maxで求める
+        # 前回の呼び出しの状態は、番号 -1 より前の仮想フレームとして扱う
+        index = np.arange(n_frames)
+        previous = -(-self._samples_since_voice // step)
+        last_voiced = np.maximum.accumulate(np.where(raw, index, -previous))
+        speech = (index - last_voiced) * step <= self.hangover_samples
+
+        if raw.any():
+            self._samples_since_voice = (n_frames - int(last_voiced[-1])) * step
+        else:
+            self._samples_since_voice += n_frames * step
+        return speech
+
+
+class SilenceGate:
+    """
+    文字起こし (STT) に送る前に、長い無音を間引くゲートだよ。
+
+    無音が始まってから keep_silence_ms までは文のつなぎ目としてそのまま流し、それ以降のチャンクは捨てる。
+    ただし捨て続けるとストリームが音声待ちでタイムアウトするので、keepalive_ms ごとに1チャンクだけ流すよ。
+    """
+
+    def __init__(self, detector: VoiceActivityDetector, keep_silence_ms: float = 600.0,
+                 keepalive_ms: float = 5000.0, dtype=np.int16):
+        """
+        Args:
+            detector (VoiceActivityDetector): チャンクの有声/無音判定に使うVAD (ゲート専用のインスタンスを渡してね)。
+            keep_silence_ms (float): 無音が始まってから、そのまま流し続ける時間 (ミリ秒)。
+            keepalive_ms (float): 無音を捨てている間に、生存確認用のチャンクを流す間隔 (ミリ秒)。
+            dtype: PCMサンプルの型。
+        """
+        self.detector = detector
+        self.dtype = np.dtype(dtype)
+        rate = detector.sample_rate
+        self.keep_silence_samples = int(rate * keep_silence_ms / 1000)
+        self.keepalive_samples = int(rate * keepalive_ms / 1000)
+        self._silence_samples = 0   # 今の無音区間の長さ
+        self._since_forward = 0     # 最後にチャンクを流してからの経過サンプル数
+        self.passed_bytes = 0
+        self.dropped_bytes = 0
+        self.last_speech = False  # 直前に filter() したチャンクが有声だったか
+
+    def reset(self):
+        """状態と統計をリセットする。"""
+        self.detector.reset()
+        self._silence_samples = 0
+        self._since_forward = 0
+        self.passed_bytes = 0
+        self.dropped_bytes = 0
+        self.last_speech = False
+
+    def filter(self, chunk: bytes) -> bytes | None:
+        """
+        チャンクを流すかどうか決める。
+
+        Returns:
+            bytes | None: 流すならチャンクそのもの、捨てるならNone。
+        """
+        n_samples = len(chunk) // self.dtype.itemsize
+        if n_samples == 0:
+            return chunk
+        samples = np.frombuffer(chunk, dtype=self.dtype, count=n_samples)
+        speech = bool(self.detector.is_speech(samples[np.newaxis, :])[0])
+        self.last_speech = speech
+
+        if speech:
+            self._silence_samples = 0
+        else:
+            self._silence_samples += n_samples
+
+        keep = speech or self._silence_samples <= self.keep_silence_samples
+        if not keep and self._since_forward + n_samples >= self.keepalive_samples:
+            keep = True  # 生存確認用
+        if keep:
+            self._since_forward = 0
+            self.passed_bytes += len(chunk)
+            return chunk
+        self._since_forward += n_samples
+        self.dropped_bytes += len(chunk)
+        return None
+
+    @property
+    def dropped_ratio(self) -> float:
+        """捨てた音声の割合 (0〜1)。"""
+        total = self.passed_bytes + self.dropped_bytes
+        return self.dropped_bytes / total if total else 0.0
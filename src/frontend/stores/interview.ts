@@ -30,6 +30,12 @@ export interface OverallFeedback {
   improvement_suggestions: string[];
 }
 
+// 最終評価の品質チェック (DeepEval) の結果。サンプリングされたセッションだけ、最終評価の後から届く
+export interface MetaEvaluation {
+  session_id: string;
+  metrics: Record<string, { score: number | null; reason: string }>;
+}
+
 export interface Evaluation {
   type: 'STAR_EVALUATION' | 'OVERALL_FEEDBACK' | 'LEGACY_EVALUATION';
   data: StarEvaluation | OverallFeedback | { score: number; feedback: string; };
@@ -51,7 +57,10 @@ export interface SentimentData {
 let audioContext: AudioContext | null = null;
 let stream: MediaStream | null = null;
 let workletNode: AudioWorkletNode | null = null;
-const SAMPLE_RATE = 16000; // バックエンドの期待値に合わせる
+// 音声はAudioContextのネイティブレート (多くは48kHz) の Float32 のまま送り、変換・リサンプルはサーバー側でやる
+const AUDIO_ENCODING = 'float32';
+// 文字起こしは毎回全文をもらうのではなく、変わった断片 (transcript_delta) だけをもらう
+const TRANSCRIPT_PROTOCOL = 'delta';
 const audioStream = ref<MediaStream | null>(null);
 const localStream = ref<MediaStream | null>(null);
 
@@ -95,6 +104,12 @@ export const useInterviewStore = defineStore('interview', () => {
    */
   const sentimentHistory = ref<SentimentData[]>([]);
 
+  /**
+   * 最終評価のメタ評価 (届かないセッションもある)
+   * @type {import('vue').Ref<MetaEvaluation | null>}
+   */
+  const metaEvaluation = ref<MetaEvaluation | null>(null);
+
   /**
    * 面接がアクティブかどうか
    * @type {import('vue').Ref<boolean>}
@@ -118,6 +133,15 @@ export const useInterviewStore = defineStore('interview', () => {
   let socket: WebSocket | null = null;
 
   const currentTranscription = ref<string>('');
+  // transcript_delta で届いた断片。確定した分は stableTranscript に1回だけつなげる
+  let stableTranscript = '';
+  let interimTranscript = '';
+
+  function resetTranscript() {
+    stableTranscript = '';
+    interimTranscript = '';
+    currentTranscription.value = '';
+  }
 
   // final transcriptの正規化比較用関数を追加
   function normalizeText(text: string): string {
@@ -170,6 +194,19 @@ export const useInterviewStore = defineStore('interview', () => {
         currentTranscription.value = transcript;
         break;
       }
+      case 'transcript_delta': {
+        const { status, text } = message.payload;
+        if (status === 'stable') {
+          stableTranscript = stableTranscript ? `${stableTranscript} ${text}` : text;
+          interimTranscript = '';
+        } else {
+          interimTranscript = text;
+        }
+        currentTranscription.value = interimTranscript
+          ? (stableTranscript ? `${stableTranscript} ${interimTranscript}` : interimTranscript)
+          : stableTranscript;
+        break;
+      }
       case 'sentiment_update': {
         const { sentiment } = message.payload;
         if (sentiment && Object.keys(sentiment).length > 0) {
@@ -182,6 +219,18 @@ export const useInterviewStore = defineStore('interview', () => {
         interviewState.value = 'evaluating';
         console.log('⌛ AIによる評価が開始されました...');
         break;
+      case 'evaluation_partial': {
+        // STARの項目ができたそばから1つずつ届く (最後に final_evaluation で全体が置き換わる)
+        const { section, evaluation } = message.payload;
+        let star = evaluations.value.find((e) => e.type === 'STAR_EVALUATION');
+        if (!star) {
+          star = { type: 'STAR_EVALUATION', data: {} as StarEvaluation };
+          evaluations.value.push(star);
+        }
+        (star.data as StarEvaluation)[section as keyof StarEvaluation] = evaluation;
+        console.log(`📝 STAR評価の「${section}」を先に受信しました`);
+        break;
+      }
       case 'final_evaluation':
         isEvaluating.value = false;
         interviewState.value = 'finished';
@@ -212,14 +261,19 @@ export const useInterviewStore = defineStore('interview', () => {
         console.log('👑 AIによる最終評価を受信しました！', evaluations.value);
         break;
       case 'pitch_analysis':
-        const newPitchData: PitchData = {
-          timestamp: (message.payload.timestamp || Date.now() / 1000) * 1000, // バックエンドのPythonタイムスタンプ(s)をJS(ms)に変換
-          pitch: message.payload.pitch,
-        };
-        pitchHistory.value.push(newPitchData);
+        // バックエンドはスムージング済みの輪郭を points にまとめて送ってくる (古い形式は pitch 1点だけ)
+        const pitchPoints: { pitch: number; timestamp?: number }[] =
+          message.payload.points ?? [{ pitch: message.payload.pitch, timestamp: message.payload.timestamp }];
+        for (const point of pitchPoints) {
+          const newPitchData: PitchData = {
+            timestamp: (point.timestamp || Date.now() / 1000) * 1000, // バックエンドのPythonタイムスタンプ(s)をJS(ms)に変換
+            pitch: point.pitch,
+          };
+          pitchHistory.value.push(newPitchData);
+        }
         // Optional: Keep the array from growing indefinitely
         if (pitchHistory.value.length > 200) {
-          pitchHistory.value.shift();
+          pitchHistory.value.splice(0, pitchHistory.value.length - 200);
         }
         break;
       case 'sentiment_analysis':
@@ -233,10 +287,19 @@ export const useInterviewStore = defineStore('interview', () => {
           sentimentHistory.value.shift();
         }
         break;
+      case 'degraded':
+        // サーバーが混んでいて、文字起こし用の音声を捨てたり待たせたりしたときの通知
+        console.warn('🐢 サーバー側で音声処理が詰まっていました:', message.payload);
+        break;
       case 'error':
         errorMessage.value = `サーバーエラー: ${message.payload.message}`;
         interviewState.value = 'error';
         break;
+      case 'meta_evaluation':
+        // 最終評価を送った後に、裏で回していた品質チェックの結果が届く
+        metaEvaluation.value = message.payload;
+        console.log('🧪 最終評価のメタ評価を受信しました', message.payload);
+        break;
       default:
         console.warn('🤔 不明なメッセージタイプ:', message.type);
     }
@@ -316,8 +379,9 @@ export const useInterviewStore = defineStore('interview', () => {
 
   /**
    * マイクからの音声ストリーミングを開始します。
+   * AudioContextのサンプルレートが決まってから、音声フォーマットを添えて start を送ります。
    */
-  async function startAudioStreaming() {
+  async function startAudioStreaming(question: string) {
     if (!socket || socket.readyState !== WebSocket.OPEN) {
       errorMessage.value = 'WebSocket接続がありません。';
       return;
@@ -327,7 +391,18 @@ export const useInterviewStore = defineStore('interview', () => {
       localStream.value = stream;
       interviewState.value = 'in_progress'; // 音声取得成功でin_progressへ
 
-      audioContext = new AudioContext({ sampleRate: SAMPLE_RATE });
+      audioContext = new AudioContext();
+
+      socket?.send(JSON.stringify({
+        action: 'start',
+        question,
+        transcript_protocol: TRANSCRIPT_PROTOCOL,
+        audio_format: {
+          encoding: AUDIO_ENCODING,
+          sample_rate: audioContext.sampleRate,
+          channels: 1,
+        },
+      }));
 
       // Load the audio worklet processor from the public folder
       await audioContext.audioWorklet.addModule('/audio-processor.js');
@@ -337,22 +412,9 @@ export const useInterviewStore = defineStore('interview', () => {
 
       workletNode.port.onmessage = (event) => {
         if (socket?.readyState === WebSocket.OPEN && interviewState.value === 'in_progress') {
-          // event.data は audio-processor.js から送られてきた ArrayBuffer
-          const float32Data = new Float32Array(event.data);
-          
-          // 16-bit PCM (Int16Array) に変換
-          const pcmData = new Int16Array(float32Data.length);
-          for (let i = 0; i < float32Data.length; i++) {
-            // -1.0 から 1.0 の範囲にクリッピング
-            const s = Math.max(-1, Math.min(1, float32Data[i]));
-            // 16ビット整数にスケーリング
-            // s < 0 ? s * 0x8000 : s * 0x7FFF;
-            // 32767.0 は 16bit符号付き整数の最大値
-            pcmData[i] = s * 32767.0;
-          }
-          
-          // WebSocket経由でバイナリデータを送信
-          socket.send(pcmData.buffer);
+          // event.data は audio-processor.js から送られてきた Float32 の ArrayBuffer
+          // int16 への変換とリサンプルはサーバーがまとめてやるので、メインスレッドではそのまま送るだけ
+          socket.send(event.data);
         }
       };
 
@@ -405,7 +467,8 @@ export const useInterviewStore = defineStore('interview', () => {
     evaluations.value = [];
     pitchHistory.value = [];
     sentimentHistory.value = [];
-    currentTranscription.value = '';
+    metaEvaluation.value = null;
+    resetTranscript();
 
     // interviewStateの変更がUIに反映されてから処理を進める
     await new Promise(resolve => setTimeout(resolve, 0));
@@ -419,11 +482,8 @@ export const useInterviewStore = defineStore('interview', () => {
       await connect();
 
       if (socket?.readyState === WebSocket.OPEN) {
-        socket.send(JSON.stringify({
-          action: 'start',
-          question: '自己紹介をお願いします。', // 将来的には動的に変更
-        }));
-        await startAudioStreaming();
+        // start はマイクの準備ができてから、音声フォーマットと一緒に送る
+        await startAudioStreaming('自己紹介をお願いします。'); // 将来的には動的に変更
       } else {
         throw new Error("WebSocketの接続に失敗しました。面接を開始できません。");
       }
@@ -471,8 +531,9 @@ export const useInterviewStore = defineStore('interview', () => {
     evaluations.value = [];
     pitchHistory.value = [];
     sentimentHistory.value = [];
+    metaEvaluation.value = null;
     interviewState.value = 'idle';
-    currentTranscription.value = '';
+    resetTranscript();
   }
 
   return {
@@ -481,6 +542,7 @@ export const useInterviewStore = defineStore('interview', () => {
     evaluations,
     pitchHistory,
     sentimentHistory,
+    metaEvaluation,
     isInterviewActive, // 後方互換性のために残すが、徐々に使わないようにする
     isEvaluating,
     errorMessage,
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# テストから `backend.*` をインポートできるように、プロジェクトルートの 'src' を sys.path に追加する！
+# (manual_test_speech_processor.py と同じやり方だよん)
+_SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if _SRC_DIR not in sys.path:
+    sys.path.insert(0, _SRC_DIR)
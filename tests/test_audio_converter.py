@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from backend.workers.audio_converter import AudioConverter, AudioFormat
+
+TARGET = 16000
+
+
+def _sine(rate: int, seconds: float = 0.5, freq: float = 440.0) -> np.ndarray:
+    t = np.arange(int(rate * seconds)) / rate
+    return (0.5 * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def _expected(converter: AudioConverter, n: int, freq: float = 440.0) -> np.ndarray:
+    """リサンプラーの群遅延ぶんずらした、16kHz の理想的な正弦波。"""
+    r = converter.resampler
+    delay = (r.taps_per_phase * r.up - 1) / 2 / (r.up * converter.source.sample_rate)
+    t = np.arange(n) / TARGET
+    return 0.5 * 32767 * np.sin(2 * np.pi * freq * (t - delay))
+
+
+@pytest.mark.parametrize("rate", [48000, 44100, 22050, 8000])
+def test_float32_is_resampled_to_16k_int16(rate):
+    converter = AudioConverter(AudioFormat("float32", rate, 1), target_rate=TARGET)
+    out = np.frombuffer(converter.convert(_sine(rate).tobytes()), dtype=np.int16)
+
+    assert len(out) == pytest.approx(TARGET * 0.5, abs=1)
+    expected = _expected(converter, len(out))
+    # 立ち上がり (フィルタの履歴がゼロの部分) を除けば、ほぼ1LSBの誤差
+    np.testing.assert_allclose(out[100:], expected[100:], atol=3)
+
+
+def test_chunked_conversion_matches_one_shot():
+    audio = np.stack([_sine(44100), _sine(44100, freq=300.0)], axis=1).ravel().tobytes()
+    fmt = AudioFormat("float32", 44100, channels=2)
+
+    one_shot = AudioConverter(fmt, target_rate=TARGET).convert(audio)
+    chunked = AudioConverter(fmt, target_rate=TARGET)
+    # サンプルの途中で切れるチャンクでも同じ結果になる
+    pieces = [chunked.convert(audio[i:i + 1027]) for i in range(0, len(audio), 1027)]
+    assert b"".join(pieces) == one_shot
+
+
+def test_float32_at_target_rate_is_only_converted():
+    converter = AudioConverter(AudioFormat("float32", TARGET, 1), target_rate=TARGET)
+    samples = np.array([0.0, 0.5, -1.0, 1.5], dtype=np.float32)
+    out = np.frombuffer(converter.convert(samples.tobytes()), dtype=np.int16)
+    np.testing.assert_array_equal(out, [0, 16384, -32767, 32767])
+
+
+def test_default_format_is_passthrough_and_invalid_format_raises():
+    converter = AudioConverter(AudioFormat.from_message(None), target_rate=TARGET)
+    assert converter.is_passthrough
+    chunk = b"\x01\x02\x03"
+    assert converter.convert(chunk) is chunk
+
+    with pytest.raises(ValueError):
+        AudioFormat.from_message({"encoding": "mp3"})
+    with pytest.raises(ValueError):
+        AudioFormat.from_message({"encoding": "float32", "sample_rate": 1000})
+
+
+@pytest.mark.parametrize("message", [
+    "float32",
+    [48000],
+    {"sample_rate": None},
+    {"sample_rate": "48000"},
+    {"sample_rate": 44100.5},
+    {"channels": True},
+    {"encoding": ["int16"]},
+])
+def test_malformed_format_raises_value_error(message):
+    # main.py の start ハンドラは ValueError だけを受け止めるので、型の間違いも ValueError になること
+    with pytest.raises(ValueError):
+        AudioFormat.from_message(message)
+
+
+def test_integral_float_sample_rate_is_accepted():
+    assert AudioFormat.from_message({"sample_rate": 48000.0}).sample_rate == 48000
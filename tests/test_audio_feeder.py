@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+
+from backend.services.audio_feeder import AudioFeeder
+
+FRAME = b"\x01\x00" * 128  # フロントエンドと同じ 128サンプル (256バイト)
+
+
+def test_coalesces_small_frames_into_fixed_requests():
+    async def run():
+        feeder = AudioFeeder(request_bytes=3200)
+        received = []
+
+        async def consume():
+            async for request in feeder.requests():
+                received.append(request)
+
+        consumer = asyncio.create_task(consume())
+        await asyncio.sleep(0)
+        for _ in range(50):  # 50 x 256 = 12800 バイト = 4リクエスト
+            await feeder.put(FRAME)
+            await asyncio.sleep(0)
+        await feeder.put(b"\x02\x00" * 10)
+        feeder.close()
+        await consumer
+        return feeder, received
+
+    feeder, received = asyncio.run(run())
+    assert [len(r) for r in received] == [3200, 3200, 3200, 3200, 20]
+    assert b"".join(received) == FRAME * 50 + b"\x02\x00" * 10
+    assert feeder.requests_made == 5
+    # 1リクエスト分たまったときと close のときだけ起こされる
+    assert feeder.wakeups <= 5
+
+
+def test_flush_emits_partial_request_and_idle_consumer_does_not_wake():
+    async def run():
+        feeder = AudioFeeder(request_bytes=3200)
+        received = []
+
+        async def consume():
+            async for request in feeder.requests():
+                received.append(request)
+
+        consumer = asyncio.create_task(consume())
+        await feeder.put(FRAME)
+        await asyncio.sleep(0.05)  # 何も来ない間は寝たまま
+        assert feeder.wakeups == 0 and received == []
+        feeder.flush()
+        await asyncio.sleep(0)
+        assert received == [FRAME]
+        feeder.close()
+        await consumer
+        await feeder.put(FRAME)  # close 後は無視
+        return feeder
+
+    feeder = asyncio.run(run())
+    assert feeder.requests_made == 1
+
+
+def test_drop_oldest_counts_dropped_bytes():
+    async def scenario():
+        feeder = AudioFeeder(request_bytes=4, max_requests=2, policy="drop_oldest")
+        for i in range(4):
+            await feeder.put(bytes([i]) * 4)
+        feeder.close()
+        return [r async for r in feeder.requests()], feeder
+
+    requests, feeder = asyncio.run(scenario())
+    # 上限2つなので、古い2つが捨てられて新しい2つが残る
+    assert requests == [b"\x02" * 4, b"\x03" * 4]
+    assert feeder.dropped_bytes == 8
+    assert feeder.dropped_requests == 2
+    assert feeder.degraded
+
+
+def test_drop_silence_prefers_silent_requests():
+    async def scenario():
+        feeder = AudioFeeder(request_bytes=4, max_requests=2, policy="drop_silence")
+        await feeder.put(b"\x01" * 4, speech=True)
+        await feeder.put(b"\x00" * 4, speech=False)
+        await feeder.put(b"\x02" * 4, speech=True)  # 無音のリクエストが捨てられる
+        await feeder.put(b"\x00" * 4, speech=False)  # 全部有声なので、入ってきた無音の方を捨てる
+        feeder.close()
+        return [r async for r in feeder.requests()], feeder
+
+    requests, feeder = asyncio.run(scenario())
+    assert requests == [b"\x01" * 4, b"\x02" * 4]
+    assert feeder.dropped_requests == 2
+    assert feeder.stats()["dropped_bytes"] == 8
+
+
+def test_speech_chunk_split_across_requests_stays_speech():
+    async def scenario():
+        feeder = AudioFeeder(request_bytes=4)
+        await feeder.put(b"\x00" * 2, speech=False)
+        await feeder.put(b"\x01" * 11, speech=True)  # 2リクエスト以上にまたがる有声チャンク
+        await feeder.put(b"\x00" * 3, speech=False)
+        return list(feeder._ready)
+
+    queued = asyncio.run(scenario())
+    assert [len(request) for request, _ in queued] == [4, 4, 4, 4]
+    # 有声のバイトを含むリクエストは、全部有声として積まれている
+    for request, speech in queued:
+        assert speech == (b"\x01" in request)
+    assert [speech for _, speech in queued] == [True, True, True, True]
+
+
+def test_block_policy_waits_for_consumer():
+    async def scenario():
+        feeder = AudioFeeder(request_bytes=4, max_requests=1, policy="block")
+        await feeder.put(b"\x01" * 4)
+        producer = asyncio.create_task(feeder.put(b"\x02" * 4))
+        await asyncio.sleep(0.05)
+        assert not producer.done()  # キューがいっぱいなので待っている
+
+        received = []
+        async for request in feeder.requests():
+            received.append(request)
+            if len(received) == 2:
+                break
+        await producer
+        return received, feeder
+
+    received, feeder = asyncio.run(scenario())
+    assert received == [b"\x01" * 4, b"\x02" * 4]
+    assert feeder.dropped_bytes == 0
+    assert feeder.blocked_seconds >= 0.04
+    assert feeder.degraded
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        AudioFeeder(request_bytes=4, policy="drop_everything")
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from backend.workers.audio_ring_buffer import PitchRingBuffer
+
+
+def _pcm(start: int, count: int) -> bytes:
+    return np.arange(start, start + count, dtype=np.int16).tobytes()
+
+
+def test_windows_match_linear_framing():
+    ring = PitchRingBuffer(capacity=1500)
+    window, hop = 640, 320
+    stream = np.arange(5000, dtype=np.int16)
+    frames = []
+    # 中途半端なサイズのチャンクで流し込む
+    for i in range(0, len(stream), 777):
+        ring.push(stream[i:i + 777].tobytes())
+        frames.extend(f.copy() for f in ring.windows(window, hop))
+
+    expected = [stream[i:i + window] for i in range(0, len(stream) - window + 1, hop)]
+    assert len(frames) == len(expected)
+    for got, want in zip(frames, expected):
+        np.testing.assert_array_equal(got, want)
+
+
+def test_window_straddling_wrap_point_is_contiguous_view():
+    ring = PitchRingBuffer(capacity=1000)
+    ring.push(_pcm(0, 900))
+    assert ring.pop_window(640, 640) is not None  # read_pos = 640
+    ring.push(_pcm(900, 400))                     # 書き込みが先頭にラップする
+    frame = ring.pop_window(640, 320)
+    np.testing.assert_array_equal(frame, np.arange(640, 1280, dtype=np.int16))
+    assert frame.flags["C_CONTIGUOUS"]
+    assert np.shares_memory(frame, ring._data)
+
+
+def test_odd_trailing_bytes_are_carried_across_chunks():
+    ring = PitchRingBuffer(capacity=100)
+    payload = _pcm(1000, 10)
+    ring.push(payload[:3])
+    ring.push(payload[3:4])
+    ring.push(payload[4:])
+    assert ring.available == 10
+    np.testing.assert_array_equal(ring.pop_window(10, 10), np.arange(1000, 1010, dtype=np.int16))
+
+
+def test_overflow_drops_oldest_samples():
+    ring = PitchRingBuffer(capacity=100)
+    ring.push(_pcm(0, 150))
+    assert ring.available == 100
+    assert ring.dropped_samples == 50
+    np.testing.assert_array_equal(ring.pop_window(100, 100), np.arange(50, 150, dtype=np.int16))
+
+
+def test_window_larger_than_capacity_is_rejected():
+    ring = PitchRingBuffer(capacity=10)
+    with pytest.raises(ValueError):
+        ring.pop_window(11, 1)
+
+
+def test_feed_handles_chunks_larger_than_capacity_without_loss():
+    ring = PitchRingBuffer(capacity=1000)
+    stream = np.arange(5000, dtype=np.int16)
+    frames = [f.copy() for f in ring.feed(stream.tobytes(), 640, 320)]
+    assert ring.dropped_samples == 0
+    assert len(frames) == (5000 - 640) // 320 + 1
+    np.testing.assert_array_equal(frames[-1], stream[len(frames) * 320 - 320:len(frames) * 320 + 320])
+
+
+def test_feed_with_odd_chunks_never_clobbers_unread_samples():
+    ring = PitchRingBuffer(capacity=700)
+    payload = np.arange(20000, dtype=np.int16).tobytes()
+    frames = []
+    for i in range(0, len(payload), 1001):
+        frames.extend(f.copy() for f in ring.feed(payload[i:i + 1001], 640, 320))
+    stream = np.arange(20000, dtype=np.int16)
+    assert ring.dropped_samples == 0
+    for k, frame in enumerate(frames):
+        np.testing.assert_array_equal(frame, stream[k * 320:k * 320 + 640])
+
+
+def test_feed_frames_returns_strided_views_across_wrap():
+    ring = PitchRingBuffer(capacity=1000)
+    stream = np.arange(12000, dtype=np.int16)
+    blocks = []
+    for i in range(0, len(stream), 1500):
+        for frames in ring.feed_frames(stream[i:i + 1500].tobytes(), 640, 320):
+            assert frames.shape[1] == 640
+            assert np.shares_memory(frames, ring._data)
+            blocks.append(frames.copy())
+    frames = np.concatenate(blocks)
+    expected = np.lib.stride_tricks.sliding_window_view(stream, 640)[::320]
+    np.testing.assert_array_equal(frames, expected)
@@ -0,0 +1,123 @@
+import asyncio
+import threading
+
+import pytest
+
+from google.auth.credentials import AnonymousCredentials
+
+from backend.services.client_registry import ClientRegistry, warm_up_client_registry
+from backend.services.transcription_backend import GoogleTranscriptionBackend
+
+
+class FakeClient:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeAsyncClient(FakeClient):
+    async def aclose(self):
+        self.closed = True
+
+
+def test_clients_are_built_once_and_shared():
+    registry = ClientRegistry()
+    built = []
+    registry.register("speech", lambda: built.append(1) or FakeClient())
+
+    first = registry.get("speech")
+    assert registry.get("speech") is first
+    assert built == [1]
+    assert "speech" in registry.build_seconds
+    with pytest.raises(KeyError):
+        registry.get("unknown")
+
+
+def test_concurrent_first_use_builds_one_client():
+    registry = ClientRegistry()
+    built = []
+    barrier = threading.Barrier(8)
+
+    def factory():
+        built.append(1)
+        return FakeClient()
+
+    registry.register("gemini", factory)
+    clients = []
+
+    def borrow():
+        barrier.wait()
+        clients.append(registry.get("gemini"))
+
+    threads = [threading.Thread(target=borrow) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(built) == 1
+    assert all(client is clients[0] for client in clients)
+
+
+def test_failed_factory_is_retried_after_backoff():
+    now = [0.0]
+    registry = ClientRegistry(retry_seconds=30, clock=lambda: now[0])
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("認証情報がありません")
+        return FakeClient()
+
+    registry.register("pubsub", flaky)
+    registry.warm_up()
+
+    assert registry.get("pubsub") is None
+    assert calls == [1]  # 接続のたびに作り直そうとしない
+    now[0] += 31
+    assert isinstance(registry.get("pubsub"), FakeClient)  # しばらくたったら作り直す
+    assert calls == [1, 1]
+
+
+def test_warm_up_builds_google_backend_on_the_event_loop():
+    registry = ClientRegistry()
+    registry.register(
+        "transcription",
+        lambda: GoogleTranscriptionBackend(credentials=AnonymousCredentials()),
+        close=lambda backend: backend.close(),
+        needs_loop=True,
+    )
+    registry.register("gemini", FakeClient)
+
+    async def scenario():
+        await warm_up_client_registry(registry)
+        backend = registry.get("transcription")
+        assert isinstance(backend, GoogleTranscriptionBackend)
+        assert isinstance(registry.get("gemini"), FakeClient)
+        assert set(registry.build_seconds) == {"transcription", "gemini"}
+        await registry.close()
+
+    asyncio.run(scenario())
+
+    # スレッドでの warm_up は、イベントループの要るクライアントには手を出さない
+    threaded = ClientRegistry()
+    threaded.register("transcription", lambda: pytest.fail("スレッドで作ってはいけない"), needs_loop=True)
+    threaded.warm_up()
+    assert "transcription" not in threaded.build_seconds
+
+
+def test_close_runs_sync_and_async_closers():
+    registry = ClientRegistry()
+    registry.register("sync", FakeClient, close=lambda client: client.close())
+    registry.register("async", FakeAsyncClient, close=lambda client: client.aclose())
+    registry.register("unused", FakeClient, close=lambda client: client.close())
+    sync_client, async_client = registry.get("sync"), registry.get("async")
+
+    asyncio.run(registry.close())
+
+    assert sync_client.closed and async_client.closed
+    # 閉じたあとに借りようとしたら、作り直す
+    assert registry.get("sync") is not sync_client
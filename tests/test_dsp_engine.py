@@ -0,0 +1,161 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from backend.workers.dsp_engine import DSPEngine
+from backend.workers.pitch_worker import PitchWorker
+
+RATE = 16000
+PITCH_KWARGS = dict(sample_rate=RATE, channels=1, sample_width=2)
+
+
+@pytest.fixture(scope="module")
+def engine():
+    engine = DSPEngine(PITCH_KWARGS, n_workers=1, max_sessions=2)
+    engine.start()
+    yield engine
+    engine.close()
+
+
+def _speech(seconds: float) -> bytes:
+    t = np.arange(int(RATE * seconds)) / RATE
+    freq = 120.0 + 80.0 * t / seconds  # 120Hz → 200Hz にゆっくり上がる
+    return (6000 * np.sin(2 * np.pi * np.cumsum(freq) / RATE)).astype(np.int16).tobytes()
+
+
+def test_engine_matches_in_loop_worker(engine):
+    audio = _speech(0.5)
+    local = PitchWorker(**PITCH_KWARGS)
+    window, hop = local.frame_length, local.frame_length // 2
+
+    async def run():
+        session = engine.open_session()
+        remote_results, local_results = [], []
+        try:
+            for i in range(0, len(audio), 2048):
+                for frames in session.feed_frames(audio[i:i + 2048], window, hop):
+                    expected, _ = local.analyze_pitch_batch(frames)
+                    local_results.append(expected.copy())
+                    frequencies, _ = await session.analyze_pitch_batch(frames)
+                    remote_results.append(frequencies)
+        finally:
+            session.close()
+        return np.concatenate(remote_results), np.concatenate(local_results)
+
+    remote, expected = asyncio.run(run())
+    assert len(remote) == (len(audio) // 2 - window) // hop + 1
+    np.testing.assert_allclose(remote, expected)
+
+
+def test_slots_are_limited_and_reusable(engine):
+    first, second = engine.open_session(), engine.open_session()
+    with pytest.raises(RuntimeError):
+        engine.open_session()
+    first.close()
+    third = engine.open_session()
+    assert third.slot == first.slot
+    second.close()
+    third.close()
+
+
+def test_rejects_frames_not_from_session(engine):
+    session = engine.open_session()
+    try:
+        with pytest.raises(ValueError):
+            asyncio.run(session.analyze_pitch_batch(np.zeros((2, 640), dtype=np.int16)))
+    finally:
+        session.close()
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _wait_until_settled(engine, timeout=5.0):
+    """タイムアウトさせたジョブの完了通知が届いて、スロットが空くまで待つ。"""
+    deadline = time.monotonic() + timeout
+    while engine._stale_jobs and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not engine._stale_jobs
+
+
+def test_timed_out_job_is_dropped_and_falls_back_inline(engine, monkeypatch):
+    audio = _speech(0.2)
+    local = PitchWorker(**PITCH_KWARGS)
+    window, hop = local.frame_length, local.frame_length // 2
+    clock = _FakeClock()
+    monkeypatch.setattr(engine, "clock", clock)
+    monkeypatch.setattr(engine, "max_failures", 2)
+
+    async def analyze(session, frames):
+        expected, _ = local.analyze_pitch_batch(frames)
+        expected = expected.copy()
+        frequencies, _ = await session.analyze_pitch_batch(frames)
+        np.testing.assert_allclose(frequencies, expected)
+
+    async def run():
+        session = engine.open_session()
+        try:
+            frames = next(iter(session.feed_frames(audio, window, hop)))
+            # 必ずタイムアウトさせる → 結果はこのプロセスで計算し直す
+            monkeypatch.setattr(engine, "timeout", 0.0)
+            await analyze(session, frames)
+            assert engine.timeouts == 1
+            fallbacks = engine.fallbacks
+            _wait_until_settled(engine)
+
+            # 2回続けて失敗したらブレーカーが開いて、ワーカーには送らなくなる
+            await analyze(session, frames)
+            assert engine.circuit_open
+            _wait_until_settled(engine)
+            timeouts = engine.timeouts
+            await analyze(session, frames)
+            assert engine.timeouts == timeouts
+            assert engine.fallbacks == fallbacks + 2
+
+            # retry_seconds が過ぎたら、もう一度ワーカーを試す
+            monkeypatch.setattr(engine, "timeout", 2.0)
+            clock.now += engine.retry_seconds
+            completed = engine.completed
+            await analyze(session, frames)
+            assert engine.completed == completed + 1
+            assert not engine.circuit_open
+        finally:
+            session.close()
+
+    asyncio.run(run())
+
+
+def test_dead_workers_fall_back_without_waiting():
+    engine = DSPEngine(PITCH_KWARGS, n_workers=1, max_sessions=1, timeout=5.0)
+    engine.start()
+    try:
+        for process in engine._processes:
+            process.terminate()
+            process.join()
+        local = PitchWorker(**PITCH_KWARGS)
+        window = local.frame_length
+
+        async def run():
+            session = engine.open_session()
+            try:
+                frames = next(iter(session.feed_frames(_speech(0.1), window, window // 2)))
+                expected, _ = local.analyze_pitch_batch(frames)
+                expected = expected.copy()
+                start = time.perf_counter()
+                frequencies, _ = await session.analyze_pitch_batch(frames)
+                assert time.perf_counter() - start < 1.0
+                np.testing.assert_allclose(frequencies, expected)
+            finally:
+                session.close()
+
+        asyncio.run(run())
+        assert engine.fallbacks == 1 and engine.timeouts == 0
+    finally:
+        engine.close()
@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import time
+
+from backend.services.evaluation_cache import EvaluationCache, evaluation_key
+
+RESULT = {"star_evaluation": {"situation": {"score": 7, "feedback": "良い"}}, "overall_score": 7}
+
+
+def test_key_depends_on_model_config_and_prompt():
+    key = evaluation_key("gemini-1.5-flash", {"temperature": 0.2}, "プロンプト")
+    assert key == evaluation_key("gemini-1.5-flash", {"temperature": 0.2}, "プロンプト")
+    assert key != evaluation_key("gemini-1.5-pro", {"temperature": 0.2}, "プロンプト")
+    assert key != evaluation_key("gemini-1.5-flash", {"temperature": 0.8}, "プロンプト")
+    assert key != evaluation_key("gemini-1.5-flash", {"temperature": 0.2}, "プロンプト!")
+
+
+def test_memory_lru_counters_and_copies():
+    async def scenario():
+        cache = EvaluationCache(max_entries=2)
+        assert await cache.get("a") is None
+        await cache.put("a", RESULT)
+        await cache.put("b", RESULT)
+        await cache.put("err", {"error": "failed"})  # エラーは保存しない
+        assert await cache.get("a") == RESULT
+        await cache.put("c", RESULT)  # 一番使われていない "b" が追い出される
+        assert await cache.get("b") is None
+        assert len(cache) == 2
+
+        # 取り出した結果を書き換えても、キャッシュは変わらない
+        (await cache.get("a"))["overall_score"] = 0
+        assert (await cache.get("a"))["overall_score"] == 7
+        assert cache.stats() == {"entries": 2, "hits": 3, "disk_hits": 0, "misses": 2, "hit_ratio": 0.6}
+
+    asyncio.run(scenario())
+
+
+def test_hit_is_sub_millisecond():
+    async def scenario():
+        cache = EvaluationCache()
+        await cache.put("a", RESULT)
+        start = time.perf_counter()
+        for _ in range(100):
+            await cache.get("a")
+        assert (time.perf_counter() - start) / 100 < 1e-3
+
+    asyncio.run(scenario())
+
+
+def test_sqlite_tier_survives_restart_and_expires(tmp_path):
+    async def scenario():
+        now = [1000.0]
+        path = str(tmp_path / "cache" / "evaluations.sqlite3")
+        cache = EvaluationCache(sqlite_path=path, ttl_seconds=60, clock=lambda: now[0])
+        await cache.put("a", RESULT)
+        cache.close()
+
+        restarted = EvaluationCache(sqlite_path=path, ttl_seconds=60, clock=lambda: now[0])
+        assert await restarted.get("a") == RESULT
+        assert restarted.disk_hits == 1
+        assert await restarted.get("a") == RESULT  # 2回目はメモリから
+        assert restarted.disk_hits == 1
+
+        now[0] += 61
+        assert await restarted.get("a") is None
+        assert restarted.purge_expired() == 1
+        restarted.close()
+
+    asyncio.run(scenario())
+
+
+def test_disk_io_runs_off_the_event_loop_thread(tmp_path):
+    async def scenario():
+        cache = EvaluationCache(sqlite_path=str(tmp_path / "evaluations.sqlite3"))
+        loop_thread = threading.get_ident()
+        seen = []
+        load, store = cache._load, cache._store
+        cache._load = lambda *args: seen.append(threading.get_ident()) or load(*args)
+        cache._store = lambda *args: seen.append(threading.get_ident()) or store(*args)
+
+        await cache.put("a", RESULT)
+        cache._entries.clear()
+        assert await cache.get("a") == RESULT
+        assert len(seen) == 2 and loop_thread not in seen
+        cache.close()
+
+    asyncio.run(scenario())
+
+
+def test_disk_only_cache_without_memory_entries(tmp_path):
+    async def scenario():
+        cache = EvaluationCache(max_entries=0, sqlite_path=str(tmp_path / "evaluations.sqlite3"))
+        await cache.put("a", RESULT)
+        assert len(cache) == 0
+        # ディスクから読めても、メモリには置かない (KeyError にならない)
+        assert await cache.get("a") == RESULT
+        assert await cache.get("a") == RESULT
+        assert (cache.disk_hits, cache.hits, len(cache)) == (2, 2, 0)
+        cache.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,133 @@
+import asyncio
+import random
+import time
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from backend.services.gemini_resilience import EvaluationDeadlineExceeded, ResilientCaller
+
+
+class _FakeModel:
+    """呼ばれるたびに、台本どおりの遅延のあと、結果を返すかエラーを投げるモデル。"""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.calls = 0
+        self.cancelled = 0
+
+    async def generate(self):
+        delay, outcome = self.script[min(self.calls, len(self.script) - 1)]
+        self.calls += 1
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def _caller(**kwargs):
+    options = dict(deadline_seconds=1.0, base_delay=0.01, max_delay=0.02, hedge=False, rng=random.Random(0))
+    options.update(kwargs)
+    return ResilientCaller(**options)
+
+
+def test_retries_only_retryable_errors():
+    async def scenario():
+        model = _FakeModel([
+            (0.0, google_exceptions.TooManyRequests("429")),
+            (0.0, google_exceptions.ServiceUnavailable("503")),
+            (0.0, "ok"),
+        ])
+        caller = _caller()
+        assert await caller.call(model.generate) == "ok"
+        assert (model.calls, caller.retries) == (3, 2)
+
+        broken = _FakeModel([(0.0, ValueError("bad request"))])
+        with pytest.raises(ValueError):
+            await caller.call(broken.generate)
+        assert broken.calls == 1
+
+        always_busy = _FakeModel([(0.0, google_exceptions.ServiceUnavailable("503"))])
+        with pytest.raises(google_exceptions.ServiceUnavailable):
+            await caller.call(always_busy.generate)
+        assert always_busy.calls == 3  # max_attempts
+
+    asyncio.run(scenario())
+
+
+def test_deadline_caps_slow_calls_and_backoff():
+    async def scenario():
+        slow = _FakeModel([(5.0, "too late")])
+        caller = _caller(deadline_seconds=0.1)
+        start = time.perf_counter()
+        with pytest.raises(EvaluationDeadlineExceeded):
+            await caller.call(slow.generate)
+        assert time.perf_counter() - start < 0.5
+        assert slow.cancelled == 1
+
+        # 呼び出しごとに期限を上書きしたら、メッセージもその期限になる
+        with pytest.raises(EvaluationDeadlineExceeded, match=r"0\.2秒"):
+            await _caller(deadline_seconds=30.0).call(slow.generate, deadline_seconds=0.2)
+
+        # バックオフの待ちが期限を超えるなら、待たずにあきらめる
+        busy = _FakeModel([(0.0, google_exceptions.DeadlineExceeded("504"))])
+        caller = _caller(deadline_seconds=0.05, base_delay=10.0, max_delay=10.0, max_attempts=5,
+                         rng=random.Random(1))
+        start = time.perf_counter()
+        with pytest.raises(google_exceptions.DeadlineExceeded):
+            await caller.call(busy.generate)
+        assert time.perf_counter() - start < 0.5
+
+    asyncio.run(scenario())
+
+
+def test_hedged_request_wins_when_first_is_slow():
+    async def scenario():
+        model = _FakeModel([(2.0, "slow"), (0.01, "fast")])
+        caller = _caller(hedge=True, hedge_after_seconds=0.05)
+        start = time.perf_counter()
+        assert await caller.call(model.generate) == "fast"
+        assert time.perf_counter() - start < 0.5
+        assert (caller.hedges, caller.hedge_wins, model.cancelled) == (1, 1, 1)
+
+        # 1本目が失敗しても、ヘッジが成功すればそれを使う
+        model = _FakeModel([(0.1, google_exceptions.ServiceUnavailable("503")), (0.15, "hedged")])
+        assert await caller.call(model.generate) == "hedged"
+        assert caller.retries == 0
+
+    asyncio.run(scenario())
+
+
+def test_hedge_delay_learns_p95_latency():
+    async def scenario():
+        model = _FakeModel([(0.0, "ok")])
+        caller = _caller(hedge=True, hedge_after_seconds=None, hedge_min_samples=5)
+        assert caller.hedge_delay is None  # 学習するまではヘッジしない
+        for _ in range(5):
+            await caller.call(model.generate)
+        assert caller.hedge_delay is not None and caller.hedge_delay < 0.05
+        assert caller.stats()["hedges"] == 0
+        assert _caller(hedge=False).hedge_delay is None
+
+    asyncio.run(scenario())
+
+
+def test_unhedged_calls_do_not_pull_down_hedge_delay():
+    async def scenario():
+        slow = _FakeModel([(0.05, "ok")])
+        fast = _FakeModel([(0.0, "stream opened")])
+        caller = _caller(hedge=True, hedge_after_seconds=None, hedge_min_samples=3)
+        for _ in range(3):
+            await caller.call(slow.generate)
+        learned = caller.hedge_delay
+        assert learned >= 0.04
+        # ストリームを開くだけのような速い呼び出し (hedge=False) は、p95 の学習に入れない
+        for _ in range(20):
+            await caller.call(fast.generate, hedge=False)
+        assert caller.hedge_delay == learned
+
+    asyncio.run(scenario())
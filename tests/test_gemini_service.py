@@ -0,0 +1,58 @@
+import asyncio
+import json
+import os
+
+os.environ.setdefault("DEEPEVAL_TELEMETRY_OPT_OUT", "YES")  # テスト中に外部へ送信しない
+
+from deepeval.metrics import GEval
+from deepeval.models.base_model import DeepEvalBaseLLM
+from deepeval.test_case import LLMTestCaseParams
+
+from backend.services.gemini_service import GeminiService
+
+
+class _StubModel(DeepEvalBaseLLM):
+    """VertexAI ラッパーと同じ形で、決まったスコアを返すモデル。"""
+
+    def __init__(self, score: int):
+        self.score = score
+        self.prompts = []
+
+    def load_model(self):
+        return self
+
+    def generate(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    async def a_generate(self, prompt: str) -> str:
+        self.prompts.append(prompt)
+        return "```json\n" + json.dumps({"score": self.score, "reason": "状況が具体的"}, ensure_ascii=False) + "\n```"
+
+    def get_model_name(self):
+        return "stub"
+
+
+def _service_with_metric(model) -> GeminiService:
+    service = GeminiService.__new__(GeminiService)
+    service.star_metrics = {
+        "situation": GEval(
+            name="Situation (状況説明)",
+            criteria="具体的で明確な状況説明ができているか評価してください",
+            evaluation_steps=["状況の具体性を確認する"],
+            evaluation_params=[LLMTestCaseParams.INPUT, LLMTestCaseParams.ACTUAL_OUTPUT],
+            model=model,
+        )
+    }
+    return service
+
+
+def test_measure_metric_runs_geval():
+    model = _StubModel(score=7)
+    service = _service_with_metric(model)
+
+    result = asyncio.run(service._measure_metric("situation", "前職でチームを率いました。", {"overall_score": 30}))
+
+    assert result == {"score": 0.7, "reason": "状況が具体的"}
+    assert "前職でチームを率いました。" in model.prompts[-1]
+    # 共有しているメトリクスのインスタンスには、結果を書き込まない
+    assert service.star_metrics["situation"].score is None
@@ -0,0 +1,54 @@
+import json
+
+from backend.services.json_stream import JsonStreamParser
+
+EVALUATION = {
+    "star_evaluation": {
+        "situation": {"score": 7, "feedback": "状況は \"具体的\" です。{括弧} もOK"},
+        "task": {"score": 6, "feedback": "課題が明確"},
+        "action": {"score": 8, "feedback": "行動が具体的"},
+        "result": {"score": 5, "feedback": "数値があると良い"},
+    },
+    "overall_score": 26,
+    "strengths": ["論理的", "具体的"],
+}
+
+
+def _chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_sections_complete_as_soon_as_they_close():
+    text = "```json\n" + json.dumps(EVALUATION, ensure_ascii=False, indent=2) + "\n```"
+    parser = JsonStreamParser(max_depth=2)
+    completed = []
+    for chunk in _chunks(text, 7):
+        completed.extend(parser.feed(chunk))
+
+    paths = [path for path, _ in completed]
+    assert paths[:4] == [("star_evaluation", name) for name in ("situation", "task", "action", "result")]
+    assert dict(completed)[("star_evaluation", "situation")] == EVALUATION["star_evaluation"]["situation"]
+    assert dict(completed)[("strengths",)] == ["論理的", "具体的"]
+    assert dict(completed)[()] == EVALUATION
+    assert parser.done
+
+
+def test_section_is_reported_before_the_rest_arrives():
+    text = json.dumps(EVALUATION, ensure_ascii=False)
+    cut = text.index('"task"')
+    parser = JsonStreamParser(max_depth=2)
+
+    first = parser.feed(text[:cut])
+    assert [path for path, _ in first] == [("star_evaluation", "situation")]
+    assert not parser.done
+
+
+def test_max_depth_and_array_indexes():
+    parser = JsonStreamParser()
+    completed = dict(parser.feed('{"items": [{"a": 1}, {"b": [2, 3]}]} trailing {"x": 1}'))
+    assert completed[("items", 0)] == {"a": 1}
+    assert completed[("items", 1, "b")] == [2, 3]
+    assert ("x",) not in completed  # ルートが閉じた後ろは読まない
+
+    shallow = JsonStreamParser(max_depth=1)
+    assert [path for path, _ in shallow.feed('{"items": [{"a": 1}]}')] == [("items",), ()]
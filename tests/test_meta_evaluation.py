@@ -0,0 +1,92 @@
+import asyncio
+import random
+
+import pytest
+
+from backend.services.meta_evaluation import MetaEvaluationQueue
+
+METRICS = ["situation", "task", "action", "result"]
+
+
+class _FakeMetrics:
+    def __init__(self, delay=0.01, slow=(), broken=()):
+        self.delay = delay
+        self.slow = set(slow)
+        self.broken = set(broken)
+        self.running = 0
+        self.max_running = 0
+
+    async def measure(self, name, transcript, llm_output):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(1.0 if name in self.slow else self.delay)
+            if name in self.broken:
+                raise RuntimeError("metric failed")
+            return {"score": 0.8, "reason": f"{name}: {transcript}"}
+        finally:
+            self.running -= 1
+
+
+def test_concurrency_is_capped_across_sessions_and_results_are_delivered():
+    async def scenario():
+        metrics = _FakeMetrics()
+        queue = MetaEvaluationQueue(metrics.measure, METRICS, concurrency=2, sample_rate=1.0)
+        delivered = []
+
+        async def on_result(result):
+            delivered.append(result)
+
+        for i in range(3):
+            assert queue.submit(f"s{i}", f"回答{i}", {"overall_score": 20}, on_result)
+        await queue.close()
+
+        assert metrics.max_running == 2
+        assert sorted(r["session_id"] for r in delivered) == ["s0", "s1", "s2"]
+        assert delivered[0]["metrics"]["task"] == {"score": 0.8, "reason": "task: 回答0"}
+        assert queue.stats()["completed"] == 3
+
+    asyncio.run(scenario())
+
+
+def test_timeouts_and_failures_do_not_block_other_metrics():
+    async def scenario():
+        metrics = _FakeMetrics(slow={"action"}, broken={"result"})
+        queue = MetaEvaluationQueue(metrics.measure, METRICS, concurrency=4, metric_timeout=0.05, sample_rate=1.0)
+        delivered = []
+
+        async def on_result(result):
+            delivered.append(result)
+
+        queue.submit("s0", "回答", {}, on_result)
+        await queue.close()
+
+        scores = delivered[0]["metrics"]
+        assert scores["situation"]["score"] == 0.8
+        assert scores["action"] == {"score": None, "reason": "timeout"}
+        assert scores["result"]["score"] is None
+        assert (queue.timeouts, queue.failed) == (1, 1)
+
+    asyncio.run(scenario())
+
+
+def test_sampling_and_invalid_concurrency():
+    async def scenario():
+        metrics = _FakeMetrics()
+        queue = MetaEvaluationQueue(metrics.measure, METRICS, sample_rate=0.25, rng=random.Random(0))
+
+        async def on_result(result):
+            pass
+
+        accepted = sum(queue.submit(f"s{i}", "回答", {}, on_result) for i in range(200))
+        await queue.close()
+        assert 30 <= accepted <= 70
+        assert queue.sampled_out == 200 - accepted
+
+        disabled = MetaEvaluationQueue(metrics.measure, METRICS, sample_rate=0.0)
+        assert not disabled.submit("s", "回答", {}, on_result)
+        assert not disabled.running
+
+    asyncio.run(scenario())
+    with pytest.raises(ValueError):
+        MetaEvaluationQueue(_FakeMetrics().measure, METRICS, concurrency=0)
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from backend.workers.pitch_statistics import PitchStatistics
+
+
+def test_streaming_stats_match_numpy():
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(np.log(180.0), 0.25, size=5000).clip(60, 580)
+    stats = PitchStatistics(initial_capacity=16)
+
+    # バラバラの大きさのバッチで追加しても、一括計算と一致する
+    for batch in np.array_split(values, [1, 7, 300, 301, 2500]):
+        stats.extend(batch)
+
+    summary = stats.summary()
+    assert summary["count"] == len(values)
+    assert summary["mean"] == pytest.approx(values.mean())
+    assert summary["std"] == pytest.approx(values.std())
+    assert summary["min"] == pytest.approx(values.min())
+    assert summary["max"] == pytest.approx(values.max())
+    for q in (10, 50, 90):
+        assert summary[f"p{q}"] == pytest.approx(np.percentile(values, q), rel=0.01)
+    np.testing.assert_allclose(stats.values, values.astype(np.float32))
+    assert stats.values.dtype == np.float32
+
+
+def test_ignores_nan_and_clears():
+    stats = PitchStatistics()
+    assert stats.extend([np.nan, 200.0, np.nan]) == 1
+    stats.append(100.0)
+    assert stats.summary()["mean"] == pytest.approx(150.0)
+
+    stats.clear()
+    assert len(stats) == 0
+    assert stats.summary() == {}
+    assert stats.quantile(0.5) is None
+
+
+def test_out_of_range_values_are_clamped_in_sketch():
+    stats = PitchStatistics(min_freq=50.0, max_freq=600.0)
+    stats.extend([30.0, 30.0, 900.0])
+    # 分位点はスケッチの範囲に丸められるけど、最小・最大は正確
+    assert 50.0 <= stats.quantile(0.1) <= 51.0
+    assert stats.quantile(0.9) <= 600.0
+    assert (stats.min, stats.max) == (30.0, 900.0)
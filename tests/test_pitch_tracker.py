@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from backend.workers.pitch_tracker import PitchContourTracker
+
+HOP = 0.02  # 320サンプル / 16kHz
+
+
+def _feed(tracker, frequencies, start=1000.0, block=3):
+    """block フレームずつ、最後のフレームの時刻を付けて渡す。"""
+    corrected, points = [], []
+    for i in range(0, len(frequencies), block):
+        chunk = np.asarray(frequencies[i:i + block], dtype=np.float64)
+        c, p = tracker.push(chunk, start + (i + len(chunk) - 1) * HOP)
+        corrected.append(c)
+        points.extend(p)
+    return np.concatenate(corrected), points
+
+
+def test_octave_jumps_are_folded_and_outliers_removed():
+    tracker = PitchContourTracker(frame_period=HOP, output_rate_hz=10)
+    raw = [200.0] * 10 + [400.0, 101.0, 200.0, 260.0, 200.0] + [200.0] * 10
+    corrected, points = _feed(tracker, raw)
+
+    assert corrected[10] == pytest.approx(200.0)
+    assert corrected[11] == pytest.approx(202.0)
+    # 単発の外れ値 (260Hz) はランニングメディアンで消える
+    assert all(p["pitch"] == pytest.approx(200.0, rel=0.02) for p in points)
+
+
+def test_output_rate_limits_points():
+    tracker = PitchContourTracker(frame_period=HOP, output_rate_hz=10)
+    _, points = _feed(tracker, [150.0] * 100)  # 2秒分 = 100フレーム
+    points += tracker.flush()
+    assert len(points) == 20
+    times = np.array([p["timestamp"] for p in points])
+    np.testing.assert_allclose(np.diff(times), 0.1)
+
+
+def test_unvoiced_frames_produce_gaps_and_reset_history():
+    tracker = PitchContourTracker(frame_period=HOP, output_rate_hz=10, max_gap=0.1)
+    raw = [300.0] * 10 + [np.nan] * 20 + [150.0] * 10
+    corrected, points = _feed(tracker, raw)
+
+    assert np.isnan(corrected[10:30]).all()
+    # 長い無音のあとは履歴がリセットされるので、150Hz を 300Hz に折り返さない
+    assert corrected[-1] == pytest.approx(150.0)
+    assert points[-1]["pitch"] == pytest.approx(150.0)
+    # 無音区間には点が出ない
+    times = [p["timestamp"] for p in points]
+    assert not any(1000.2 + 0.1 < t <= 1000.6 for t in times)
+
+
+def test_batch_size_does_not_change_the_contour():
+    # オクターブ誤り・短い無音・長い無音 (リセット) がバッチの途中に来ても、1フレームずつ渡したときと同じになる
+    rng = np.random.default_rng(0)
+    raw = 180.0 * np.exp(rng.normal(0.0, 0.03, 300))
+    raw[rng.random(300) < 0.08] *= 2.0
+    raw[rng.random(300) < 0.05] /= 2.0
+    raw[40:43] = np.nan
+    raw[120:150] = np.nan
+    raw[220:] *= 1.6
+
+    results = []
+    for block in (1, 7, 64):
+        tracker = PitchContourTracker(frame_period=HOP, output_rate_hz=10, max_gap=0.3)
+        corrected, points = _feed(tracker, raw, block=block)
+        results.append((corrected, points + tracker.flush()))
+
+    for corrected, points in results[1:]:
+        np.testing.assert_array_equal(corrected, results[0][0])
+        assert [p["timestamp"] for p in points] == pytest.approx([p["timestamp"] for p in results[0][1]])
+        assert [p["pitch"] for p in points] == pytest.approx([p["pitch"] for p in results[0][1]])
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from backend.workers.pitch_worker import PitchWorker
+
+RATE = 16000
+
+
+def _tone(freq: float, n: int = 640, amplitude: float = 8000.0, phase: float = 0.0) -> np.ndarray:
+    t = np.arange(n) / RATE
+    return (amplitude * np.sin(2 * np.pi * freq * t + phase)).astype(np.int16)
+
+
+@pytest.fixture
+def worker():
+    return PitchWorker(sample_rate=RATE, channels=1, sample_width=2)
+
+
+def test_batch_matches_single_frame_analysis(worker):
+    frames = np.stack([_tone(f, phase=0.3 * i) for i, f in enumerate((110.0, 180.0, 220.0, 440.0))]
+                      + [np.zeros(640, dtype=np.int16)])
+    frequencies, confidences = worker.analyze_pitch_batch(frames)
+
+    for frame, freq, conf in zip(frames, frequencies, confidences):
+        single = worker.analyze_pitch(frame.tobytes())
+        if single is None:
+            assert np.isnan(freq)
+        else:
+            assert freq == pytest.approx(single)
+            assert conf >= worker.confidence_threshold
+    assert np.isnan(frequencies[-1]) and confidences[-1] == 0.0
+
+
+def test_batch_accepts_strided_views(worker):
+    signal = _tone(200.0, n=640 + 320 * 9)
+    frames = np.lib.stride_tricks.sliding_window_view(signal, 640)[::320]
+    frequencies, _ = worker.analyze_pitch_batch(frames)
+    assert frequencies.shape == (10,)
+    np.testing.assert_allclose(frequencies, 200.0, rtol=0.02)
+
+
+def test_batch_with_too_short_frames_returns_nan(worker):
+    frequencies, confidences = worker.analyze_pitch_batch(np.ones((3, 100), dtype=np.int16))
+    assert np.isnan(frequencies).all()
+    assert (confidences == 0).all()
+
+
+def test_plan_autocorrelation_matches_direct_correlation():
+    from backend.workers.pitch_worker import AutocorrelationPlan
+
+    rng = np.random.default_rng(1)
+    frames = rng.integers(-3000, 3000, size=(3, 640)).astype(np.int16)
+    plan = AutocorrelationPlan(640, max_lag=320)
+    assert plan.fft_len == 1024
+
+    got = plan.autocorrelate(frames)
+    for frame, row in zip(frames.astype(np.float64), got):
+        direct = np.correlate(frame, frame, mode="full")[639:639 + 321]
+        np.testing.assert_allclose(row, direct, rtol=1e-9, atol=1e-3)
+
+
+def test_plan_buffers_are_reused_between_calls(worker):
+    frames = np.stack([_tone(150.0), _tone(300.0)])
+    worker.analyze_pitch_batch(frames)
+    padded_before = worker.plan._padded
+    worker.analyze_pitch_batch(frames[::-1])
+    assert worker.plan._padded is padded_before
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from backend.services.sentiment_batching import SentenceBatcher, SentimentCache, normalize_text
+
+
+def test_fragments_are_joined_until_sentence_boundary():
+    async def scenario():
+        sentences = []
+        batcher = SentenceBatcher(lambda segment_id, text: sentences.append((segment_id, text)), timeout=10)
+        batcher.add(0, "私は前職で")
+        batcher.add(1, "開発を担当しました。チームでは")
+        batcher.add(2, "リーダーでした！本当に？")
+        batcher.add(3, "はい")
+        return sentences, batcher
+
+    sentences, batcher = asyncio.run(scenario())
+    assert sentences == [
+        (1, "私は前職で開発を担当しました。"),
+        (2, "チームではリーダーでした！"),
+        (2, "本当に？"),
+    ]
+    assert (batcher.fragments, batcher.sentences) == (4, 3)
+
+
+def test_timeout_flushes_unterminated_sentence():
+    async def scenario():
+        sentences = []
+        batcher = SentenceBatcher(lambda segment_id, text: sentences.append((segment_id, text)), timeout=0.02)
+        batcher.add(5, "えーと")
+        batcher.add(6, "そうですね")
+        await asyncio.sleep(0.01)
+        assert sentences == []
+        await asyncio.sleep(0.05)
+        return sentences
+
+    assert asyncio.run(scenario()) == [(6, "えーとそうですね")]
+
+
+def test_cache_is_lru_and_keyed_by_normalized_text():
+    cache = SentimentCache(maxsize=2)
+    cache.put("よろしく お願いします。", {"score": 0.5})
+    cache.put("ありがとうございます。", {"score": 0.8})
+
+    assert normalize_text("ＡＢＣ　です") == "abcです"
+    assert cache.get("よろしくお願いします。") == {"score": 0.5}  # 空白の違いは同じキー
+    cache.put("失礼します。", {"score": 0.0})  # 一番使われていない「ありがとう」が消える
+    assert cache.get("ありがとうございます。") is None
+    assert len(cache) == 2
+
+
+def test_wrapped_analyze_hits_cache_and_coalesces_in_flight_calls():
+    calls = []
+
+    async def analyze(text):
+        calls.append(text)
+        await asyncio.sleep(0.01)
+        return None if text == "失敗" else {"score": 0.1}
+
+    async def scenario():
+        cache = SentimentCache()
+        cached = cache.wrap(analyze)
+        first = await asyncio.gather(cached("よろしくお願いします。"), cached("よろしくお願いします。"))
+        again = await cached("よろしく　お願いします。")
+        assert await cached("失敗") is None
+        assert await cached("失敗") is None  # 失敗はキャッシュしない
+        return first, again, cache
+
+    first, again, cache = asyncio.run(scenario())
+    assert first == [{"score": 0.1}, {"score": 0.1}] and again == {"score": 0.1}
+    assert calls == ["よろしくお願いします。", "失敗", "失敗"]
+    assert cache.hits == 2 and cache.hit_ratio == pytest.approx(2 / 5)
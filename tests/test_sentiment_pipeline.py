@@ -0,0 +1,83 @@
+import asyncio
+
+from backend.services.sentiment_pipeline import SentimentPipeline
+
+
+def test_submit_never_waits_and_results_are_tagged_with_segment_id():
+    async def scenario():
+        delays = {"遅い断片です": 0.05, "速い断片です": 0.0}
+        received = []
+
+        async def analyze(text):
+            await asyncio.sleep(delays[text])
+            return {"score": len(text)}
+
+        async def on_result(segment_id, text, sentiment):
+            received.append((segment_id, text, sentiment["score"]))
+
+        pipeline = SentimentPipeline(analyze, on_result, concurrency=2)
+        pipeline.start()
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        assert pipeline.submit(0, "遅い断片です")
+        assert pipeline.submit(1, "速い断片です")
+        assert loop.time() - started < 0.01  # STTのループ側は待たない
+        await pipeline.close(timeout=1.0)
+        return received, pipeline
+
+    received, pipeline = asyncio.run(scenario())
+    # 後から積んだ速い断片が先に終わってもよい (segment_id で対応がわかる)
+    assert [segment_id for segment_id, _, _ in received] == [1, 0]
+    assert pipeline.completed == 2 and pipeline.pending == 0
+
+
+def test_concurrency_is_bounded():
+    async def scenario():
+        active = 0
+        peak = 0
+
+        async def analyze(text):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return None
+
+        async def on_result(*_):
+            pass
+
+        pipeline = SentimentPipeline(analyze, on_result, concurrency=3)
+        pipeline.start()
+        for i in range(12):
+            pipeline.submit(i, f"断片その{i}")
+        await pipeline.close(timeout=1.0)
+        return peak, pipeline
+
+    peak, pipeline = asyncio.run(scenario())
+    assert peak == 3
+    assert pipeline.completed == 12
+
+
+def test_errors_and_overflow_are_counted():
+    async def scenario():
+        async def analyze(text):
+            if text == "失敗する断片":
+                raise RuntimeError("Dialogflow timeout")
+            return {"score": 0.5}
+
+        async def on_result(*_):
+            pass
+
+        pipeline = SentimentPipeline(analyze, on_result, concurrency=1, max_queue=2)
+        assert not pipeline.submit(0, "あ")  # 短すぎるテキストは分析しない
+        pipeline.submit(1, "捨てられる断片")
+        pipeline.submit(2, "失敗する断片")
+        pipeline.submit(3, "成功する断片")  # キューがいっぱいなので #1 がスキップされる
+        pipeline.start()
+        await pipeline.close(timeout=1.0)
+        return pipeline
+
+    pipeline = asyncio.run(scenario())
+    assert (pipeline.submitted, pipeline.completed, pipeline.failed, pipeline.dropped) == (3, 1, 1, 1)
+    assert pipeline.pending == 0
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from backend.services.session_timeline import SessionTimeline
+
+
+def _timeline_with_segments(times):
+    timeline = SessionTimeline()
+    timeline.reset(start_time=1000.0)
+    for i, t in enumerate(times):
+        timeline.add_segment(i, f"断片{i}", timestamp=1000.0 + t)
+    return timeline
+
+
+def test_columns_grow_and_keep_types():
+    timeline = SessionTimeline()
+    timeline.reset(start_time=0.0)
+    timeline.add_pitch_points([{"pitch": 100.0 + i, "timestamp": i * 0.1} for i in range(1000)])
+
+    assert timeline.pitch_hz.values.dtype == np.float32
+    assert timeline.pitch_time.values.dtype == np.float64
+    np.testing.assert_allclose(timeline.pitch_hz.values, 100.0 + np.arange(1000))
+    np.testing.assert_allclose(timeline.pitch_time.values, np.arange(1000) * 0.1)
+
+
+def test_segment_char_offsets_match_joined_transcript():
+    timeline = SessionTimeline(separator_length=1)
+    texts = ["はい", "よろしくお願いします。", "えっと"]
+    for i, text in enumerate(texts):
+        timeline.add_segment(i, text)
+
+    joined = " ".join(texts)
+    for offset, text in zip(timeline.segment_char_offset.values, texts):
+        assert joined[offset:offset + len(text)] == text
+
+
+def test_sentiment_is_weighted_by_sentence_duration_in_any_order():
+    timeline = _timeline_with_segments([2.0, 3.0, 10.0])
+    # 文は順番どおりに分析へ回る: #1 で終わる文 (0〜3秒), #2 で終わる文 (3〜10秒)
+    timeline.mark_sentence(1)
+    timeline.mark_sentence(2)
+    # 結果は逆順に届く
+    timeline.add_sentiment(2, score=-0.8, magnitude=1.0)
+    timeline.add_sentiment(1, score=0.6, magnitude=0.5)
+
+    assert timeline.mean_sentiment == pytest.approx((0.6 * 3 + -0.8 * 7) / 10)
+    assert timeline.dominant_emotion == "ネガティブ"
+    summary = timeline.evaluation_summary()
+    assert summary["emotion_score"] == f"{(0.6 * 3 - 0.8 * 7) / 10:.2f}"
+    assert summary["emotion_breakdown"] == "ネガティブ 70% / ニュートラル 0% / ポジティブ 30%"
+    assert summary["sentiment_sample_count"] == 2
+    np.testing.assert_array_equal(timeline.sentiment_segment.values, [2, 1])
+
+
+def test_summary_without_sentiment_and_reset():
+    timeline = _timeline_with_segments([1.0])
+    assert timeline.evaluation_summary() == {"segment_count": 1}
+    assert timeline.dominant_emotion is None
+
+    timeline.mark_sentence(0)
+    timeline.add_sentiment(0, score=0.1, magnitude=0.2)
+    assert timeline.dominant_emotion == "ニュートラル"
+
+    timeline.reset()
+    assert timeline.evaluation_summary() == {"segment_count": 0}
+    assert timeline.sentiment_count == 0
@@ -0,0 +1,116 @@
+import asyncio
+
+from backend.services.speculative_evaluator import SpeculativeEvaluator
+
+
+class _FakeGemini:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = []
+        self.cancelled = 0
+
+    async def evaluate(self, context):
+        self.calls.append(context["transcript"])
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return {"overall_score": len(context["transcript"])}
+
+
+def _context(state):
+    return {"transcript": state["text"], "average_pitch": state.get("pitch", "N/A")}
+
+
+def _evaluator(gemini, state, **kwargs):
+    options = dict(pause_seconds=0.02, min_new_chars=5, min_interval_seconds=0.0, max_runs=3)
+    options.update(kwargs)
+    return SpeculativeEvaluator(
+        build_context=lambda: _context(state),
+        evaluate=gemini.evaluate,
+        **options,
+    )
+
+
+def _say(evaluator, state, text):
+    state["text"] = text
+    evaluator.on_transcript(text)
+
+
+def test_result_is_reused_when_transcript_is_unchanged():
+    async def scenario():
+        gemini, state = _FakeGemini(), {"text": ""}
+        evaluator = _evaluator(gemini, state)
+        _say(evaluator, state, "はい、私は前職で")
+        await asyncio.sleep(0.01)  # まだ黙っていない
+        assert gemini.calls == []
+        _say(evaluator, state, "はい、私は前職でチームを率いました。")
+        await asyncio.sleep(0.03)
+        assert gemini.calls == ["はい、私は前職でチームを率いました。"]
+
+        # 停止時に実行中でも、同じ文字起こしなら待って結果を使う
+        result = await evaluator.result_for(_context(state))
+        assert result == {"overall_score": len("はい、私は前職でチームを率いました。")}
+        assert evaluator.hits == 1
+
+    asyncio.run(scenario())
+
+
+def test_newer_run_supersedes_and_stale_result_is_not_used():
+    async def scenario():
+        gemini, state = _FakeGemini(delay=0.2), {"text": ""}
+        evaluator = _evaluator(gemini, state)
+        _say(evaluator, state, "最初の回答です。")
+        await asyncio.sleep(0.03)
+        _say(evaluator, state, "最初の回答です。そして続きを話します。")
+        await asyncio.sleep(0.03)
+        assert len(gemini.calls) == 2
+        assert evaluator.cancelled == 1
+
+        # 少しだけ増えた (min_new_chars 未満) ので先回りはしないが、結果も使えない
+        _say(evaluator, state, "最初の回答です。そして続きを話します。以上")
+        await asyncio.sleep(0.03)
+        assert len(gemini.calls) == 2
+        assert await evaluator.result_for(_context(state)) is None
+        await evaluator.close()
+        assert gemini.cancelled == 2
+
+    asyncio.run(scenario())
+
+
+def test_result_is_not_reused_when_only_the_transcript_matches():
+    async def scenario():
+        gemini, state = _FakeGemini(), {"text": "", "pitch": 120.0}
+        evaluator = _evaluator(gemini, state)
+        _say(evaluator, state, "はい、私は前職でチームを率いました。")
+        await asyncio.sleep(0.1)
+        assert len(gemini.calls) == 1
+
+        # 文字起こしは同じでも、先回りのあとにピッチの集計が変わっていたら古い結果は使わない
+        state["pitch"] = 135.0
+        assert await evaluator.result_for(_context(state)) is None
+        assert evaluator.hits == 0
+        assert evaluator.misses == 1
+
+    asyncio.run(scenario())
+
+
+def test_runs_are_rate_limited_per_session():
+    async def scenario():
+        gemini, state = _FakeGemini(delay=0.0), {"text": ""}
+        evaluator = _evaluator(gemini, state, min_interval_seconds=0.3, max_runs=2)
+        for i in range(1, 6):
+            _say(evaluator, state, "あいうえお" * i)
+            await asyncio.sleep(0.03)
+        assert len(gemini.calls) == 1
+        # 間隔の制限で2回目以降はまとめられ、間隔が空いたら最新の文字起こしで1回だけ
+        await asyncio.sleep(0.3)
+        assert gemini.calls[-1] == "あいうえお" * 5
+        # 回数の上限 (2回) に達したので、もう先回りしない
+        _say(evaluator, state, "あいうえお" * 10)
+        await asyncio.sleep(0.35)
+        assert len(gemini.calls) == 2
+        await evaluator.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,114 @@
+import asyncio
+
+from backend.services.stt_rotation import RotatingSpeechStream, TranscriptResult
+
+BYTES_PER_SECOND = 100
+WORD_BYTES = 50  # 1単語 = 0.5秒ぶんの音声
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class StreamExpired(Exception):
+    pass
+
+
+class FakeRecognizer:
+    """
+    受け取った音声チャンクを1単語として、そのまま確定結果にするローカルのフェイク。
+    expire_after を指定すると、その数だけ認識したあと (OutOfRange のように) 打ち切る。
+    """
+
+    def __init__(self, expire_after: int | None = None):
+        self.expire_after = expire_after
+        self.streams = []
+
+    async def __call__(self, audio):
+        received = []
+        self.streams.append(received)
+
+        async def responses():
+            offset = 0.0
+            async for chunk in audio:
+                received.append(chunk)
+                if self.expire_after is not None and len(received) > self.expire_after:
+                    raise StreamExpired("Exceeded maximum allowed stream duration")
+                await asyncio.sleep(0)
+                word = chunk.rstrip(b"\x00").decode()
+                yield TranscriptResult(word[:2], is_final=False, end_offset=offset)
+                offset += len(chunk) / BYTES_PER_SECOND
+                yield TranscriptResult(word, is_final=True, end_offset=offset)
+
+        return responses()
+
+
+def _word(i: int) -> bytes:
+    return f"word{i:02d}".encode().ljust(WORD_BYTES, b"\x00")
+
+
+async def _audio(clock: FakeClock, n_words: int):
+    for i in range(n_words):
+        yield _word(i)
+        clock.now += WORD_BYTES / BYTES_PER_SECOND
+        await asyncio.sleep(0)
+
+
+def _run(rotator: RotatingSpeechStream, clock: FakeClock, n_words: int) -> list[TranscriptResult]:
+    async def scenario():
+        return [result async for result in rotator.results(_audio(clock, n_words))]
+
+    return asyncio.run(scenario())
+
+
+def test_rotates_before_limit_without_losing_or_duplicating_words():
+    clock = FakeClock()
+    recognizer = FakeRecognizer()
+    rotator = RotatingSpeechStream(recognizer, BYTES_PER_SECOND, rotate_after=3.0, overlap_seconds=1.0, clock=clock)
+
+    results = _run(rotator, clock, 20)  # 10秒ぶん → 3秒ごとに張り替え
+
+    finals = [r.transcript for r in results if r.is_final]
+    assert finals == [f"word{i:02d}" for i in range(20)]
+    assert rotator.rotations == 3
+    assert len(recognizer.streams) == 4
+    # 2本目以降は、直近1秒 (2単語) をリプレイしてから続きを送っている
+    assert recognizer.streams[1][:2] == recognizer.streams[0][-2:]
+    assert rotator.duplicates_dropped == 6
+    # 結果はストリームの順番どおりに並ぶ
+    indices = [r.stream_index for r in results if r.is_final]
+    assert indices == sorted(indices)
+
+
+def test_expired_stream_is_replaced_and_overlap_text_is_trimmed():
+    clock = FakeClock()
+    recognizer = FakeRecognizer(expire_after=4)
+    rotator = RotatingSpeechStream(
+        recognizer, BYTES_PER_SECOND, rotate_after=300.0, overlap_seconds=1.0,
+        rotate_on=(StreamExpired,), clock=clock,
+    )
+
+    results = _run(rotator, clock, 8)
+
+    finals = [r.transcript for r in results if r.is_final]
+    # 打ち切られた瞬間のチャンクはリプレイで送り直されるので取りこぼさないし、
+    # 前のストリームで確定済みの単語 (word03, word06) は文字列の重なりで取り除かれる。
+    # 2本目は最後のチャンクで打ち切られるので、音声の終了後にリプレイだけのストリームで拾い直す
+    assert finals == [f"word{i:02d}" for i in range(8)]
+    assert rotator.rotations == 2
+    assert rotator.duplicates_dropped == 2
+
+
+def test_short_session_uses_single_stream():
+    clock = FakeClock()
+    recognizer = FakeRecognizer()
+    rotator = RotatingSpeechStream(recognizer, BYTES_PER_SECOND, rotate_after=270.0, clock=clock)
+
+    results = _run(rotator, clock, 4)
+
+    assert [r.transcript for r in results if r.is_final] == ["word00", "word01", "word02", "word03"]
+    assert rotator.rotations == 0 and len(recognizer.streams) == 1
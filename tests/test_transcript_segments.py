@@ -0,0 +1,40 @@
+from backend.services.transcript_segments import TranscriptSegments
+
+
+def test_updates_produce_segment_keyed_deltas():
+    transcript = TranscriptSegments()
+
+    assert transcript.update("今日は", is_final=False) == {"segment_id": 0, "status": "interim", "text": "今日は"}
+    assert transcript.update("今日は", is_final=False) is None  # 同じ途中結果は送らない
+    assert transcript.update("今日は晴れです。", is_final=True) == {
+        "segment_id": 0, "status": "stable", "text": "今日は晴れです。",
+    }
+    assert transcript.update("明日", is_final=False) == {"segment_id": 1, "status": "interim", "text": "明日"}
+    assert transcript.display_text() == "今日は晴れです。 明日"
+    assert transcript.text() == "今日は晴れです。"
+
+
+def test_text_is_joined_once_until_next_segment():
+    transcript = TranscriptSegments()
+    for i in range(3):
+        transcript.update(f"断片{i}", is_final=True)
+
+    joined = transcript.text()
+    assert joined == "断片0 断片1 断片2"
+    assert transcript.text() is joined  # キャッシュされている
+    transcript.update("途中", is_final=False)
+    assert transcript.text() is joined  # 途中結果では作り直さない
+    transcript.update("断片3", is_final=True)
+    assert transcript.text() == "断片0 断片1 断片2 断片3"
+    assert len(transcript) == 4
+
+
+def test_reset_clears_segments():
+    transcript = TranscriptSegments()
+    transcript.update("こんにちは", is_final=True)
+    transcript.update("さようなら", is_final=False)
+
+    transcript.reset()
+
+    assert transcript.text() == "" and transcript.display_text() == "" and transcript.segments == ()
+    assert transcript.update("はじめまして", is_final=False)["segment_id"] == 0
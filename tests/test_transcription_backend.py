@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from backend.services.stt_rotation import RotatingSpeechStream
+from backend.services.transcription_backend import (
+    FakeTranscriptionBackend,
+    GoogleTranscriptionBackend,
+    TranscriptionBackend,
+    create_transcription_backend,
+)
+
+RATE = 16000
+BYTES_PER_SECOND = RATE * 2
+CHUNK = b"\x00\x00" * 1600  # 100ms
+
+
+async def _audio(seconds: float, realtime: bool = False):
+    for _ in range(int(seconds * 10)):
+        yield CHUNK
+        await asyncio.sleep(0.1 if realtime else 0)
+
+
+def _collect(backend, audio):
+    async def scenario():
+        stream = await backend.recognize(audio)
+        return [result async for result in stream]
+
+    return asyncio.run(scenario())
+
+
+def test_fake_emits_scripted_interim_and_final_results():
+    backend = FakeTranscriptionBackend(script=("今日は 晴れ です。", "明日は 雨"), word_seconds=0.2, latency=0.0, jitter=0.0)
+
+    results = _collect(backend, _audio(1.0))  # 5単語ぶん
+
+    assert [(r.transcript, r.is_final) for r in results] == [
+        ("今日は", False),
+        ("今日は晴れ", False),
+        ("今日は晴れです。", True),
+        ("明日は", False),
+        ("明日は雨", True),
+    ]
+    assert results[2].end_offset == pytest.approx(0.6)
+    assert backend.results_emitted == 5
+
+
+def test_fake_finalizes_partial_phrase_when_audio_closes():
+    backend = FakeTranscriptionBackend(script=("一 二 三 四",), word_seconds=0.2, latency=0.0, jitter=0.0)
+
+    results = _collect(backend, _audio(0.4))
+
+    assert [(r.transcript, r.is_final) for r in results] == [("一", False), ("一二", False), ("一二", True)]
+
+
+def test_fake_latency_and_jitter_keep_order():
+    backend = FakeTranscriptionBackend(word_seconds=0.1, latency=0.05, jitter=0.04, seed=1)
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        stream = await backend.recognize(_audio(0.5))
+        arrivals = [(loop.time() - started, result) async for result in stream]
+        return arrivals
+
+    arrivals = asyncio.run(scenario())
+
+    times = [t for t, _ in arrivals]
+    assert times == sorted(times)
+    # 音声は一瞬で流し込んでいるので、届くまでの時間はほぼ latency ± jitter
+    assert 0.01 - 0.005 <= times[0] <= 0.09 + 0.05
+    offsets = [r.end_offset for _, r in arrivals]
+    assert offsets == sorted(offsets)
+
+
+def test_fake_backend_runs_behind_rotating_stream():
+    backend = FakeTranscriptionBackend(word_seconds=0.1, latency=0.0, jitter=0.0)
+    rotator = RotatingSpeechStream(backend.recognize, BYTES_PER_SECOND, rotate_after=0.25, overlap_seconds=0.0)
+
+    async def scenario():
+        return [r async for r in rotator.results(_audio(0.6, realtime=True))]
+
+    results = asyncio.run(scenario())
+
+    assert rotator.rotations >= 1
+    assert backend.streams_opened == rotator.rotations + 1
+    assert any(r.is_final for r in results)
+
+
+def test_factory_rejects_unknown_backend():
+    assert isinstance(create_transcription_backend("fake"), FakeTranscriptionBackend)
+    assert GoogleTranscriptionBackend.name == "google"
+    with pytest.raises(ValueError):
+        create_transcription_backend("whisper")
+
+
+def test_backend_without_recognize_cannot_be_created():
+    class Incomplete(TranscriptionBackend):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+    with pytest.raises(TypeError):
+        TranscriptionBackend()
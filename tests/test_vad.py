@@ -0,0 +1,50 @@
+import numpy as np
+
+from backend.workers.vad import SilenceGate, VoiceActivityDetector
+
+RATE = 16000
+
+
+def _voice(n: int, freq: float = 150.0, amplitude: float = 6000.0) -> np.ndarray:
+    t = np.arange(n) / RATE
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.int16)
+
+
+def _noise(n: int, amplitude: float = 30.0, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).normal(0, amplitude, n).astype(np.int16)
+
+
+def test_detects_voice_and_rejects_quiet_noise():
+    vad = VoiceActivityDetector(RATE, hangover_ms=0)
+    frames = np.stack([_voice(640), _noise(640), np.zeros(640, dtype=np.int16)])
+    np.testing.assert_array_equal(vad.is_speech(frames), [True, False, False])
+
+
+def test_hangover_keeps_trailing_frames_across_calls():
+    vad = VoiceActivityDetector(RATE, hangover_ms=100)  # 1600 サンプル = 5ホップ分
+    silence = np.zeros((4, 640), dtype=np.int16)
+    first = vad.is_speech(np.concatenate([_voice(640)[np.newaxis], silence]), step=320)
+    np.testing.assert_array_equal(first, [True, True, True, True, True])
+
+    # 前回の有声フレームから 5ホップ目まではまだ有声扱い、その後は無音
+    second = vad.is_speech(silence, step=320)
+    np.testing.assert_array_equal(second, [True, False, False, False])
+
+    vad.reset()
+    assert not vad.is_speech(silence, step=320).any()
+
+
+def test_silence_gate_drops_long_silence_but_sends_keepalive():
+    gate = SilenceGate(VoiceActivityDetector(RATE, hangover_ms=0), keep_silence_ms=64, keepalive_ms=512)
+    chunk_voice = _voice(128).tobytes()
+    chunk_silence = np.zeros(128, dtype=np.int16).tobytes()  # 8ms
+
+    assert gate.filter(chunk_voice) == chunk_voice
+    passed = [gate.filter(chunk_silence) is not None for _ in range(200)]
+    # 最初の 64ms (8チャンク) はそのまま流れる
+    assert all(passed[:8])
+    # その後は 512ms (64チャンク) ごとに1つだけ
+    assert sum(passed[8:]) == 192 // 64
+    assert gate.dropped_ratio > 0.8
+    # 声が戻ったらすぐ流れる
+    assert gate.filter(chunk_voice) == chunk_voice